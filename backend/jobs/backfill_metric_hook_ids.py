@@ -0,0 +1,109 @@
+"""
+Backfill `hook_id` on metrics written before it was resolved at insert time.
+
+Resolution mirrors the insert path: the script's hook when the script's
+hook text matches `hook_used`, otherwise the user's hook with that text.
+Metrics that can't be resolved get `hook_id: null` so they aren't
+rescanned on the next run.
+
+Usage (from backend/):
+    python -m jobs.backfill_metric_hook_ids [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+from pymongo import UpdateOne
+
+from utils.data_version import bump_data_version, METRICS_DATASET
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+async def _resolve_batch(db, batch: list) -> Tuple[list, int]:
+    """Build the hook_id updates for a batch; returns (ops, resolved count)."""
+    script_ids = list({m["script_id"] for m in batch if m.get("script_id")})
+    scripts = {
+        s["id"]: s
+        async for s in db.scripts.find(
+            {"id": {"$in": script_ids}},
+            {"_id": 0, "id": 1, "hook_id": 1, "hook_text": 1}
+        )
+    }
+
+    user_ids = list({m["user_id"] for m in batch})
+    hook_texts = list({m["hook_used"] for m in batch if m.get("hook_used")})
+    hooks = {}
+    async for h in db.hooks.find(
+        {"user_id": {"$in": user_ids}, "hook_text": {"$in": hook_texts}},
+        {"_id": 0, "id": 1, "user_id": 1, "hook_text": 1}
+    ):
+        hooks.setdefault((h["user_id"], h["hook_text"]), h["id"])
+
+    ops = []
+    resolved = 0
+    for metric in batch:
+        script = scripts.get(metric.get("script_id"))
+        if script and script.get("hook_id") and script.get("hook_text") == metric.get("hook_used"):
+            hook_id = script["hook_id"]
+        else:
+            hook_id = hooks.get((metric["user_id"], metric.get("hook_used")))
+        resolved += hook_id is not None
+        ops.append(UpdateOne({"_id": metric["_id"]}, {"$set": {"hook_id": hook_id}}))
+    return ops, resolved
+
+async def backfill_metric_hook_ids(db, user_id: Optional[str] = None, report=None) -> dict:
+    query = {"hook_id": {"$exists": False}}
+    if user_id:
+        query["user_id"] = user_id
+
+    scanned = 0
+    resolved = 0
+    batch = []
+    touched_users = set()
+
+    async def flush():
+        nonlocal resolved
+        ops, batch_resolved = await _resolve_batch(db, batch)
+        resolved += batch_resolved
+        await db.metrics.bulk_write(ops, ordered=False)
+        batch.clear()
+        if report:
+            await report(scanned=scanned, resolved=resolved)
+
+    cursor = db.metrics.find(
+        query,
+        {"_id": 1, "user_id": 1, "script_id": 1, "hook_used": 1}
+    ).batch_size(BATCH_SIZE)
+
+    async for metric in cursor:
+        batch.append(metric)
+        touched_users.add(metric["user_id"])
+        scanned += 1
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    # Hook leaderboards are built from metrics' hook_id
+    for uid in touched_users:
+        await bump_data_version(uid, METRICS_DATASET)
+
+    return {"scanned": scanned, "resolved": resolved, "unresolved": scanned - resolved}
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill hook_id on existing metrics")
+    parser.add_argument("--user-id", help="Only backfill this user's metrics")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await backfill_metric_hook_ids(db, user_id=args.user_id)
+    logger.info(f"Backfill finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
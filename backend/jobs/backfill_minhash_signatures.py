@@ -0,0 +1,100 @@
+"""
+Backfill MinHash signatures (`minhash_signatures`) for hooks and scripts
+stored before the near-duplicate index existed, or written without going
+through services/dedupe_service.
+
+Signatures are computed off the event loop in batches and inserted with
+unordered bulk upserts ($setOnInsert, so signatures written meanwhile are
+kept). Each touched (user, kind) gets its signature data version bumped, so
+running workers pick the new entries up with an incremental refresh.
+
+Usage (from backend/):
+    python -m jobs.backfill_minhash_signatures [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from utils.minhash import minhash_signature
+from utils.data_version import bump_data_version
+from services.dedupe_service import INDEXED_KINDS, signatures_dataset
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+async def _backfill_kind(db, kind: str, user_id: Optional[str], report=None) -> dict:
+    collection, field = INDEXED_KINDS[kind]
+    query = {"user_id": user_id} if user_id else {}
+
+    indexed = set()
+    async for doc in db.minhash_signatures.find({**query, "kind": kind}, {"_id": 0, "user_id": 1, "doc_id": 1}):
+        indexed.add((doc["user_id"], doc["doc_id"]))
+
+    scanned = 0
+    written = 0
+    batch = []
+    touched_users = set()
+
+    def build_ops(docs: list) -> list:
+        now = datetime.utcnow()
+        return [
+            UpdateOne(
+                {"user_id": doc["user_id"], "kind": kind, "doc_id": doc["id"]},
+                {"$setOnInsert": {"signature": list(minhash_signature(doc[field])), "updated_at": now}},
+                upsert=True
+            )
+            for doc in docs
+        ]
+
+    async def flush():
+        nonlocal written
+        ops = await asyncio.to_thread(build_ops, batch)
+        result = await db.minhash_signatures.bulk_write(ops, ordered=False)
+        written += result.upserted_count
+        touched_users.update(doc["user_id"] for doc in batch)
+        batch.clear()
+        if report:
+            await report(**{f"{kind}_scanned": scanned, f"{kind}_backfilled": written})
+
+    cursor = db[collection].find(query, {"_id": 0, "id": 1, "user_id": 1, field: 1}).batch_size(BATCH_SIZE)
+    async for doc in cursor:
+        scanned += 1
+        if (doc["user_id"], doc["id"]) in indexed or not doc.get(field):
+            continue
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    for uid in touched_users:
+        await bump_data_version(uid, signatures_dataset(kind))
+
+    return {"scanned": scanned, "backfilled": written}
+
+async def backfill_minhash_signatures(db, user_id: Optional[str] = None, report=None) -> dict:
+    result = {}
+    for kind in INDEXED_KINDS:
+        result[kind] = await _backfill_kind(db, kind, user_id, report)
+    logger.info(f"MinHash signature backfill: {result}")
+    return result
+
+async def main():
+    parser = argparse.ArgumentParser(description="Backfill near-duplicate MinHash signatures")
+    parser.add_argument("--user-id", help="Only backfill this user's hooks and scripts")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await backfill_minhash_signatures(db, user_id=args.user_id)
+    logger.info(f"Backfill finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
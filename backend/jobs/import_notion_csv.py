@@ -0,0 +1,200 @@
+"""
+Streaming, idempotent import of Notion analytics CSV exports.
+
+The CSV is parsed in chunks with pandas (off the event loop), validated
+column-wise per chunk and upserted by (user_id, social_file) with
+unordered bulk writes, so re-importing an export updates rows instead of
+duplicating them and memory stays bounded by the chunk size.
+
+Usage (from backend/):
+    python -m jobs.import_notion_csv --user-id USER_ID export.csv
+"""
+import argparse
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import IO, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from utils.data_version import bump_data_version, ANALYTICS_DATASET
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = int(os.getenv("NOTION_IMPORT_CHUNK_ROWS", "5000"))
+MAX_REPORTED_ERRORS = 100
+
+# CSV column -> AnalyticsData field
+TEXT_COLUMNS = {
+    "Social File": "social_file",
+    "Retention Hook": "retention_hook",
+    "Hook Title": "hook_title",
+    "Dominance Line": "dominance_line",
+    "Open Loop": "open_loop",
+    "Close": "close",
+    "Resolve Script": "resolve_script",
+}
+OPTIONAL_TEXT_FIELDS = ("dominance_line", "open_loop", "close")
+INT_COLUMNS = {
+    "Views": "views",
+    "Like": "likes",
+    "Comments": "comments",
+}
+FLOAT_COLUMNS = {
+    "Retention %": "retention_percent",
+    "Swipe Rate": "swipe_rate",
+    "Sub-2/1000 views": "subs_per_1000_views",
+    "Avg Watch Time": "avg_watch_time",
+}
+ALL_COLUMNS = {**TEXT_COLUMNS, **INT_COLUMNS, **FLOAT_COLUMNS}
+
+def validate_chunk(chunk: pd.DataFrame, first_row: int):
+    """
+    Vectorized validation of one CSV chunk.
+    Returns (clean rows as a DataFrame of model fields, list of row errors).
+    Row numbers match the spreadsheet (header is row 1).
+    """
+    chunk = chunk.reindex(columns=list(ALL_COLUMNS), fill_value="").rename(columns=ALL_COLUMNS)
+    row_numbers = pd.Series(range(first_row, first_row + len(chunk)), index=chunk.index)
+    invalid = pd.Series("", index=chunk.index)
+
+    for field in TEXT_COLUMNS.values():
+        chunk[field] = chunk[field].fillna("").astype(str).str.strip()
+
+    invalid = invalid.mask(chunk["social_file"] == "", invalid + "Social File is required; ")
+
+    for column, field in {**INT_COLUMNS, **FLOAT_COLUMNS}.items():
+        raw = chunk[field].fillna("").astype(str).str.strip()
+        values = pd.to_numeric(raw.mask(raw == "", "0"), errors="coerce")
+        bad = values.isna()
+        if field in INT_COLUMNS.values():
+            bad |= values.notna() & (values % 1 != 0)
+        invalid = invalid.mask(bad, invalid + f"invalid {column} value; ")
+        chunk[field] = values
+
+    errors = [
+        f"Row {row_numbers[i]}: {message.rstrip('; ')}"
+        for i, message in invalid[invalid != ""].items()
+    ]
+
+    clean = chunk[invalid == ""].copy()
+    for field in INT_COLUMNS.values():
+        clean[field] = clean[field].astype("int64")
+    for field in OPTIONAL_TEXT_FIELDS:
+        clean[field] = clean[field].mask(clean[field] == "", None)
+
+    # Within one file the last row for a social_file wins
+    clean = clean.drop_duplicates(subset="social_file", keep="last")
+    return clean, errors
+
+def upsert_ops(user_id: str, rows: pd.DataFrame) -> List[UpdateOne]:
+    now = datetime.utcnow()
+    ops = []
+    for record in rows.to_dict("records"):
+        record = {k: (None if isinstance(v, float) and pd.isna(v) else v) for k, v in record.items()}
+        ops.append(UpdateOne(
+            {"user_id": user_id, "social_file": record["social_file"]},
+            {
+                "$set": {**record, "updated_at": now},
+                "$setOnInsert": {"id": str(uuid.uuid4()), "created_at": now}
+            },
+            upsert=True
+        ))
+    return ops
+
+async def _upsert_rows(db, ops: List[UpdateOne]) -> Tuple[int, int]:
+    """
+    Bulk upsert; returns (inserted, updated). A concurrent import of the same
+    file can insert a row between our match and insert - the unique index
+    rejects our copy (E11000) and the retry updates the other import's row.
+    """
+    try:
+        result = await db.analytics_data.bulk_write(ops, ordered=False)
+        return result.upserted_count, result.matched_count
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not errors or any(error.get("code") != 11000 for error in errors):
+            raise
+        retry = await db.analytics_data.bulk_write([ops[error["index"]] for error in errors], ordered=False)
+        return e.details.get("nUpserted", 0), e.details.get("nMatched", 0) + retry.matched_count
+
+async def import_notion_csv(
+    db,
+    user_id: str,
+    source: Union[str, IO[bytes]],
+    report=None,
+    delete_source: bool = False
+) -> Dict:
+    """
+    Import a Notion CSV from a path or binary file object.
+    `delete_source` removes the (temporary) file afterwards.
+    """
+    total_rows = 0
+    inserted = 0
+    updated = 0
+    errors: List[str] = []
+    error_count = 0
+    reader = None
+
+    try:
+        # Inside the try: a header/parse error must still clean up the source
+        reader = pd.read_csv(
+            source,
+            chunksize=CHUNK_ROWS,
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8-sig"
+        )
+        while True:
+            chunk: Optional[pd.DataFrame] = await asyncio.to_thread(next, reader, None)
+            if chunk is None:
+                break
+
+            clean, chunk_errors = await asyncio.to_thread(validate_chunk, chunk, total_rows + 2)
+            total_rows += len(chunk)
+            error_count += len(chunk_errors)
+            errors.extend(chunk_errors[:MAX_REPORTED_ERRORS - len(errors)])
+
+            ops = upsert_ops(user_id, clean)
+            if ops:
+                chunk_inserted, chunk_updated = await _upsert_rows(db, ops)
+                inserted += chunk_inserted
+                updated += chunk_updated
+
+            if report:
+                await report(rows=total_rows, inserted=inserted, updated=updated, errors=error_count)
+    finally:
+        if reader is not None:
+            reader.close()
+        if inserted or updated:
+            await bump_data_version(user_id, ANALYTICS_DATASET)
+        if delete_source and isinstance(source, str):
+            os.unlink(source)
+
+    return {
+        "imported_count": inserted + updated,
+        "inserted": inserted,
+        "updated": updated,
+        "total_rows": total_rows,
+        "error_count": error_count,
+        "errors": errors or None
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import a Notion analytics CSV export")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await import_notion_csv(db, args.user_id, args.path)
+    logger.info(f"Import finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
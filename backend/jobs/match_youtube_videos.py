@@ -0,0 +1,221 @@
+"""
+Link synced YouTube videos (`youtube_videos`) to scripts and write their
+stats as metrics.
+
+Each video is matched, in order:
+  1. by an explicit id tag in its title or description - `lgy:<id>` (or
+     `lgy-<id>`), where <id> is a script id or a rendered video id;
+  2. by MinHash similarity of its title to script hooks, and of its
+     description to script texts (LSH over character shingles).
+
+Matched videos are upserted into `metrics` keyed by (user_id,
+youtube_video_id) with one unordered bulk write; only metrics whose
+values changed are written. A unique index on that key keeps concurrent
+runs (scheduler and API) from inserting the same video twice. Hook
+aggregates and analytics rollups are then recomputed for just the hooks
+and days the written metrics touch, so `generate-optimized` sees the new
+data.
+
+Usage (from backend/):
+    python -m jobs.match_youtube_videos --user-id USER_ID
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from utils.minhash import MinHashLSH, minhash_signature
+from utils.metric_points import COLLECTION as METRIC_POINTS, metric_point
+from utils.data_version import bump_data_version, METRICS_DATASET
+from utils.analytics_rollups import bucket_keys
+from jobs.reconcile_hook_stats import reconcile_hook_stats
+from jobs.rebuild_analytics_rollups import rebuild_rollup_days
+
+logger = logging.getLogger(__name__)
+
+MATCH_THRESHOLD = float(os.getenv("YOUTUBE_MATCH_THRESHOLD", "0.5"))
+
+ID_TAG = re.compile(
+    r'\blgy[:\-]([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\b',
+    re.IGNORECASE
+)
+
+# youtube_videos field -> metrics field
+METRIC_FIELDS = {
+    "view_count": "views",
+    "like_count": "likes",
+    "comment_count": "comments",
+    "subscribers_gained": "subs",
+    "retention_percentage": "retention_percent",
+    "swipe_rate": "swipe_rate",
+}
+
+def id_tag(text: str) -> Optional[str]:
+    match = ID_TAG.search(text or "")
+    return match.group(1).lower() if match else None
+
+def build_indexes(scripts: List[Dict]) -> Tuple[MinHashLSH, MinHashLSH]:
+    """(hook index, script text index), both keyed by script id."""
+    hooks, texts = MinHashLSH(), MinHashLSH()
+    for script in scripts:
+        if script.get("hook_text"):
+            hooks.insert(script["id"], minhash_signature(script["hook_text"]))
+        if script.get("script"):
+            texts.insert(script["id"], minhash_signature(script["script"]))
+    return hooks, texts
+
+def match_video(video: Dict, hooks: MinHashLSH, texts: MinHashLSH, threshold: float) -> Optional[Tuple[str, float]]:
+    """Best (script_id, similarity) for a video's title/description, if any clears the threshold."""
+    best = None
+    for index, text in ((hooks, video.get("title")), (texts, video.get("description"))):
+        if not text:
+            continue
+        results = index.query(minhash_signature(text), threshold)
+        if results and (best is None or results[0][1] > best[1]):
+            best = results[0]
+    return best
+
+async def _upsert_metrics(db, ops: List[UpdateOne]):
+    """
+    Upsert metrics by (user_id, youtube_video_id). A concurrent run may insert
+    the same video between our match and insert; the unique index rejects our
+    copy (E11000) and the retry updates the winner's document instead.
+    """
+    try:
+        await db.metrics.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not errors or any(error.get("code") != 11000 for error in errors):
+            raise
+        await db.metrics.bulk_write([ops[error["index"]] for error in errors], ordered=False)
+
+def _published(video: Dict) -> datetime:
+    try:
+        return datetime.fromisoformat(video["published_at"].replace("Z", "+00:00")).replace(tzinfo=None)
+    except (KeyError, AttributeError, ValueError):
+        return datetime.utcnow()
+
+async def match_youtube_videos(db, user_id: str, threshold: Optional[float] = None, report=None) -> dict:
+    threshold = threshold or MATCH_THRESHOLD
+
+    scripts = await db.scripts.find(
+        {"user_id": user_id},
+        {"_id": 0, "id": 1, "hook_text": 1, "hook_id": 1, "script": 1}
+    ).to_list(length=None)
+    scripts_by_id = {s["id"]: s for s in scripts}
+    render_scripts = {
+        v["id"]: v["script_id"]
+        async for v in db.videos.find({"user_id": user_id}, {"_id": 0, "id": 1, "script_id": 1})
+    }
+
+    # Signatures are CPU-bound; keep them off the event loop
+    hooks, texts = await asyncio.to_thread(build_indexes, scripts)
+
+    videos = await db.youtube_videos.find(
+        {"user_id": user_id},
+        {"_id": 0, "video_id": 1, "title": 1, "description": 1, "published_at": 1, **{field: 1 for field in METRIC_FIELDS}}
+    ).to_list(length=None)
+
+    existing = {
+        m["youtube_video_id"]: m
+        async for m in db.metrics.find(
+            {"user_id": user_id, "youtube_video_id": {"$ne": None}},
+            {"_id": 0, "id": 1, "youtube_video_id": 1, "script_id": 1, "hook_id": 1, "created_at": 1,
+             **{field: 1 for field in METRIC_FIELDS.values()}}
+        )
+    }
+
+    def resolve(video: Dict) -> Optional[Tuple[str, str, float]]:
+        tag = id_tag(video.get("title")) or id_tag(video.get("description"))
+        if tag:
+            script_id = tag if tag in scripts_by_id else render_scripts.get(tag)
+            if script_id in scripts_by_id:
+                return script_id, "id_tag", 1.0
+        found = match_video(video, hooks, texts, threshold)
+        return (found[0], "similarity", found[1]) if found else None
+
+    matches = await asyncio.to_thread(lambda: [(video, resolve(video)) for video in videos])
+
+    metric_ops = []
+    video_ops = []
+    points = []
+    matched = 0
+    # What the written metrics touch: hooks (old and new) and rollup days
+    hook_ids = set()
+    days = set()
+    for video, resolved in matches:
+        if resolved is None:
+            continue
+        script_id, method, score = resolved
+        matched += 1
+        script = scripts_by_id[script_id]
+        values = {target: video.get(source) or 0 for source, target in METRIC_FIELDS.items()}
+
+        video_ops.append(UpdateOne(
+            {"user_id": user_id, "video_id": video["video_id"]},
+            {"$set": {"matched_script_id": script_id, "match_method": method, "match_score": round(score, 3)}}
+        ))
+
+        previous = existing.get(video["video_id"])
+        if previous and previous.get("script_id") == script_id and all(previous.get(k) == v for k, v in values.items()):
+            continue
+
+        metric_id = previous["id"] if previous else str(uuid.uuid4())
+        created_at = previous.get("created_at") if previous else _published(video)
+        hook_ids.update(h for h in (script.get("hook_id"), (previous or {}).get("hook_id")) if h)
+        days.add(bucket_keys(created_at)[1][1])
+        metric = {
+            "script_id": script_id,
+            "hook_used": script.get("hook_text") or "",
+            "hook_id": script.get("hook_id"),
+            **values
+        }
+        metric_ops.append(UpdateOne(
+            {"user_id": user_id, "youtube_video_id": video["video_id"]},
+            {
+                "$set": metric,
+                "$setOnInsert": {"id": metric_id, "created_at": created_at}
+            },
+            upsert=True
+        ))
+        points.append(metric_point({**metric, "id": metric_id, "user_id": user_id}))
+
+    if video_ops:
+        await db.youtube_videos.bulk_write(video_ops, ordered=False)
+    if metric_ops:
+        await _upsert_metrics(db, metric_ops)
+        await db[METRIC_POINTS].insert_many(points, ordered=False)
+        # Hook stats and rollups are maintained per write elsewhere; recompute the
+        # touched ones from the metrics (idempotent, unlike deltas, if runs overlap)
+        if hook_ids:
+            await reconcile_hook_stats(db, user_id=user_id, hook_ids=list(hook_ids))
+        await rebuild_rollup_days(db, user_id, days)
+        await bump_data_version(user_id, METRICS_DATASET)
+
+    result = {"videos": len(videos), "matched": matched, "metrics_written": len(metric_ops)}
+    if report:
+        await report(**result)
+    logger.info(f"YouTube matching for {user_id}: {result}")
+    return result
+
+async def main():
+    parser = argparse.ArgumentParser(description="Match synced YouTube videos to scripts and write metrics")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--threshold", type=float, help="Minimum MinHash similarity")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await match_youtube_videos(db, user_id=args.user_id, threshold=args.threshold)
+    logger.info(f"Matching finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Convert ISO-string timestamps to native BSON dates and seed `metric_points`.
+
+Older documents in scripts, hooks, metrics, videos and analytics_data
+store `created_at` (and videos `completed_at`) as `.isoformat()` strings,
+which rules out $dateTrunc bucketing, TTL indexes and range scans. This
+rewrites them in batches and then records one time-series point per
+existing metric (at its created_at) for users without any points yet.
+
+Safe to re-run: only string-typed fields are touched.
+
+Usage (from backend/):
+    python -m jobs.migrate_datetimes [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from utils.metric_points import COLLECTION as METRIC_POINTS, ensure_metric_points_collection, metric_point
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+DATE_FIELDS = {
+    "scripts": ("created_at",),
+    "hooks": ("created_at",),
+    "metrics": ("created_at",),
+    "videos": ("created_at", "completed_at"),
+    "analytics_data": ("created_at",)
+}
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """ISO string -> naive UTC datetime (what pymongo returns for stored dates)."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+async def _convert_field(db, collection: str, field: str, base_query: dict) -> dict:
+    converted = 0
+    invalid = 0
+    ops = []
+
+    cursor = db[collection].find(
+        {**base_query, field: {"$type": "string"}},
+        {"_id": 1, field: 1}
+    ).batch_size(BATCH_SIZE)
+
+    async for doc in cursor:
+        parsed = parse_timestamp(doc[field])
+        if parsed is None:
+            invalid += 1
+            continue
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {field: parsed}}))
+        if len(ops) >= BATCH_SIZE:
+            await db[collection].bulk_write(ops, ordered=False)
+            converted += len(ops)
+            ops = []
+
+    if ops:
+        await db[collection].bulk_write(ops, ordered=False)
+        converted += len(ops)
+
+    return {"converted": converted, "invalid": invalid}
+
+async def _seed_metric_points(db, base_query: dict) -> int:
+    seeded = 0
+    for user_id in await db.metrics.distinct("user_id", base_query):
+        if await db[METRIC_POINTS].find_one({"meta.user_id": user_id}, {"_id": 1}):
+            continue
+
+        batch = []
+        async for metric in db.metrics.find({"user_id": user_id}, {"_id": 0}).batch_size(BATCH_SIZE):
+            created_at = metric.get("created_at")
+            batch.append(metric_point(metric, created_at if isinstance(created_at, datetime) else None))
+            if len(batch) >= BATCH_SIZE:
+                await db[METRIC_POINTS].insert_many(batch, ordered=False)
+                seeded += len(batch)
+                batch = []
+        if batch:
+            await db[METRIC_POINTS].insert_many(batch, ordered=False)
+            seeded += len(batch)
+    return seeded
+
+async def migrate_datetimes(db, user_id: Optional[str] = None, report=None) -> dict:
+    base_query = {"user_id": user_id} if user_id else {}
+    result = {}
+
+    for collection, fields in DATE_FIELDS.items():
+        for field in fields:
+            result[f"{collection}.{field}"] = await _convert_field(db, collection, field, base_query)
+            if report:
+                await report(**{f"{collection}.{field}": result[f"{collection}.{field}"]["converted"]})
+
+    await ensure_metric_points_collection(db)
+    result["metric_points_seeded"] = await _seed_metric_points(db, base_query)
+
+    return result
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migrate ISO-string timestamps to BSON dates")
+    parser.add_argument("--user-id", help="Only migrate this user's documents")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await migrate_datetimes(db, user_id=args.user_id)
+    logger.info(f"Datetime migration finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""
+Rebuild the `analytics_rollups` collection from `metrics`.
+
+Streams metrics ordered by user, accumulates total/day/week buckets per
+user in memory and writes them with unordered bulk upserts. Buckets that
+no longer have any metrics are removed.
+
+`rebuild_rollup_days` recomputes only some days of one user (after a batch
+of metric writes): the day buckets from their metrics, then the affected
+weeks and the total from the day buckets.
+
+Usage (from backend/):
+    python -m jobs.rebuild_analytics_rollups [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from pymongo import UpdateOne
+
+from utils.analytics_rollups import bucket_keys, metric_values
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+async def rebuild_analytics_rollups(db, user_id: Optional[str] = None, report=None) -> dict:
+    run_id = str(uuid.uuid4())
+    query = {"user_id": user_id} if user_id else {}
+
+    users = 0
+    metrics = 0
+    buckets_written = 0
+
+    async def write_user(uid: str, buckets: Dict):
+        nonlocal buckets_written
+        now = datetime.utcnow()
+        ops = [
+            UpdateOne(
+                {"user_id": uid, "kind": kind, "bucket": bucket},
+                {"$set": {**values, "rebuild_id": run_id, "updated_at": now}},
+                upsert=True
+            )
+            for (kind, bucket), values in buckets.items()
+        ]
+        for i in range(0, len(ops), BATCH_SIZE):
+            await db.analytics_rollups.bulk_write(ops[i:i + BATCH_SIZE], ordered=False)
+        buckets_written += len(ops)
+
+    current_user = None
+    buckets: Dict = defaultdict(lambda: defaultdict(float))
+
+    cursor = db.metrics.find(
+        query,
+        {"_id": 0, "user_id": 1, "created_at": 1, "views": 1, "likes": 1,
+         "comments": 1, "subs": 1, "retention_percent": 1, "swipe_rate": 1}
+    ).sort("user_id", 1).batch_size(BATCH_SIZE)
+
+    async for metric in cursor:
+        if metric["user_id"] != current_user:
+            if current_user is not None:
+                await write_user(current_user, buckets)
+                if report:
+                    await report(users=users, metrics=metrics, buckets=buckets_written)
+            current_user = metric["user_id"]
+            buckets = defaultdict(lambda: defaultdict(float))
+            users += 1
+
+        metrics += 1
+        values = metric_values(metric)
+        for key in bucket_keys(metric.get("created_at")):
+            for field, value in values.items():
+                buckets[key][field] += value
+
+    if current_user is not None:
+        await write_user(current_user, buckets)
+
+    # Buckets whose metrics were all deleted
+    stale = await db.analytics_rollups.delete_many({**query, "rebuild_id": {"$ne": run_id}})
+
+    if report:
+        await report(users=users, metrics=metrics, buckets=buckets_written)
+
+    return {"users": users, "metrics": metrics, "buckets": buckets_written, "removed": stale.deleted_count}
+
+async def rebuild_rollup_days(db, user_id: str, days: Iterable[str]) -> dict:
+    """Recompute the user's rollups for the given ISO days (plus their weeks and the total)."""
+    days = sorted(set(days))
+    if not days:
+        return {"days": 0, "weeks": 0}
+
+    ranges = []
+    for day in days:
+        start = datetime.combine(date.fromisoformat(day), datetime.min.time())
+        ranges.append({"created_at": {"$gte": start, "$lt": start + timedelta(days=1)}})
+
+    day_buckets: Dict = {day: defaultdict(float) for day in days}
+    cursor = db.metrics.find(
+        {"user_id": user_id, "$or": ranges},
+        {"_id": 0, "created_at": 1, "views": 1, "likes": 1, "comments": 1,
+         "subs": 1, "retention_percent": 1, "swipe_rate": 1}
+    ).batch_size(BATCH_SIZE)
+    async for metric in cursor:
+        _, (_, day), _ = bucket_keys(metric.get("created_at"))
+        bucket = day_buckets.setdefault(day, defaultdict(float))
+        for field, value in metric_values(metric).items():
+            bucket[field] += value
+
+    now = datetime.utcnow()
+
+    async def write(kind: str, buckets: Dict):
+        ops = [
+            UpdateOne(
+                {"user_id": user_id, "kind": kind, "bucket": bucket},
+                {"$set": {**values, "updated_at": now}},
+                upsert=True
+            )
+            for bucket, values in buckets.items() if values.get("count")
+        ]
+        if ops:
+            await db.analytics_rollups.bulk_write(ops, ordered=False)
+        empty = [bucket for bucket, values in buckets.items() if not values.get("count")]
+        if empty:
+            await db.analytics_rollups.delete_many({"user_id": user_id, "kind": kind, "bucket": {"$in": empty}})
+
+    async def sum_days(query: Dict) -> Dict:
+        totals = defaultdict(float)
+        async for doc in db.analytics_rollups.find({"user_id": user_id, "kind": "day", **query}, {"_id": 0}):
+            for field in metric_values({}):
+                totals[field] += doc.get(field, 0)
+        return totals
+
+    await write("day", day_buckets)
+
+    weeks = {bucket_keys(day)[2][1] for day in days}
+    week_buckets = {}
+    for monday in weeks:
+        sunday = (date.fromisoformat(monday) + timedelta(days=6)).isoformat()
+        week_buckets[monday] = await sum_days({"bucket": {"$gte": monday, "$lte": sunday}})
+    await write("week", week_buckets)
+    await write("total", {None: await sum_days({})})
+
+    return {"days": len(days), "weeks": len(weeks)}
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild per-user analytics rollups from metrics")
+    parser.add_argument("--user-id", help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await rebuild_analytics_rollups(db, user_id=args.user_id)
+    logger.info(f"Rollup rebuild finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Rebuild hook retention aggregates from the `metrics` collection.
+
+One aggregation pass groups every metric by (user, hook_id) and writes the
+resulting count / sum / sum-of-squares (and derived mean / variance) back
+with unordered bulk writes. Hooks that no longer have any metrics are
+reset to zero. Metrics without a resolved hook_id are left out; run
+jobs.backfill_metric_hook_ids first for older data. `hook_ids` limits the
+pass to those hooks (used after batch metric writes).
+
+Usage (from backend/):
+    python -m jobs.reconcile_hook_stats [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+async def reconcile_hook_stats(db, user_id: Optional[str] = None, hook_ids: Optional[List[str]] = None, report=None) -> dict:
+    run_id = str(uuid.uuid4())
+    match = {"user_id": user_id} if user_id else {}
+    metric_match = {**match, "hook_id": {"$in": hook_ids} if hook_ids is not None else {"$ne": None}}
+    hook_match = {**match, "id": {"$in": hook_ids}} if hook_ids is not None else match
+
+    pipeline = [
+        {"$match": metric_match},
+        {
+            "$group": {
+                "_id": {"user_id": "$user_id", "hook_id": "$hook_id"},
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$retention_percent"},
+                "sq_sum": {"$sum": {"$multiply": ["$retention_percent", "$retention_percent"]}}
+            }
+        }
+    ]
+
+    ops = []
+    groups = 0
+    updated = 0
+
+    async def flush():
+        nonlocal updated
+        if ops:
+            result = await db.hooks.bulk_write(ops, ordered=False)
+            updated += result.matched_count
+            ops.clear()
+        if report:
+            await report(groups=groups, hooks_updated=updated)
+
+    async for group in db.metrics.aggregate(pipeline, allowDiskUse=True):
+        groups += 1
+        count, total, sq_sum = group["count"], group["sum"], group["sq_sum"]
+        mean = total / count
+        ops.append(UpdateOne(
+            {"id": group["_id"]["hook_id"], "user_id": group["_id"]["user_id"]},
+            {"$set": {
+                "usage_count": count,
+                "retention_sum": total,
+                "retention_sq_sum": sq_sum,
+                "avg_retention": mean,
+                "retention_variance": max(0.0, sq_sum / count - mean * mean),
+                "stats_reconciled": run_id
+            }}
+        ))
+        if len(ops) >= BATCH_SIZE:
+            await flush()
+
+    await flush()
+
+    # Hooks whose metrics were all deleted
+    reset = await db.hooks.update_many(
+        {**hook_match, "usage_count": {"$gt": 0}, "stats_reconciled": {"$ne": run_id}},
+        {"$set": {
+            "usage_count": 0,
+            "retention_sum": 0.0,
+            "retention_sq_sum": 0.0,
+            "avg_retention": 0.0,
+            "retention_variance": 0.0
+        }}
+    )
+
+    return {"groups": groups, "hooks_updated": updated, "hooks_reset": reset.modified_count}
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild hook retention aggregates from metrics")
+    parser.add_argument("--user-id", help="Only reconcile this user's hooks")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await reconcile_hook_stats(db, user_id=args.user_id)
+    logger.info(f"Reconciliation finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
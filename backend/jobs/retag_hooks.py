@@ -0,0 +1,83 @@
+"""
+Re-run the hook classifier over the whole library.
+
+Streams every generated hook and every script through the compiled
+classifier and writes changed `hook_type`/`tags` back with unordered
+bulk writes. Manual hooks keep the type their author chose.
+
+Usage (from backend/):
+    python -m jobs.retag_hooks [--user-id USER_ID]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from utils.hook_classifier import hook_classifier
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 2000
+
+async def _retag_collection(db, collection: str, query: dict, report=None) -> dict:
+    scanned = 0
+    updated = 0
+    batch = []
+
+    async def flush():
+        nonlocal updated
+        results = hook_classifier.classify_batch((doc.get("hook_text"), doc.get("topic")) for doc in batch)
+
+        ops = []
+        for doc, (hook_type, _mode, tags) in zip(batch, results):
+            if doc.get("hook_type") != hook_type or doc.get("tags") != tags:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"hook_type": hook_type, "tags": tags}}))
+
+        if ops:
+            result = await db[collection].bulk_write(ops, ordered=False)
+            updated += result.modified_count
+        batch.clear()
+
+        if report:
+            await report(**{f"{collection}_scanned": scanned, f"{collection}_updated": updated})
+
+    cursor = db[collection].find(
+        query,
+        {"_id": 1, "hook_text": 1, "topic": 1, "hook_type": 1, "tags": 1}
+    ).batch_size(BATCH_SIZE)
+
+    async for doc in cursor:
+        batch.append(doc)
+        scanned += 1
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+
+    if batch:
+        await flush()
+
+    return {"scanned": scanned, "updated": updated}
+
+async def retag_library(db, user_id: Optional[str] = None, report=None) -> dict:
+    """Reclassify hooks and scripts (one user, or everyone when user_id is None)."""
+    base_query = {"user_id": user_id} if user_id else {}
+
+    hooks = await _retag_collection(db, "hooks", {**base_query, "source": {"$ne": "manual"}}, report)
+    scripts = await _retag_collection(db, "scripts", base_query, report)
+
+    return {"hooks": hooks, "scripts": scripts}
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reclassify hook_type/tags for the hook library")
+    parser.add_argument("--user-id", help="Only retag this user's library")
+    args = parser.parse_args()
+
+    from database import db
+
+    result = await retag_library(db, user_id=args.user_id)
+    logger.info(f"Retag finished: {result}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
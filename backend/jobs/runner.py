@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Store for running job tasks (prevents garbage collection, like video tasks)
+background_jobs = {}
+
+async def start_job(kind: str, user_id: Optional[str], func: Callable[..., Awaitable], **kwargs) -> dict:
+    """
+    Run `func(db, report=..., **kwargs)` as a tracked background job.
+    Status and progress are stored in the `jobs` collection so any worker
+    can answer GET /api/jobs/{id}.
+    """
+    from database import db
+
+    job = {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "user_id": user_id,
+        "status": "queued",
+        "progress": {},
+        "result": None,
+        "error": None,
+        "created_at": datetime.utcnow().isoformat()
+    }
+    await db.jobs.insert_one(dict(job))
+
+    async def report(**progress):
+        await db.jobs.update_one(
+            {"id": job["id"]},
+            {"$set": {f"progress.{key}": value for key, value in progress.items()}}
+        )
+
+    async def run():
+        await db.jobs.update_one({"id": job["id"]}, {"$set": {"status": "running"}})
+        try:
+            result = await func(db, report=report, **kwargs)
+            await db.jobs.update_one(
+                {"id": job["id"]},
+                {"$set": {
+                    "status": "completed",
+                    "result": result,
+                    "finished_at": datetime.utcnow().isoformat()
+                }}
+            )
+            logger.info(f"Job {kind} {job['id']} completed: {result}")
+        except Exception as e:
+            logger.error(f"Job {kind} {job['id']} failed: {str(e)}")
+            await db.jobs.update_one(
+                {"id": job["id"]},
+                {"$set": {
+                    "status": "failed",
+                    "error": str(e),
+                    "finished_at": datetime.utcnow().isoformat()
+                }}
+            )
+
+    task = asyncio.create_task(run())
+    background_jobs[job["id"]] = task
+    task.add_done_callback(lambda t: background_jobs.pop(job["id"], None))
+
+    return job
+
+async def get_job(job_id: str, user_id: str) -> Optional[dict]:
+    from database import db
+
+    return await db.jobs.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
@@ -13,6 +13,9 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+
 class TokenResponse(BaseModel):
     token: str
     user: dict
@@ -30,6 +33,7 @@ class ScriptGenerateRequest(BaseModel):
     topic: Optional[str] = None
     mode: Literal["STATE_BASED", "FAITH_EXPLICIT"] = "FAITH_EXPLICIT"
     keywords: List[str] = Field(default_factory=list)
+    dedupe: bool = True  # Regenerate/reject near-duplicate hooks
     
     @field_validator('topic')
     @classmethod
@@ -74,12 +78,17 @@ class Hook(BaseModel):
     source: Literal["generated", "pre_built", "manual"] = "generated"
     avg_retention: float = 0.0
     usage_count: int = 0
+    # Incremental retention aggregates (avg_retention/retention_variance derive from these)
+    retention_sum: float = 0.0
+    retention_sq_sum: float = 0.0
+    retention_variance: float = 0.0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 # ===== METRICS MODELS =====
 class MetricCreate(BaseModel):
     script_id: str
     hook_used: str
+    hook_id: Optional[str] = None
     views: int = 0
     likes: int = 0
     comments: int = 0
@@ -93,6 +102,8 @@ class Metric(BaseModel):
     user_id: str
     script_id: str
     hook_used: str
+    hook_id: Optional[str] = None
+    youtube_video_id: Optional[str] = None  # set for metrics written by the YouTube matching job
     views: int
     likes: int
     comments: int
@@ -108,6 +119,7 @@ class VideoGenerateRequest(BaseModel):
     voice_settings: Optional[dict] = None
     background_music: Optional[str] = None
     b_roll_search: Optional[str] = None
+    allow_over_budget: bool = False  # Skip the pre-TTS duration check
 
 class Video(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -121,6 +133,12 @@ class Video(BaseModel):
     error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class YouTubeUploadRequest(BaseModel):
+    title: Optional[str] = None  # defaults to the script's hook
+    description: Optional[str] = None  # defaults to the script text
+    tags: List[str] = Field(default_factory=list)
+    privacy_status: Literal["private", "unlisted", "public"] = "private"
+
 
 # ===== SAVED VOICE MODELS =====
 class SavedVoice(BaseModel):
@@ -50,6 +50,7 @@ class OptimizedScriptRequest(BaseModel):
     keywords: List[str] = Field(default_factory=list)
     use_analytics: bool = True  # Toggle for analytics-based optimization
     top_n_examples: int = 3  # Use top N performing examples
+    dedupe: bool = True  # Regenerate/reject near-duplicate hooks
 
 # ===== EDUCATION & INSIGHTS =====
 class AlgorithmInsight(BaseModel):
@@ -67,4 +68,16 @@ class ScriptAnalysis(BaseModel):
     open_loop_position: Optional[int] = None  # Where open loop appears
     tension_peaks: List[int] = Field(default_factory=list)  # Positions of tension
     estimated_duration: float  # Estimated duration in seconds
-    recommendations: List[str] = Field(default_factory=list)
\ No newline at end of file
+    max_duration: Optional[float] = Field(None, gt=0)  # TTS duration budget in seconds
+    within_budget: bool = True  # False = reject before TTS spend
+    recommendations: List[str] = Field(default_factory=list)
+
+class ScriptAnalyzeRequest(BaseModel):
+    """Analyze raw script text or a stored script."""
+    script: Optional[str] = None
+    script_id: Optional[str] = None
+    max_duration: Optional[float] = Field(None, gt=0)  # Override TTS budget (seconds)
+
+class ScriptAnalyzeBatchRequest(BaseModel):
+    """Analyze many scripts in one call."""
+    items: List[ScriptAnalyzeRequest] = Field(default_factory=list, max_length=500)
\ No newline at end of file
@@ -1,70 +1,64 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 import logging
-from typing import Dict, List
+from pymongo.errors import OperationFailure
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Literal, Optional
 
-from routes.auth import get_current_user
+from routes.auth import get_current_user, get_token_user
+from utils.analytics_rollups import summarize_rollup
+from utils.metric_points import COLLECTION as METRIC_POINTS, series_pipeline
+from utils.analytics_snapshot import get_analytics_snapshot
+from jobs.runner import start_job
+from jobs.rebuild_analytics_rollups import rebuild_analytics_rollups
 from database import db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("/overview")
-async def get_analytics_overview(current_user = Depends(get_current_user)):
+async def get_analytics_overview(current_user = Depends(get_token_user)):
     """
     Get aggregated analytics overview.
     Includes: total views, likes, comments, subs, avg retention, avg swipe rate.
+    Served from the user's materialized total rollup.
     """
-    pipeline = [
-        {"$match": {"user_id": current_user["id"]}},
-        {
-            "$group": {
-                "_id": None,
-                "total_views": {"$sum": "$views"},
-                "total_likes": {"$sum": "$likes"},
-                "total_comments": {"$sum": "$comments"},
-                "total_subs": {"$sum": "$subs"},
-                "avg_retention": {"$avg": "$retention_percent"},
-                "avg_swipe_rate": {"$avg": "$swipe_rate"},
-                "total_metrics": {"$sum": 1}
-            }
-        }
-    ]
-    
-    results = await db.metrics.aggregate(pipeline).to_list(length=1)
-    
-    if not results:
-        return {
-            "total_views": 0,
-            "total_likes": 0,
-            "total_comments": 0,
-            "total_subs": 0,
-            "avg_retention": 0.0,
-            "avg_swipe_rate": 0.0,
-            "total_metrics": 0
-        }
+    rollup = await db.analytics_rollups.find_one(
+        {"user_id": current_user["id"], "kind": "total", "bucket": None},
+        {"_id": 0}
+    )
     
-    data = results[0]
-    data.pop("_id", None)
+    return summarize_rollup(rollup)
+
+@router.post("/rollups/rebuild")
+async def rebuild_rollups(current_user = Depends(get_current_user)):
+    """
+    Rebuild the user's analytics rollups from metrics in the background.
+    Poll GET /api/jobs/{job_id} for progress.
+    """
+    job = await start_job("rebuild_analytics_rollups", current_user["id"], rebuild_analytics_rollups, user_id=current_user["id"])
     
-    return data
+    return {"job_id": job["id"], "status": job["status"]}
 
 @router.get("/hook-performance")
-async def get_hook_performance(current_user = Depends(get_current_user)):
+async def get_hook_performance(current_user = Depends(get_token_user)):
     """
     Get hook type performance analytics.
     Returns retention % by hook type.
     """
+    # Filter to the user's metrics first, then join on the indexed hooks.id
     pipeline = [
+        {"$match": {"user_id": current_user["id"]}},
+        {"$project": {"_id": 0, "hook_id": 1, "retention_percent": 1, "views": 1}},
         {
             "$lookup": {
                 "from": "hooks",
-                "localField": "hook_used",
-                "foreignField": "hook_text",
+                "localField": "hook_id",
+                "foreignField": "id",
+                "pipeline": [{"$project": {"_id": 0, "hook_type": 1}}],
                 "as": "hook_data"
             }
         },
         {"$unwind": {"path": "$hook_data", "preserveNullAndEmptyArrays": True}},
-        {"$match": {"user_id": current_user["id"]}},
         {
             "$group": {
                 "_id": "$hook_data.hook_type",
@@ -91,29 +85,93 @@ async def get_hook_performance(current_user = Depends(get_current_user)):
     return formatted
 
 @router.get("/time-series")
-async def get_time_series_data(current_user = Depends(get_current_user), limit: int = 10):
+async def get_time_series_data(
+    current_user = Depends(get_token_user),
+    limit: int = 10,
+    granularity: Literal["day", "week"] = "day"
+):
     """
     Get time series data for views and likes over time.
-    Returns last N metrics sorted by date.
+    Returns the last N daily (or weekly) rollup buckets, oldest first.
     """
-    metrics = await db.metrics.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0, "created_at": 1, "views": 1, "likes": 1, "retention_percent": 1}
-    ).sort("created_at", -1).limit(limit).to_list(length=limit)
+    buckets = await db.analytics_rollups.find(
+        {"user_id": current_user["id"], "kind": granularity, "count": {"$gt": 0}},
+        {"_id": 0, "bucket": 1, "views": 1, "likes": 1, "retention_sum": 1, "count": 1}
+    ).sort("bucket", -1).limit(limit).to_list(length=limit)
     
     # Reverse to show oldest first
-    metrics.reverse()
+    buckets.reverse()
+    
+    return [
+        {
+            "created_at": item["bucket"],
+            "views": item.get("views", 0),
+            "likes": item.get("likes", 0),
+            "retention_percent": item.get("retention_sum", 0.0) / item["count"],
+            "count": item["count"]
+        }
+        for item in buckets
+    ]
+
+@router.get("/series")
+async def get_metric_series(
+    current_user = Depends(get_token_user),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    unit: Literal["hour", "day", "week", "month", "quarter", "year"] = "day",
+    bin_size: int = Query(1, ge=1, le=365),
+    tz: str = "UTC"
+):
+    """
+    Bucketed metric series over an arbitrary range, computed server-side
+    from the metric_points time-series collection.
+    Defaults to the last 30 days in daily buckets.
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    # Stored dates are naive UTC
+    if end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
     
-    return metrics
+    pipeline = series_pipeline(current_user["id"], start, end, unit=unit, bin_size=bin_size, timezone=tz)
+    try:
+        buckets = await db[METRIC_POINTS].aggregate(pipeline).to_list(length=None)
+    except OperationFailure as e:
+        # e.g. unknown timezone
+        raise HTTPException(status_code=400, detail=f"Invalid series parameters: {e}")
+    
+    return {
+        "start": start,
+        "end": end,
+        "unit": unit,
+        "bin_size": bin_size,
+        "buckets": buckets
+    }
 
 @router.get("/top-hooks")
-async def get_top_hooks(current_user = Depends(get_current_user), limit: int = 10):
+async def get_top_hooks(current_user = Depends(get_token_user), limit: int = 10):
     """
     Get top performing hooks by retention.
+    Ranked by view-weighted shrunk retention across the hook's metrics
+    (score with 95% CI), so a single lucky video doesn't top the list.
     """
+    ranking = (await get_analytics_snapshot(current_user["id"])).top_hooks(limit)
+    if not ranking:
+        return []
+    
     hooks = await db.hooks.find(
-        {"user_id": current_user["id"], "usage_count": {"$gt": 0}},
+        {"user_id": current_user["id"], "id": {"$in": [item["hook_id"] for item in ranking]}},
         {"_id": 0}
-    ).sort("avg_retention", -1).limit(limit).to_list(length=limit)
+    ).to_list(length=limit)
+    by_id = {hook["id"]: hook for hook in hooks}
     
-    return hooks
\ No newline at end of file
+    # Deleted hooks drop out; keep ranking order
+    return [
+        {**by_id[item["hook_id"]], **{k: v for k, v in item.items() if k != "hook_id"}}
+        for item in ranking
+        if item["hook_id"] in by_id
+    ]
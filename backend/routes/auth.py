@@ -4,7 +4,8 @@ from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 import os
-from models import User, UserRegister, UserLogin, TokenResponse
+from models import User, UserRegister, UserLogin, UserUpdate, TokenResponse
+from utils.cache import TTLCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,17 @@ JWT_SECRET = os.getenv("JWT_SECRET", "default_secret_key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_EXPIRY_HOURS = int(os.getenv("JWT_EXPIRY_HOURS", "24"))
 
+# Authenticated user records by id, so most requests skip the users lookup.
+# Profile changes invalidate explicitly; the TTL bounds staleness across workers.
+_user_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_USER_CACHE_SECONDS", "60"))
+)
+# Read-only endpoints may trust the signed token claims (id, email) without
+# checking the user still exists; a deleted user keeps read access until the token expires
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv("AUTH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+_auth_stats = {"claims_trusted": 0}
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -31,20 +43,46 @@ def create_access_token(user_id: str, email: str) -> str:
     to_encode = {"sub": user_id, "email": email, "exp": expire}
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def _decode_token(credentials: HTTPAuthorizationCredentials) -> dict:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    payload = _decode_token(credentials)
+    user_id = payload["sub"]
+    
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        _user_cache.set(user_id, user)
+    return dict(user)
+
+async def get_token_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Dependency for read-only endpoints: with AUTH_TRUST_TOKEN_CLAIMS the
+    user comes straight from the verified token (id, email), otherwise it
+    behaves like get_current_user.
+    """
+    if not AUTH_TRUST_TOKEN_CLAIMS:
+        return await get_current_user(credentials)
+    
+    payload = _decode_token(credentials)
+    _auth_stats["claims_trusted"] += 1
+    return {"id": payload["sub"], "email": payload.get("email")}
+
+def invalidate_user(user_id: str):
+    """Drop a cached user record after its profile changed."""
+    _user_cache.invalidate(user_id)
+
+def auth_cache_stats() -> dict:
+    return {**_user_cache.stats(), "trust_token_claims": AUTH_TRUST_TOKEN_CLAIMS, **_auth_stats}
 
 @router.post("/register", response_model=TokenResponse)
 async def register(data: UserRegister):
@@ -103,4 +141,19 @@ async def get_me(current_user = Depends(get_current_user)):
         "email": current_user["email"],
         "name": current_user["name"],
         "created_at": current_user["created_at"]
-    }
\ No newline at end of file
+    }
+
+@router.put("/me")
+async def update_me(data: UserUpdate, current_user = Depends(get_current_user)):
+    updates = data.model_dump(exclude_none=True)
+    if updates:
+        await db.users.update_one({"id": current_user["id"]}, {"$set": updates})
+        invalidate_user(current_user["id"])
+    
+    user = {**current_user, **updates}
+    return {
+        "id": user["id"],
+        "email": user["email"],
+        "name": user["name"],
+        "created_at": user["created_at"]
+    }
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional, Literal
 import logging
 
 from models import Hook, HookCreate
-from routes.auth import get_current_user
+from routes.auth import get_current_user, get_token_user
+from services.dedupe_service import near_duplicate_index
+from jobs.runner import start_job
+from jobs.retag_hooks import retag_library
+from jobs.backfill_minhash_signatures import backfill_minhash_signatures
+from utils.pagination import paginate
 from database import db
 
 logger = logging.getLogger(__name__)
@@ -11,11 +16,13 @@ router = APIRouter()
 
 @router.get("", response_model=List[dict])
 async def get_hooks(
-    current_user = Depends(get_current_user),
+    response: Response,
+    current_user = Depends(get_token_user),
     hook_type: Optional[str] = None,
     mode: Optional[str] = None,
     sort_by: str = "created_at",
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
     """
     Get user's hook library with filtering and sorting.
@@ -23,6 +30,7 @@ async def get_hooks(
     - filter by hook_type: emotional_trigger, urgency, identity_filter, etc.
     - filter by mode: STATE_BASED, FAITH_EXPLICIT
     - sort_by: created_at, avg_retention, usage_count
+    - keyset-paginated: pass the X-Next-Cursor response header back as `cursor`
     """
     query = {"user_id": current_user["id"]}
     
@@ -41,13 +49,46 @@ async def get_hooks(
     elif sort_by == "usage_count":
         sort_field = "usage_count"
     
-    hooks = await db.hooks.find(
-        query,
-        {"_id": 0}
-    ).sort(sort_field, sort_order).limit(limit).to_list(length=limit)
+    hooks, _ = await paginate(db.hooks, query, limit, cursor, sort_field, sort_order, response=response)
     
     return hooks
 
+@router.get("/duplicates")
+async def get_duplicate_report(
+    current_user = Depends(get_token_user),
+    kind: Literal["hook", "script"] = "hook",
+    threshold: Optional[float] = None
+):
+    """
+    Near-duplicate report for the existing library (MinHash + LSH).
+    Returns clusters of hooks (or scripts with kind=script) whose estimated
+    similarity is above the threshold.
+    """
+    if threshold is not None and not 0.0 < threshold <= 1.0:
+        raise HTTPException(status_code=400, detail="threshold must be between 0 and 1")
+    
+    return await near_duplicate_index.duplicate_report(current_user["id"], kind, threshold)
+
+@router.post("/duplicates/backfill")
+async def backfill_duplicate_index(current_user = Depends(get_current_user)):
+    """
+    Add near-duplicate signatures for hooks and scripts stored before the index existed.
+    Poll GET /api/jobs/{job_id} for progress.
+    """
+    job = await start_job("backfill_minhash_signatures", current_user["id"], backfill_minhash_signatures, user_id=current_user["id"])
+    
+    return {"job_id": job["id"], "status": job["status"]}
+
+@router.post("/retag")
+async def retag_hooks(current_user = Depends(get_current_user)):
+    """
+    Re-run the hook classifier over the user's hooks and scripts in the background.
+    Poll GET /api/jobs/{job_id} for progress.
+    """
+    job = await start_job("retag_hooks", current_user["id"], retag_library, user_id=current_user["id"])
+    
+    return {"job_id": job["id"], "status": job["status"]}
+
 @router.post("", response_model=dict)
 async def create_hook(hook_data: HookCreate, current_user = Depends(get_current_user)):
     """
@@ -64,9 +105,9 @@ async def create_hook(hook_data: HookCreate, current_user = Depends(get_current_
     )
     
     hook_dict = hook.model_dump()
-    hook_dict['created_at'] = hook_dict['created_at'].isoformat()
     
     await db.hooks.insert_one(hook_dict)
+    await near_duplicate_index.add(current_user["id"], "hook", hook.id, hook.hook_text)
     
     return {
         "id": hook.id,
@@ -91,4 +132,6 @@ async def delete_hook(hook_id: str, current_user = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Hook not found")
     
+    await near_duplicate_index.remove(current_user["id"], "hook", hook_id)
+    
     return {"message": "Hook deleted"}
\ No newline at end of file
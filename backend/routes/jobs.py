@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Depends
+import logging
+
+from routes.auth import get_token_user
+from jobs.runner import get_job
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str, current_user = Depends(get_token_user)):
+    """
+    Get background job status and progress.
+    """
+    job = await get_job(job_id, current_user["id"])
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job
@@ -1,23 +1,44 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
 import logging
+from pymongo import ReturnDocument
 
 from models import Metric, MetricCreate
-from routes.auth import get_current_user
+from routes.auth import get_current_user, get_token_user
+from utils.hook_stats import resolve_hook_id, record_metric_added, record_metric_removed, record_metric_changed
+from utils.analytics_rollups import record_metric_rollup, record_metric_rollup_change
+from utils.metric_points import record_metric_point, delete_metric_points
+from utils.data_version import bump_data_version, METRICS_DATASET
+from jobs.runner import start_job
+from jobs.reconcile_hook_stats import reconcile_hook_stats
+from jobs.backfill_metric_hook_ids import backfill_metric_hook_ids
+from jobs.match_youtube_videos import match_youtube_videos
+from utils.pagination import paginate
 from database import db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Previous values needed to adjust hook stats and analytics rollups
+DELTA_PROJECTION = {
+    "_id": 0, "hook_used": 1, "hook_id": 1, "created_at": 1, "views": 1, "likes": 1,
+    "comments": 1, "subs": 1, "retention_percent": 1, "swipe_rate": 1
+}
+
 @router.post("", response_model=dict)
 async def create_metric(metric_data: MetricCreate, current_user = Depends(get_current_user)):
     """
     Create metric for script performance tracking.
     """
+    hook_id = await resolve_hook_id(current_user["id"], metric_data.script_id, metric_data.hook_used, metric_data.hook_id)
+    if metric_data.hook_id and hook_id is None:
+        raise HTTPException(status_code=404, detail="Hook not found")
+    
     metric = Metric(
         user_id=current_user["id"],
         script_id=metric_data.script_id,
         hook_used=metric_data.hook_used,
+        hook_id=hook_id,
         views=metric_data.views,
         likes=metric_data.likes,
         comments=metric_data.comments,
@@ -27,66 +48,113 @@ async def create_metric(metric_data: MetricCreate, current_user = Depends(get_cu
     )
     
     metric_dict = metric.model_dump()
-    metric_dict['created_at'] = metric_dict['created_at'].isoformat()
     
     await db.metrics.insert_one(metric_dict)
+    metric_dict.pop("_id", None)
     
-    # Update hook retention if exists
-    await update_hook_retention(metric_data.hook_used, metric_data.retention_percent, current_user["id"])
+    # Update hook retention aggregates (atomic, single round trip)
+    await record_metric_added(current_user["id"], hook_id, metric_data.retention_percent)
+    await record_metric_rollup(current_user["id"], metric_dict)
+    await record_metric_point(metric_dict)
+    await bump_data_version(current_user["id"], METRICS_DATASET)
     
     logger.info(f"Created metric {metric.id} for script {metric_data.script_id}")
     
     return metric_dict
 
-async def update_hook_retention(hook_text: str, retention: float, user_id: str):
+@router.get("", response_model=List[dict])
+async def get_metrics(
+    response: Response,
+    current_user = Depends(get_token_user),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
     """
-    Update hook's average retention based on new metric.
+    Get user's metrics, newest first.
+    Keyset-paginated: pass the X-Next-Cursor response header back as `cursor`.
     """
-    hook = await db.hooks.find_one({"hook_text": hook_text, "user_id": user_id})
-    
-    if hook:
-        # Simple average (can be improved with weighted average)
-        old_retention = hook.get("avg_retention", 0.0)
-        usage_count = hook.get("usage_count", 0)
-        
-        new_avg_retention = ((old_retention * usage_count) + retention) / (usage_count + 1)
-        new_usage_count = usage_count + 1
-        
-        await db.hooks.update_one(
-            {"id": hook["id"]},
-            {
-                "$set": {
-                    "avg_retention": new_avg_retention,
-                    "usage_count": new_usage_count
-                }
-            }
-        )
+    metrics, _ = await paginate(db.metrics, {"user_id": current_user["id"]}, limit, cursor, response=response)
+    
+    return metrics
 
-@router.get("", response_model=List[dict])
-async def get_metrics(current_user = Depends(get_current_user), limit: int = 50, skip: int = 0):
+@router.post("/reconcile")
+async def reconcile_metrics(current_user = Depends(get_current_user)):
     """
-    Get user's metrics with pagination.
+    Rebuild the user's hook retention aggregates from metrics in the background.
+    Poll GET /api/jobs/{job_id} for progress.
     """
-    metrics = await db.metrics.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+    job = await start_job("reconcile_hook_stats", current_user["id"], reconcile_hook_stats, user_id=current_user["id"])
     
-    return metrics
+    return {"job_id": job["id"], "status": job["status"]}
+
+@router.post("/backfill-hook-ids")
+async def backfill_hook_ids(current_user = Depends(get_current_user)):
+    """
+    Resolve hook_id on the user's older metrics in the background.
+    Poll GET /api/jobs/{job_id} for progress.
+    """
+    job = await start_job("backfill_metric_hook_ids", current_user["id"], backfill_metric_hook_ids, user_id=current_user["id"])
+    
+    return {"job_id": job["id"], "status": job["status"]}
+
+@router.post("/match-youtube")
+async def match_youtube(current_user = Depends(get_current_user)):
+    """
+    Link the user's synced YouTube videos to scripts and write their stats as metrics.
+    Poll GET /api/jobs/{job_id} for progress.
+    """
+    job = await start_job("match_youtube_videos", current_user["id"], match_youtube_videos, user_id=current_user["id"])
+    
+    return {"job_id": job["id"], "status": job["status"]}
 
 @router.put("/{metric_id}")
 async def update_metric(metric_id: str, metric_data: MetricCreate, current_user = Depends(get_current_user)):
     """
     Update metric values.
+    Hook aggregates and analytics rollups are adjusted by the difference to the previous values.
     """
     update_data = metric_data.model_dump()
+    update_data["hook_id"] = await resolve_hook_id(current_user["id"], metric_data.script_id, metric_data.hook_used, metric_data.hook_id)
+    if metric_data.hook_id and update_data["hook_id"] is None:
+        raise HTTPException(status_code=404, detail="Hook not found")
     
-    result = await db.metrics.update_one(
+    previous = await db.metrics.find_one_and_update(
         {"id": metric_id, "user_id": current_user["id"]},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=DELTA_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
     
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Metric not found")
     
-    return {"message": "Metric updated"}
\ No newline at end of file
+    await record_metric_changed(
+        current_user["id"],
+        previous.get("hook_id"), previous.get("retention_percent", 0.0),
+        update_data["hook_id"], metric_data.retention_percent
+    )
+    await record_metric_rollup_change(current_user["id"], previous, update_data)
+    await record_metric_point({**update_data, "id": metric_id, "user_id": current_user["id"]})
+    await bump_data_version(current_user["id"], METRICS_DATASET)
+    
+    return {"message": "Metric updated"}
+
+@router.delete("/{metric_id}")
+async def delete_metric(metric_id: str, current_user = Depends(get_current_user)):
+    """
+    Delete metric and remove its contribution from the hook aggregates and rollups.
+    """
+    deleted = await db.metrics.find_one_and_delete(
+        {"id": metric_id, "user_id": current_user["id"]},
+        projection=DELTA_PROJECTION
+    )
+    
+    if deleted is None:
+        raise HTTPException(status_code=404, detail="Metric not found")
+    
+    await record_metric_removed(current_user["id"], deleted.get("hook_id"), deleted.get("retention_percent", 0.0))
+    await record_metric_rollup(current_user["id"], deleted, sign=-1)
+    await delete_metric_points(current_user["id"], metric_id)
+    await bump_data_version(current_user["id"], METRICS_DATASET)
+    
+    return {"message": "Metric deleted"}
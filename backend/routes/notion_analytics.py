@@ -1,232 +1,220 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from fastapi.responses import StreamingResponse
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Literal, Optional
 import logging
+import asyncio
 import csv
+import hashlib
 import io
+import json
+import os
+import shutil
+import tempfile
+import zlib
 from datetime import datetime
 
-from models_analytics import NotionAnalyticsRow, AnalyticsData, AlgorithmInsight
-from routes.auth import get_current_user
+from models_analytics import AlgorithmInsight
+from routes.auth import get_current_user, get_token_user
+from jobs.runner import start_job
+from jobs.import_notion_csv import import_notion_csv
+from utils.data_version import get_data_version, bump_data_version, ANALYTICS_DATASET
+from utils.analytics_snapshot import get_analytics_snapshot
+from utils.pagination import paginate
 from database import db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Uploads above this size are imported in the background
+IMPORT_BACKGROUND_BYTES = int(os.getenv("NOTION_IMPORT_BACKGROUND_BYTES", str(2 * 1024 * 1024)))
+
+# Bump when the insights payload changes shape (invalidates client ETags)
+INSIGHTS_SCHEMA = "v2"
+
 @router.post("/import-csv")
-async def import_notion_csv(file: UploadFile = File(...), current_user = Depends(get_current_user)):
+async def import_notion_csv_upload(file: UploadFile = File(...), current_user = Depends(get_current_user)):
     """
     Import Notion CSV export with analytics data.
     Columns: Social File, Retention Hook, Hook Title, Dominance Line, Open Loop, 
              Close, Resolve Script, Views, Retention %, Swipe Rate, Like, Comments, Sub-2/1000 views
+    
+    Rows are upserted by Social File, so re-importing an export updates existing rows.
+    Files larger than NOTION_IMPORT_BACKGROUND_BYTES are imported as a background job:
+    the response then carries a job_id to poll via GET /api/jobs/{job_id}.
     """
     try:
-        content = await file.read()
-        decoded = content.decode('utf-8')
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        imported_count = 0
-        errors = []
-        
-        for row_num, row in enumerate(csv_reader, start=2):
-            try:
-                # Map CSV columns to model fields
-                analytics_row = NotionAnalyticsRow(
-                    social_file=row.get('Social File', '').strip(),
-                    retention_hook=row.get('Retention Hook', '').strip(),
-                    hook_title=row.get('Hook Title', '').strip(),
-                    dominance_line=row.get('Dominance Line', '').strip() or None,
-                    open_loop=row.get('Open Loop', '').strip() or None,
-                    close=row.get('Close', '').strip() or None,
-                    resolve_script=row.get('Resolve Script', '').strip(),
-                    views=int(row.get('Views', 0) or 0),
-                    retention_percent=float(row.get('Retention %', 0) or 0),
-                    swipe_rate=float(row.get('Swipe Rate', 0) or 0),
-                    likes=int(row.get('Like', 0) or 0),
-                    comments=int(row.get('Comments', 0) or 0),
-                    subs_per_1000_views=float(row.get('Sub-2/1000 views', 0) or 0),
-                    avg_watch_time=float(row.get('Avg Watch Time', 0) or 0)
-                )
-                
-                analytics_data = AnalyticsData(
-                    user_id=current_user["id"],
-                    **analytics_row.model_dump()
-                )
-                
-                data_dict = analytics_data.model_dump()
-                data_dict['created_at'] = data_dict['created_at'].isoformat()
-                
-                await db.analytics_data.insert_one(data_dict)
-                imported_count += 1
+        if file.size is not None and file.size > IMPORT_BACKGROUND_BYTES:
+            # The upload's spooled file is closed once the request ends, so hand the job its own copy
+            fd, path = tempfile.mkstemp(suffix=".csv", prefix="notion_import_")
+            with os.fdopen(fd, "wb") as target:
+                await asyncio.to_thread(shutil.copyfileobj, file.file, target)
+            
+            job = await start_job(
+                "import_notion_csv", current_user["id"], import_notion_csv,
+                user_id=current_user["id"], source=path, delete_source=True
+            )
+            logger.info(f"Queued analytics import job {job['id']} ({file.size} bytes) for user {current_user['id']}")
             
-            except Exception as e:
-                errors.append(f"Row {row_num}: {str(e)}")
-                logger.error(f"Error importing row {row_num}: {str(e)}")
+            return {"success": True, "background": True, "job_id": job["id"], "status": job["status"]}
         
-        logger.info(f"Imported {imported_count} analytics rows for user {current_user['id']}")
+        result = await import_notion_csv(db, current_user["id"], file.file)
         
-        return {
-            "success": True,
-            "imported_count": imported_count,
-            "total_rows": imported_count + len(errors),
-            "errors": errors if errors else None
-        }
+        logger.info(f"Imported {result['imported_count']} analytics rows for user {current_user['id']}")
+        
+        return {"success": True, "background": False, **result}
     
     except Exception as e:
         logger.error(f"Error importing CSV: {str(e)}")
         raise HTTPException(status_code=500, detail=f"CSV import failed: {str(e)}")
 
-@router.get("/export-csv")
-async def export_analytics_csv(current_user = Depends(get_current_user)):
-    """Export user's analytics data as CSV."""
-    try:
-        analytics = await db.analytics_data.find(
-            {"user_id": current_user["id"]},
-            {"_id": 0}
-        ).sort("retention_percent", -1).to_list(length=1000)
-        
-        if not analytics:
-            raise HTTPException(status_code=404, detail="No analytics data found")
-        
-        output = io.StringIO()
-        fieldnames = [
-            'social_file', 'retention_hook', 'hook_title', 'dominance_line',
-            'open_loop', 'close', 'resolve_script', 'views', 'swipe_rate',
-            'retention_percent', 'likes', 'comments', 'subs_per_1000_views',
-            'avg_watch_time', 'created_at'
-        ]
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
+EXPORT_FIELDS = [
+    'social_file', 'retention_hook', 'hook_title', 'dominance_line',
+    'open_loop', 'close', 'resolve_script', 'views', 'swipe_rate',
+    'retention_percent', 'likes', 'comments', 'subs_per_1000_views',
+    'avg_watch_time', 'created_at'
+]
+EXPORT_DEFAULTS = {'views': 0, 'swipe_rate': 0, 'retention_percent': 0, 'likes': 0,
+                   'comments': 0, 'subs_per_1000_views': 0, 'avg_watch_time': 0}
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+def _export_row(doc: dict) -> dict:
+    row = {field: doc.get(field, EXPORT_DEFAULTS.get(field, '')) for field in EXPORT_FIELDS}
+    if isinstance(row['created_at'], datetime):
+        row['created_at'] = row['created_at'].isoformat()
+    return row
+
+async def _export_chunks(cursor, export_format: str, compress: bool):
+    """
+    Stream the cursor as CSV or NDJSON, flushing ~64 KB chunks
+    (gzip-compressed on the fly when requested) - memory stays constant.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    buffer = io.StringIO()
+    writer = None
+    
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
         writer.writeheader()
+    
+    def drain() -> bytes:
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+    
+    async for doc in cursor:
+        row = _export_row(doc)
+        if writer:
+            writer.writerow(row)
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False))
+            buffer.write("\n")
         
-        for row in analytics:
-            writer.writerow({
-                'social_file': row.get('social_file', ''),
-                'retention_hook': row.get('retention_hook', ''),
-                'hook_title': row.get('hook_title', ''),
-                'dominance_line': row.get('dominance_line', ''),
-                'open_loop': row.get('open_loop', ''),
-                'close': row.get('close', ''),
-                'resolve_script': row.get('resolve_script', ''),
-                'views': row.get('views', 0),
-                'swipe_rate': row.get('swipe_rate', 0),
-                'retention_percent': row.get('retention_percent', 0),
-                'likes': row.get('likes', 0),
-                'comments': row.get('comments', 0),
-                'subs_per_1000_views': row.get('subs_per_1000_views', 0),
-                'avg_watch_time': row.get('avg_watch_time', 0),
-                'created_at': row.get('created_at', '')
-            })
-        
-        output.seek(0)
-        
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename=analytics_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            }
-        )
+        if buffer.tell() >= EXPORT_FLUSH_BYTES:
+            chunk = drain()
+            if chunk:
+                yield chunk
     
-    except Exception as e:
-        logger.error(f"Error exporting CSV: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"CSV export failed: {str(e)}")
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+@router.get("/export-csv")
+async def export_analytics_csv(
+    current_user = Depends(get_token_user),
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False
+):
+    """
+    Export user's analytics data as CSV (or NDJSON with format=ndjson).
+    Rows are streamed from the database cursor, so exports of any size use constant memory.
+    gzip=true compresses the stream.
+    """
+    query = {"user_id": current_user["id"]}
+    
+    if not await db.analytics_data.find_one(query, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="No analytics data found")
+    
+    cursor = db.analytics_data.find(
+        query,
+        {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+    ).sort("retention_percent", -1).batch_size(EXPORT_BATCH_SIZE)
+    
+    extension = "csv" if format == "csv" else "ndjson"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"analytics_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        _export_chunks(cursor, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.get("/insights")
-async def get_analytics_insights(current_user = Depends(get_current_user)):
+async def get_analytics_insights(request: Request, current_user = Depends(get_token_user)):
     """
     Get analytics insights with HOOK vs SCRIPT separation.
     
     Hook Effectiveness = Swipe Rate (0-3s, stay or swipe?)
     Script Effectiveness = Retention Rate (3-30s, watch till end?)
+    
+    Rankings use view-weighted Bayesian shrinkage (score + 95% CI) computed on
+    the user's in-memory analytics snapshot, so low-view rows don't outrank
+    proven ones. The ETag (analytics data version) lets unchanged dashboards
+    revalidate with a 304.
     """
     try:
-        # Top hooks by SWIPE RATE (hook effectiveness)
-        top_hooks_by_swipe = await db.analytics_data.find(
-            {"user_id": current_user["id"]},
-            {"_id": 0, "hook_title": 1, "retention_hook": 1, "swipe_rate": 1, "views": 1}
-        ).sort("swipe_rate", -1).limit(10).to_list(length=10)
-        
-        # Top scripts by RETENTION RATE (script effectiveness)
-        top_scripts_by_retention = await db.analytics_data.find(
-            {"user_id": current_user["id"]},
-            {"_id": 0, "resolve_script": 1, "retention_percent": 1, "views": 1}
-        ).sort("retention_percent", -1).limit(10).to_list(length=10)
-        
-        # Top dominance lines
-        top_dominance = await db.analytics_data.find(
-            {"user_id": current_user["id"], "dominance_line": {"$ne": None}},
-            {"_id": 0, "dominance_line": 1, "retention_percent": 1, "swipe_rate": 1}
-        ).sort("retention_percent", -1).limit(10).to_list(length=10)
+        user_id = current_user["id"]
+        version = await get_data_version(user_id, ANALYTICS_DATASET)
+        # Versions are per user and can coincide, so the tag names the user too
+        user_tag = hashlib.sha256(user_id.encode()).hexdigest()[:12]
+        etag = f'"insights-{INSIGHTS_SCHEMA}-{user_tag}-{version}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
         
-        # Top open loops
-        top_open_loops = await db.analytics_data.find(
-            {"user_id": current_user["id"], "open_loop": {"$ne": None}},
-            {"_id": 0, "open_loop": 1, "retention_percent": 1}
-        ).sort("retention_percent", -1).limit(10).to_list(length=10)
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
         
-        # Top close patterns
-        top_closes = await db.analytics_data.find(
-            {"user_id": current_user["id"], "close": {"$ne": None}},
-            {"_id": 0, "close": 1, "retention_percent": 1}
-        ).sort("retention_percent", -1).limit(10).to_list(length=10)
+        snapshot = await get_analytics_snapshot(user_id)
         
-        # Hook type performance (swipe rate by hook type)
-        hook_type_pipeline = [
-            {"$match": {"user_id": current_user["id"]}},
-            {
-                "$group": {
-                    "_id": "$retention_hook",
-                    "avg_swipe_rate": {"$avg": "$swipe_rate"},
-                    "avg_retention": {"$avg": "$retention_percent"},
-                    "total_views": {"$sum": "$views"},
-                    "count": {"$sum": 1}
-                }
-            },
-            {"$sort": {"avg_swipe_rate": -1}}
-        ]
-        
-        hook_type_performance = await db.analytics_data.aggregate(hook_type_pipeline).to_list(length=100)
-        
-        # Overall averages
-        pipeline = [
-            {"$match": {"user_id": current_user["id"]}},
-            {
-                "$group": {
-                    "_id": None,
-                    "avg_swipe_rate": {"$avg": "$swipe_rate"},
-                    "avg_retention": {"$avg": "$retention_percent"},
-                    "avg_likes": {"$avg": "$likes"},
-                    "avg_comments": {"$avg": "$comments"},
-                    "total_views": {"$sum": "$views"},
-                    "total_videos": {"$sum": 1}
-                }
-            }
-        ]
-        
-        avg_stats = await db.analytics_data.aggregate(pipeline).to_list(length=1)
-        
-        return {
+        insights = jsonable_encoder({
             "hook_effectiveness": {
-                "top_hooks_by_swipe_rate": top_hooks_by_swipe,
-                "hook_type_performance": hook_type_performance,
+                "top_hooks_by_swipe_rate": snapshot.leaderboard(
+                    "swipe_rate", ["hook_title", "retention_hook", "swipe_rate", "views"], 10
+                ),
+                "hook_type_performance": snapshot.hook_type_performance(),
                 "explanation": "Swipe Rate = Hook effectiveness (0-3s). High swipe rate = people STAY, low = people SWIPE away."
             },
             "script_effectiveness": {
-                "top_scripts_by_retention": top_scripts_by_retention,
-                "top_dominance_lines": top_dominance,
-                "top_open_loops": top_open_loops,
-                "top_close_patterns": top_closes,
+                "top_scripts_by_retention": snapshot.leaderboard(
+                    "retention_percent", ["resolve_script", "retention_percent", "views"], 10
+                ),
+                "top_dominance_lines": snapshot.leaderboard(
+                    "retention_percent", ["dominance_line", "retention_percent", "swipe_rate"], 10, require="dominance_line"
+                ),
+                "top_open_loops": snapshot.leaderboard(
+                    "retention_percent", ["open_loop", "retention_percent"], 10, require="open_loop"
+                ),
+                "top_close_patterns": snapshot.leaderboard(
+                    "retention_percent", ["close", "retention_percent"], 10, require="close"
+                ),
                 "explanation": "Retention Rate = Script effectiveness (3-30s). High retention = people watch till end."
             },
-            "average_stats": avg_stats[0] if avg_stats else None,
+            "average_stats": snapshot.average_stats(),
             "benchmarks": {
                 "swipe_rate_good": 70.0,
                 "swipe_rate_excellent": 85.0,
                 "retention_good": 60.0,
                 "retention_excellent": 75.0
             }
-        }
+        })
+        return JSONResponse(insights, headers=headers)
     
     except Exception as e:
         logger.error(f"Error getting insights: {str(e)}")
@@ -329,15 +317,19 @@ async def get_algorithm_guide():
 
 @router.get("/data", response_model=List[dict])
 async def get_analytics_data(
-    current_user = Depends(get_current_user),
-    limit: int = 100,
-    skip: int = 0
+    response: Response,
+    current_user = Depends(get_token_user),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
 ):
-    """Get user's analytics data with pagination."""
-    analytics = await db.analytics_data.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("retention_percent", -1).skip(skip).limit(limit).to_list(length=limit)
+    """
+    Get user's analytics data, best retention first.
+    Keyset-paginated: pass the X-Next-Cursor response header back as `cursor`.
+    """
+    analytics, _ = await paginate(
+        db.analytics_data, {"user_id": current_user["id"]}, limit, cursor,
+        sort_field="retention_percent", response=response
+    )
     
     return analytics
 
@@ -352,4 +344,6 @@ async def delete_analytics_data(analytics_id: str, current_user = Depends(get_cu
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Analytics data not found")
     
+    await bump_data_version(current_user["id"], ANALYTICS_DATASET)
+    
     return {"message": "Analytics data deleted"}
\ No newline at end of file
@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from datetime import datetime
+from typing import Optional
 from models import SavedVoice, SavedVoiceCreate
-from routes.auth import get_current_user
+from routes.auth import get_current_user, get_token_user
+from utils.pagination import paginate
 
 router = APIRouter(prefix="/saved-voices", tags=["saved_voices"])
 
 @router.get("")
-async def get_saved_voices(current_user: dict = Depends(get_current_user)):
-    """Get all saved voices for current user"""
+async def get_saved_voices(
+    response: Response,
+    current_user: dict = Depends(get_token_user),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    """Get saved voices for current user (keyset-paginated via X-Next-Cursor / cursor)"""
     from database import db
     
-    voices = await db.saved_voices.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
+    voices, _ = await paginate(db.saved_voices, {"user_id": current_user["id"]}, limit, cursor, response=response)
     
     return voices
 
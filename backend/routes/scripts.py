@@ -1,13 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 import logging
+import json
 from datetime import datetime
-from openai import AsyncOpenAI
 import os
 
 from models import Script, ScriptGenerateRequest, Hook
-from models_analytics import OptimizedScriptRequest
-from routes.auth import get_current_user
+from models_analytics import OptimizedScriptRequest, ScriptAnalyzeRequest, ScriptAnalyzeBatchRequest
+from routes.auth import get_current_user, get_token_user
 from utils.script_helpers import (
     extract_hook_from_script,
     detect_hook_type_and_tags,
@@ -16,137 +17,299 @@ from utils.script_helpers import (
     generate_german_script_prompt
 )
 from utils.ml_optimizer import get_top_performing_patterns, generate_optimized_prompt
+from utils.script_analysis import analyze_script, get_speaking_rate_model, MAX_TTS_DURATION
+from services.dedupe_service import near_duplicate_index
+from services.llm_gateway import llm_gateway, LLMUnavailableError
+from utils.pagination import paginate
 from database import db
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Initialize OpenAI client (optional - only if API key is set)
-openai_api_key = os.getenv("OPENAI_API_KEY")
-openai_client = AsyncOpenAI(api_key=openai_api_key) if openai_api_key else None
+# LLM calls go through the gateway (hedging, failover, circuit breaking).
+# Providers come from LLM_PROVIDERS, or OPENAI_API_KEY / LLM_MODEL by default.
 
-@router.post("/generate-optimized")
-async def generate_optimized_script(request: OptimizedScriptRequest, current_user = Depends(get_current_user)):
+# How many times to regenerate when the new hook is a near-duplicate
+MAX_DEDUPE_REGENERATIONS = int(os.getenv("DEDUPE_MAX_REGENERATIONS", "2"))
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _chat_messages(system_prompt: str, user_prompt: str) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _require_llm():
+    if not llm_gateway.available:
+        raise HTTPException(
+            status_code=503, 
+            detail="No LLM provider configured. Please set OPENAI_API_KEY or LLM_PROVIDERS environment variable."
+        )
+
+async def _build_optimized_prompts(request: OptimizedScriptRequest, user_id: str, topic: str) -> tuple:
     """
-    Generate ML-optimized script using analytics data.
-    Uses top performing hooks, dominance lines, open loops, and close patterns.
+    Build prompts for ML-optimized generation.
+    Falls back to the standard prompt (and flips request.use_analytics) when
+    the user has no analytics data yet.
     """
-    try:
-        topic = request.topic or "Glaube und innere Kraft"
+    patterns = None
+    
+    # Check if analytics optimization is enabled
+    if request.use_analytics:
+        # Get top performing patterns from analytics data
+        patterns = await get_top_performing_patterns(user_id, request.top_n_examples)
         
-        # Check if analytics optimization is enabled
-        if request.use_analytics:
-            # Get top performing patterns from analytics data
-            patterns = await get_top_performing_patterns(current_user["id"], request.top_n_examples)
-            
-            # Check if we have analytics data
-            if not patterns["top_hooks"] and not patterns["top_scripts"]:
-                logger.warning(f"No analytics data found for user {current_user['id']}, falling back to normal generation")
-                request.use_analytics = False
+        # Check if we have analytics data
+        if not patterns["top_hooks"] and not patterns["top_scripts"]:
+            logger.warning(f"No analytics data found for user {user_id}, falling back to normal generation")
+            request.use_analytics = False
+    
+    # Generate prompt
+    if request.use_analytics and patterns:
+        system_prompt, user_prompt = generate_optimized_prompt(
+            topic, request.keywords, request.mode, patterns
+        )
+        logger.info(f"Using ML-optimized prompt with {len(patterns.get('top_hooks', []))} top hooks")
+    else:
+        system_prompt, user_prompt = generate_german_script_prompt(
+            topic, request.keywords, request.mode
+        )
+        logger.info("Using standard script generation")
+    
+    return system_prompt, user_prompt
+
+async def _find_hook_duplicate(raw_text: str, user_id: str) -> Optional[tuple]:
+    """Return (hook_id, similarity) of the closest existing near-duplicate hook, if any."""
+    hook_text = extract_hook_from_script(truncate_to_length(raw_text.strip(), 350))
+    matches = await near_duplicate_index.find_duplicates(user_id, "hook", hook_text)
+    return matches[0] if matches else None
+
+async def _complete_unique(system_prompt: str, user_prompt: str, user_id: str, dedupe: bool) -> str:
+    """
+    Call the LLM and regenerate while the hook is a near-duplicate of an
+    existing one. Raises 409 when every attempt produced a duplicate.
+    """
+    attempts = 1 + (MAX_DEDUPE_REGENERATIONS if dedupe else 0)
+    duplicate = None
+    
+    for attempt in range(attempts):
+        raw_text = await llm_gateway.complete(
+            _chat_messages(system_prompt, user_prompt),
+            temperature=0.85,
+            max_tokens=200
+        )
         
-        # Generate prompt
-        if request.use_analytics and patterns:
-            system_prompt, user_prompt = generate_optimized_prompt(
-                topic, request.keywords, request.mode, patterns
-            )
-            logger.info(f"Using ML-optimized prompt with {len(patterns.get('top_hooks', []))} top hooks")
-        else:
-            system_prompt, user_prompt = generate_german_script_prompt(
-                topic, request.keywords, request.mode
-            )
-            logger.info("Using standard script generation")
+        if not dedupe:
+            return raw_text
         
-        # Check if OpenAI client is available
-        if not openai_client:
-            raise HTTPException(
-                status_code=503, 
-                detail="OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
-            )
+        duplicate = await _find_hook_duplicate(raw_text, user_id)
+        if not duplicate:
+            return raw_text
         
-        # Call OpenAI
-        response = await openai_client.chat.completions.create(
-            model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+        logger.info(f"Hook near-duplicate of {duplicate[0]} (similarity {duplicate[1]:.2f}), attempt {attempt + 1}/{attempts}")
+    
+    raise HTTPException(
+        status_code=409,
+        detail=f"Generated hook is a near-duplicate of existing hook {duplicate[0]} (similarity {duplicate[1]:.2f})"
+    )
+
+async def _save_generated_script(
+    raw_text: str,
+    user_id: str,
+    topic: str,
+    mode: str,
+    keywords: List[str],
+    ml_optimized: Optional[bool] = None
+) -> dict:
+    """
+    Post-process raw LLM output and persist it.
+    Truncates, extracts the hook, detects type/tags, saves script + hook and
+    returns the API response payload.
+    """
+    script_text = raw_text.strip()
+    
+    # Truncate if too long
+    script_text = truncate_to_length(script_text, 350)
+    
+    # Extract hook
+    hook_text = extract_hook_from_script(script_text)
+    
+    # Detect hook type and tags
+    hook_type, detected_mode, tags = detect_hook_type_and_tags(hook_text, topic)
+    
+    # Count characters
+    char_count = count_characters(script_text)
+    
+    # Create Script object
+    script = Script(
+        user_id=user_id,
+        topic=topic,
+        mode=mode,
+        script=script_text,
+        hook_text=hook_text,
+        hook_type=hook_type,
+        tags=tags,
+        character_count=char_count,
+        keywords=keywords
+    )
+    
+    # Create Hook object (auto-insert to hook library)
+    hook = Hook(
+        user_id=user_id,
+        hook_text=hook_text,
+        mode=detected_mode,
+        hook_type=hook_type,
+        tags=tags,
+        topic=topic,
+        script_id=script.id,
+        source="generated"
+    )
+    
+    # Save to database
+    script_dict = script.model_dump()
+    script_dict['hook_id'] = hook.id
+    if ml_optimized is not None:
+        script_dict['ml_optimized'] = ml_optimized  # Mark if ML-optimized
+    await db.scripts.insert_one(script_dict)
+    
+    hook_dict = hook.model_dump()
+    await db.hooks.insert_one(hook_dict)
+    
+    # Keep near-duplicate index in sync
+    await near_duplicate_index.add(user_id, "hook", hook.id, hook_text)
+    await near_duplicate_index.add(user_id, "script", script.id, script_text)
+    
+    response = {
+        "id": script.id,
+        "script": script.script,
+        "hook_text": script.hook_text,
+        "hook_type": script.hook_type,
+        "mode": script.mode,
+        "tags": script.tags,
+        "character_count": script.character_count,
+        "hook_id": hook.id,
+        "created_at": script.created_at.isoformat()
+    }
+    if ml_optimized is not None:
+        response["ml_optimized"] = ml_optimized
+    
+    return response
+
+async def _stream_script_events(
+    system_prompt: str,
+    user_prompt: str,
+    user_id: str,
+    topic: str,
+    mode: str,
+    keywords: List[str],
+    dedupe: bool = True,
+    ml_optimized: Optional[bool] = None
+):
+    """
+    SSE generator: forwards tokens as they arrive, then persists the final
+    script and emits it (with its stored id) as the last event.
+    A near-duplicate hook is not persisted; a `duplicate` event is sent instead.
+    """
+    try:
+        parts = []
+        async for token in llm_gateway.stream(
+            _chat_messages(system_prompt, user_prompt),
             temperature=0.85,
             max_tokens=200
-        )
+        ):
+            parts.append(token)
+            yield _sse_event("token", {"text": token})
         
-        script_text = response.choices[0].message.content.strip()
+        raw_text = "".join(parts)
+        if dedupe:
+            duplicate = await _find_hook_duplicate(raw_text, user_id)
+            if duplicate:
+                yield _sse_event("duplicate", {"hook_id": duplicate[0], "similarity": round(duplicate[1], 3)})
+                return
         
-        # Truncate if too long
-        script_text = truncate_to_length(script_text, 350)
+        result = await _save_generated_script(
+            raw_text, user_id, topic, mode, keywords, ml_optimized
+        )
+        logger.info(f"Streamed script {result['id']} with hook {result['hook_id']} for user {user_id}")
         
-        # Extract hook
-        hook_text = extract_hook_from_script(script_text)
+        yield _sse_event("done", result)
+    
+    except Exception as e:
+        logger.error(f"Error streaming script: {str(e)}")
+        yield _sse_event("error", {"detail": f"Error generating script: {str(e)}"})
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so tokens flush immediately
+        }
+    )
+
+@router.post("/generate-optimized")
+async def generate_optimized_script(request: OptimizedScriptRequest, current_user = Depends(get_current_user)):
+    """
+    Generate ML-optimized script using analytics data.
+    Uses top performing hooks, dominance lines, open loops, and close patterns.
+    """
+    try:
+        topic = request.topic or "Glaube und innere Kraft"
         
-        # Detect hook type and tags
-        hook_type, detected_mode, tags = detect_hook_type_and_tags(hook_text, topic)
+        system_prompt, user_prompt = await _build_optimized_prompts(request, current_user["id"], topic)
         
-        # Count characters
-        char_count = count_characters(script_text)
+        # Check if an LLM provider is configured
+        _require_llm()
         
-        # Create Script object
-        script = Script(
-            user_id=current_user["id"],
-            topic=topic,
-            mode=request.mode,
-            script=script_text,
-            hook_text=hook_text,
-            hook_type=hook_type,
-            tags=tags,
-            character_count=char_count,
-            keywords=request.keywords
-        )
+        # Call LLM (regenerates near-duplicate hooks)
+        raw_text = await _complete_unique(system_prompt, user_prompt, current_user["id"], request.dedupe)
         
-        # Create Hook object (auto-insert to hook library)
-        hook = Hook(
-            user_id=current_user["id"],
-            hook_text=hook_text,
-            mode=detected_mode,
-            hook_type=hook_type,
-            tags=tags,
-            topic=topic,
-            script_id=script.id,
-            source="generated"
+        result = await _save_generated_script(
+            raw_text,
+            current_user["id"], topic, request.mode, request.keywords,
+            ml_optimized=request.use_analytics
         )
         
-        # Save to database
-        script_dict = script.model_dump()
-        script_dict['created_at'] = script_dict['created_at'].isoformat()
-        script_dict['hook_id'] = hook.id
-        script_dict['ml_optimized'] = request.use_analytics  # Mark if ML-optimized
-        await db.scripts.insert_one(script_dict)
-        
-        hook_dict = hook.model_dump()
-        hook_dict['created_at'] = hook_dict['created_at'].isoformat()
-        await db.hooks.insert_one(hook_dict)
-        
-        logger.info(f"Generated {'ML-optimized' if request.use_analytics else 'standard'} script {script.id} with hook {hook.id}")
+        logger.info(f"Generated {'ML-optimized' if request.use_analytics else 'standard'} script {result['id']} with hook {result['hook_id']}")
         
-        return {
-            "id": script.id,
-            "script": script.script,
-            "hook_text": script.hook_text,
-            "hook_type": script.hook_type,
-            "mode": script.mode,
-            "tags": script.tags,
-            "character_count": script.character_count,
-            "hook_id": hook.id,
-            "ml_optimized": request.use_analytics,
-            "created_at": script.created_at.isoformat()
-        }
+        return result
     
+    except HTTPException:
+        raise
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating optimized script: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating script: {str(e)}")
 
+@router.post("/generate-optimized/stream")
+async def generate_optimized_script_stream(request: OptimizedScriptRequest, current_user = Depends(get_current_user)):
+    """
+    Streaming (SSE) variant of /generate-optimized.
+    Events: `token` ({text}) per chunk, then `done` with the stored script,
+    or `error` ({detail}) if generation fails mid-stream.
+    """
+    topic = request.topic or "Glaube und innere Kraft"
+    
+    system_prompt, user_prompt = await _build_optimized_prompts(request, current_user["id"], topic)
+    _require_llm()
+    
+    return _sse_response(_stream_script_events(
+        system_prompt, user_prompt,
+        current_user["id"], topic, request.mode, request.keywords,
+        dedupe=request.dedupe,
+        ml_optimized=request.use_analytics
+    ))
+
 @router.post("/generate")
 async def generate_script(request: ScriptGenerateRequest, current_user = Depends(get_current_user)):
     """
-    Generate German Faith-niche script using OpenAI GPT-4o-mini.
+    Generate German Faith-niche script via the LLM gateway (default: OpenAI GPT-4o-mini).
     Automatically extracts hook, detects type, generates tags, and saves to database.
     """
     try:
@@ -157,105 +320,121 @@ async def generate_script(request: ScriptGenerateRequest, current_user = Depends
             topic, request.keywords, request.mode
         )
         
-        # Check if OpenAI client is available
-        if not openai_client:
-            raise HTTPException(
-                status_code=503, 
-                detail="OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
-            )
-        
-        # Call OpenAI
-        response = await openai_client.chat.completions.create(
-            model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.85,
-            max_tokens=200
-        )
-        
-        script_text = response.choices[0].message.content.strip()
-        
-        # Truncate if too long
-        script_text = truncate_to_length(script_text, 350)
-        
-        # Extract hook
-        hook_text = extract_hook_from_script(script_text)
-        
-        # Detect hook type and tags
-        hook_type, detected_mode, tags = detect_hook_type_and_tags(hook_text, topic)
+        # Check if an LLM provider is configured
+        _require_llm()
         
-        # Count characters
-        char_count = count_characters(script_text)
+        # Call LLM (regenerates near-duplicate hooks)
+        raw_text = await _complete_unique(system_prompt, user_prompt, current_user["id"], request.dedupe)
         
-        # Create Script object
-        script = Script(
-            user_id=current_user["id"],
-            topic=topic,
-            mode=request.mode,
-            script=script_text,
-            hook_text=hook_text,
-            hook_type=hook_type,
-            tags=tags,
-            character_count=char_count,
-            keywords=request.keywords
+        result = await _save_generated_script(
+            raw_text,
+            current_user["id"], topic, request.mode, request.keywords
         )
         
-        # Create Hook object (auto-insert to hook library)
-        hook = Hook(
-            user_id=current_user["id"],
-            hook_text=hook_text,
-            mode=detected_mode,
-            hook_type=hook_type,
-            tags=tags,
-            topic=topic,
-            script_id=script.id,
-            source="generated"
-        )
-        
-        # Save to database
-        script_dict = script.model_dump()
-        script_dict['created_at'] = script_dict['created_at'].isoformat()
-        script_dict['hook_id'] = hook.id
-        await db.scripts.insert_one(script_dict)
-        
-        hook_dict = hook.model_dump()
-        hook_dict['created_at'] = hook_dict['created_at'].isoformat()
-        await db.hooks.insert_one(hook_dict)
+        logger.info(f"Generated script {result['id']} with hook {result['hook_id']} for user {current_user['id']}")
         
-        logger.info(f"Generated script {script.id} with hook {hook.id} for user {current_user['id']}")
-        
-        return {
-            "id": script.id,
-            "script": script.script,
-            "hook_text": script.hook_text,
-            "hook_type": script.hook_type,
-            "mode": script.mode,
-            "tags": script.tags,
-            "character_count": script.character_count,
-            "hook_id": hook.id,
-            "created_at": script.created_at.isoformat()
-        }
+        return result
     
+    except HTTPException:
+        raise
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating script: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating script: {str(e)}")
 
+@router.post("/generate/stream")
+async def generate_script_stream(request: ScriptGenerateRequest, current_user = Depends(get_current_user)):
+    """
+    Streaming (SSE) variant of /generate.
+    Events: `token` ({text}) per chunk, then `done` with the stored script,
+    or `error` ({detail}) if generation fails mid-stream.
+    """
+    topic = request.topic or "Glaube und innere Kraft"
+    
+    system_prompt, user_prompt = generate_german_script_prompt(
+        topic, request.keywords, request.mode
+    )
+    _require_llm()
+    
+    return _sse_response(_stream_script_events(
+        system_prompt, user_prompt,
+        current_user["id"], topic, request.mode, request.keywords,
+        dedupe=request.dedupe
+    ))
+
+async def _resolve_analysis_texts(items: List[ScriptAnalyzeRequest], user_id: str) -> List[Optional[str]]:
+    """Map each analyze item to its text (stored scripts fetched in one query)."""
+    script_ids = [item.script_id for item in items if item.script is None and item.script_id]
+    stored = {}
+    if script_ids:
+        cursor = db.scripts.find(
+            {"user_id": user_id, "id": {"$in": script_ids}},
+            {"_id": 0, "id": 1, "script": 1}
+        )
+        stored = {doc["id"]: doc["script"] async for doc in cursor}
+    
+    return [item.script if item.script is not None else stored.get(item.script_id) for item in items]
+
+@router.post("/analyze")
+async def analyze_script_endpoint(request: ScriptAnalyzeRequest, current_user = Depends(get_current_user)):
+    """
+    Analyze script structure and estimate spoken duration (no TTS call).
+    Accepts raw `script` text or a stored `script_id`.
+    """
+    if request.script is None and not request.script_id:
+        raise HTTPException(status_code=400, detail="Provide script or script_id")
+    
+    text = (await _resolve_analysis_texts([request], current_user["id"]))[0]
+    if text is None:
+        raise HTTPException(status_code=404, detail="Script not found")
+    
+    model = await get_speaking_rate_model(current_user["id"])
+    analysis = analyze_script(text, model, request.max_duration or MAX_TTS_DURATION)
+    
+    return {**analysis.model_dump(), "script_id": request.script_id, "speaking_rate_model": model.to_dict()}
+
+@router.post("/analyze/batch")
+async def analyze_scripts_batch(request: ScriptAnalyzeBatchRequest, current_user = Depends(get_current_user)):
+    """
+    Batch form of /analyze. Items that reference unknown scripts are
+    returned with an error instead of failing the whole batch.
+    """
+    texts = await _resolve_analysis_texts(request.items, current_user["id"])
+    model = await get_speaking_rate_model(current_user["id"])
+    
+    results = []
+    for item, text in zip(request.items, texts):
+        if text is None:
+            results.append({"script_id": item.script_id, "error": "Script not found"})
+            continue
+        analysis = analyze_script(text, model, item.max_duration or MAX_TTS_DURATION)
+        results.append({**analysis.model_dump(), "script_id": item.script_id})
+    
+    return {
+        "results": results,
+        "over_budget_count": sum(1 for r in results if r.get("within_budget") is False),
+        "speaking_rate_model": model.to_dict()
+    }
+
 @router.get("", response_model=List[dict])
-async def get_scripts(current_user = Depends(get_current_user), limit: int = 50, skip: int = 0):
+async def get_scripts(
+    response: Response,
+    current_user = Depends(get_token_user),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
     """
-    Get user's scripts with pagination.
+    Get user's scripts, newest first.
+    Keyset-paginated: pass the X-Next-Cursor response header back as `cursor`.
     """
-    scripts = await db.scripts.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+    scripts, _ = await paginate(db.scripts, {"user_id": current_user["id"]}, limit, cursor, response=response)
     
     return scripts
 
 @router.get("/{script_id}")
-async def get_script(script_id: str, current_user = Depends(get_current_user)):
+async def get_script(script_id: str, current_user = Depends(get_token_user)):
     """
     Get single script by ID.
     """
@@ -302,6 +481,8 @@ async def update_script(
         }
     )
     
+    await near_duplicate_index.add(current_user["id"], "script", script_id, new_script_text)
+    
     logger.info(f"Updated script {script_id} for user {current_user['id']}")
     
     return {
@@ -324,4 +505,6 @@ async def delete_script(script_id: str, current_user = Depends(get_current_user)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Script not found")
     
+    await near_duplicate_index.remove(current_user["id"], "script", script_id)
+    
     return {"message": "Script deleted"}
\ No newline at end of file
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+import asyncio
+import logging
+
+from routes.auth import get_token_user
+from database import db
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+# kind -> (collection, returned fields); text fields are defined by the
+# German text indexes in utils/database.py
+SEARCH_TARGETS = {
+    "script": ("scripts", ["id", "topic", "script", "hook_text", "hook_type", "mode", "tags", "created_at"]),
+    "hook": ("hooks", ["id", "hook_text", "hook_type", "mode", "tags", "source", "avg_retention", "usage_count", "created_at"]),
+    "analytics": ("analytics_data", ["id", "social_file", "hook_title", "retention_hook", "dominance_line",
+                                     "open_loop", "close", "retention_percent", "swipe_rate", "views"]),
+}
+
+async def _search_collection(kind: str, query: dict, limit: int) -> List[dict]:
+    collection, fields = SEARCH_TARGETS[kind]
+    projection = {"_id": 0, "score": {"$meta": "textScore"}, **{field: 1 for field in fields}}
+    
+    docs = await db[collection].find(query, projection).sort(
+        [("score", {"$meta": "textScore"})]
+    ).limit(limit).to_list(length=limit)
+    
+    for doc in docs:
+        doc["kind"] = kind
+    return docs
+
+@router.get("")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    current_user = Depends(get_token_user),
+    kinds: List[str] = Query(["script", "hook", "analytics"]),
+    hook_type: Optional[str] = None,
+    mode: Optional[str] = None,
+    tags: List[str] = Query([]),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Full-text search over scripts, hooks and imported analytics rows.
+    
+    - German stemming and stop words (text indexes with default_language german)
+    - "phrase in quotes" and -excluded terms follow MongoDB $text syntax
+    - filter by hook_type / mode / tags (scripts and hooks only)
+    - results are ranked by text relevance (`score`) across all kinds
+    """
+    unknown = set(kinds) - set(SEARCH_TARGETS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kinds: {', '.join(sorted(unknown))}")
+    
+    base = {"user_id": current_user["id"], "$text": {"$search": q}}
+    filters = {}
+    if hook_type:
+        filters["hook_type"] = hook_type
+    if mode:
+        filters["mode"] = mode
+    if tags:
+        filters["tags"] = {"$all": tags}
+    
+    searches = []
+    for kind in dict.fromkeys(kinds):
+        if kind == "analytics" and filters:
+            # Analytics rows have no hook_type/mode/tags
+            continue
+        searches.append(_search_collection(kind, {**base, **filters}, limit))
+    
+    results = [doc for docs in await asyncio.gather(*searches) for doc in docs]
+    results.sort(key=lambda doc: doc["score"], reverse=True)
+    
+    return {"query": q, "results": results[:limit]}
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Response
 from fastapi.responses import FileResponse
 from typing import List, Optional
 import logging
 from pathlib import Path
+from datetime import datetime
 import asyncio
 
-from models import Video, VideoGenerateRequest
-from routes.auth import get_current_user
+from models import Video, VideoGenerateRequest, YouTubeUploadRequest
+from routes.auth import get_current_user, get_token_user
 from services.video_service import VideoGenerationService
+from utils.script_analysis import analyze_script, get_speaking_rate_model
+from utils.pagination import paginate
+from services.youtube_upload import youtube_uploader, upload_metadata, upload_claimable
+from jobs.runner import start_job
 from database import db
 
 logger = logging.getLogger(__name__)
@@ -40,6 +45,21 @@ async def generate_video(
         if not script:
             raise HTTPException(status_code=404, detail="Script not found")
         
+        # Reject out-of-budget scripts before paying for TTS + encode
+        if not request.allow_over_budget:
+            model = await get_speaking_rate_model(current_user["id"])
+            analysis = analyze_script(script["script"], model)
+            if not analysis.within_budget:
+                raise HTTPException(
+                    status_code=422,
+                    detail={
+                        "message": "Script exceeds the TTS duration budget",
+                        "estimated_duration": analysis.estimated_duration,
+                        "max_duration": analysis.max_duration,
+                        "recommendations": analysis.recommendations
+                    }
+                )
+        
         # Create video record
         video = Video(
             user_id=current_user["id"],
@@ -48,7 +68,6 @@ async def generate_video(
         )
         
         video_dict = video.model_dump()
-        video_dict['created_at'] = video_dict['created_at'].isoformat()
         
         await db.videos.insert_one(video_dict)
         
@@ -84,24 +103,29 @@ async def generate_video(
             "message": "Video generation started in background"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error queuing video generation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("", response_model=List[dict])
-async def get_videos(current_user = Depends(get_current_user), limit: int = 50):
+async def get_videos(
+    response: Response,
+    current_user = Depends(get_token_user),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
     """
-    Get user's generated videos.
+    Get user's generated videos, newest first.
+    Keyset-paginated: pass the X-Next-Cursor response header back as `cursor`.
     """
-    videos = await db.videos.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit).to_list(length=limit)
+    videos, _ = await paginate(db.videos, {"user_id": current_user["id"]}, limit, cursor, response=response)
     
     return videos
 
 @router.get("/{video_id}")
-async def get_video(video_id: str, current_user = Depends(get_current_user)):
+async def get_video(video_id: str, current_user = Depends(get_token_user)):
     """
     Get video status and details.
     """
@@ -116,7 +140,7 @@ async def get_video(video_id: str, current_user = Depends(get_current_user)):
     return video
 
 @router.get("/{video_id}/download")
-async def download_video(video_id: str, current_user = Depends(get_current_user)):
+async def download_video(video_id: str, current_user = Depends(get_token_user)):
     """
     Download completed video file.
     """
@@ -140,4 +164,58 @@ async def download_video(video_id: str, current_user = Depends(get_current_user)
         path=str(video_path),
         media_type="video/mp4",
         filename=f"legyenez_{video_id[:8]}.mp4"
-    )
\ No newline at end of file
+    )
+
+@router.post("/{video_id}/youtube-upload")
+async def upload_video_to_youtube(
+    video_id: str,
+    request: YouTubeUploadRequest,
+    current_user = Depends(get_current_user)
+):
+    """
+    Upload a completed video to the connected YouTube channel (resumable, in the background).
+    Progress is kept on the video's `youtube_upload`; poll GET /api/videos/{id} or /api/jobs/{job_id}.
+    Re-posting after a failure, or after an upload stalled past its lease
+    (e.g. the worker restarted), resumes from the last acknowledged byte.
+    """
+    video = await db.videos.find_one(
+        {"id": video_id, "user_id": current_user["id"]},
+        {"_id": 0}
+    )
+    
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    if video.get("status") != "completed":
+        raise HTTPException(status_code=400, detail="Video is not ready yet")
+    
+    previous = video.get("youtube_upload")
+    now = datetime.utcnow()
+    if (previous or {}).get("status") == "completed":
+        raise HTTPException(status_code=409, detail="Video was already uploaded")
+    if not upload_claimable(previous, now):
+        raise HTTPException(status_code=409, detail="Upload already in progress")
+    
+    if not await db.youtube_connections.find_one({"user_id": current_user["id"]}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="YouTube not connected")
+    
+    script = await db.scripts.find_one({"id": video["script_id"], "user_id": current_user["id"]}, {"_id": 0}) or {"id": video["script_id"]}
+    metadata = upload_metadata(script, request.title, request.description, request.tags, request.privacy_status)
+    
+    # Claim atomically (compare-and-set on the state read above) so concurrent
+    # requests can't start two uploads. The whole sub-document is set (a dotted
+    # path can't be created under a null), keeping the stored session_uri so a
+    # failed or orphaned upload resumes where it stopped.
+    claimed = await db.videos.update_one(
+        {"id": video_id, "youtube_upload": previous},
+        {"$set": {"youtube_upload": {**(previous or {}), "status": "queued", "error": None, "updated_at": now}}}
+    )
+    if not claimed.modified_count:
+        raise HTTPException(status_code=409, detail="Upload already in progress")
+    
+    job = await start_job(
+        "youtube_upload", current_user["id"], youtube_uploader.upload_video,
+        video_id=video_id, user_id=current_user["id"], metadata=metadata
+    )
+    
+    return {"job_id": job["id"], "status": "queued"}
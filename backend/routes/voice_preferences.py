@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from datetime import datetime
 from models import VoicePreferences, VoicePreferencesCreate
-from routes.auth import get_current_user
+from routes.auth import get_current_user, get_token_user
 
 router = APIRouter()
 
 @router.get("")
-async def get_voice_preferences(current_user: dict = Depends(get_current_user)):
+async def get_voice_preferences(current_user: dict = Depends(get_token_user)):
     """Get user's voice preferences (returns default if exists)"""
     from database import db
     
@@ -5,7 +5,7 @@ import logging
 from datetime import datetime, timezone
 
 # Import routes
-from routes import auth, scripts, hooks, metrics, videos, analytics, notion_analytics, saved_voices, voice_preferences, youtube
+from routes import auth, scripts, hooks, metrics, videos, analytics, notion_analytics, saved_voices, voice_preferences, youtube, jobs, search
 from utils.database import init_database
 from database import db
 
@@ -28,6 +28,24 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@api_router.get("/health/llm")
+async def llm_health():
+    """LLM gateway metrics: per-provider latency percentiles, breaker state, hedges, cost."""
+    from services.llm_gateway import llm_gateway
+    return llm_gateway.metrics()
+
+@api_router.get("/health/youtube")
+async def youtube_health():
+    """YouTube sync scheduler state and today's Data API quota usage."""
+    from services.youtube_scheduler import youtube_scheduler
+    return await youtube_scheduler.status(db)
+
+@api_router.get("/health/auth-cache")
+async def auth_cache_health():
+    """Authenticated-user cache size and hit/miss counters."""
+    from routes.auth import auth_cache_stats
+    return auth_cache_stats()
+
 # Include all route modules
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(scripts.router, prefix="/scripts", tags=["Scripts"])
@@ -39,6 +57,8 @@ api_router.include_router(notion_analytics.router, prefix="/notion-analytics", t
 api_router.include_router(saved_voices.router, prefix="/saved-voices", tags=["Saved Voices"])
 api_router.include_router(voice_preferences.router, prefix="/voice-preferences", tags=["Voice Preferences"])
 api_router.include_router(youtube.router, tags=["YouTube"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+api_router.include_router(search.router, prefix="/search", tags=["Search"])
 
 # Include router in app
 app.include_router(api_router)
@@ -50,6 +70,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Configure logging
@@ -66,10 +87,16 @@ async def startup_event():
     await init_database(db)
     logger.info("Database initialized with indexes")
 
+    from services.youtube_scheduler import youtube_scheduler, YOUTUBE_SCHEDULER_ENABLED
+    if YOUTUBE_SCHEDULER_ENABLED:
+        youtube_scheduler.start(db)
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connection on shutdown"""
     logger.info("Shutting down LEGYENEZ API Server...")
+    from services.youtube_scheduler import youtube_scheduler
+    await youtube_scheduler.stop()
     from database import client
     client.close()
 
@@ -0,0 +1,195 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from utils.minhash import MinHashLSH, minhash_signature
+from utils.data_version import get_data_version, bump_data_version
+
+logger = logging.getLogger(__name__)
+
+# Source collection and text field per indexed kind
+INDEXED_KINDS = {
+    "hook": ("hooks", "hook_text"),
+    "script": ("scripts", "script"),
+}
+
+# Incremental refreshes re-read this much before the previous one (clock skew
+# between workers, writes still in flight); re-applying a change is harmless
+REFRESH_OVERLAP = timedelta(seconds=float(os.getenv("DEDUPE_REFRESH_OVERLAP_SECONDS", "30")))
+
+def signatures_dataset(kind: str) -> str:
+    # Data version bumped on every signature write of this kind (utils/data_version)
+    return f"minhash_{kind}"
+
+class NearDuplicateIndexService:
+    """
+    Per-user MinHash + LSH near-duplicate index for hooks and scripts.
+    - Signatures are persisted in `minhash_signatures` (with `updated_at`;
+      deletes leave a tombstone that expires after a day)
+    - Each (user, kind) index is loaded lazily into memory on first use,
+      so lookups are pure in-memory bucket probes
+    - Every signature write bumps a per-(user, kind) data version. When
+      another worker has written, only the signatures changed since the
+      last refresh are read and applied; a full reload happens only after
+      DEDUPE_INDEX_MAX_AGE_SECONDS (kept below the tombstone lifetime)
+    - Libraries created before the index existed are backfilled by
+      jobs/backfill_minhash_signatures, not on the lookup path
+    """
+
+    def __init__(self):
+        self.threshold = float(os.getenv("DEDUPE_SIMILARITY_THRESHOLD", "0.7"))
+        self.max_age = float(os.getenv("DEDUPE_INDEX_MAX_AGE_SECONDS", "3600"))
+        self._indexes: Dict[Tuple[str, str], MinHashLSH] = {}
+        # (user, kind) -> (data version the index reflects, monotonic full-load time, wall clock of last refresh)
+        self._loaded: Dict[Tuple[str, str], Tuple[int, float, datetime]] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _is_expired(self, key: Tuple[str, str]) -> bool:
+        loaded = self._loaded.get(key)
+        return key not in self._indexes or loaded is None or time.monotonic() - loaded[1] >= self.max_age
+
+    async def _get_index(self, user_id: str, kind: str) -> MinHashLSH:
+        key = (user_id, kind)
+        version = await get_data_version(user_id, signatures_dataset(kind))
+        loaded = self._loaded.get(key)
+        if loaded is not None and loaded[0] == version and not self._is_expired(key):
+            return self._indexes[key]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if self._is_expired(key):
+                synced_at = datetime.utcnow()
+                self._indexes[key] = await self._load_index(user_id, kind)
+                self._loaded[key] = (version, time.monotonic(), synced_at)
+            elif self._loaded[key][0] != version:
+                _, loaded_at, since = self._loaded[key]
+                synced_at = datetime.utcnow()
+                await self._apply_changes(self._indexes[key], user_id, kind, since - REFRESH_OVERLAP)
+                self._loaded[key] = (version, loaded_at, synced_at)
+        return self._indexes[key]
+
+    async def _signatures_changed(self, user_id: str, kind: str, index: Optional[MinHashLSH]):
+        """
+        Bump the signature version. The local index (which already holds the
+        change) stays current unless another write or a reload came in between.
+        """
+        key = (user_id, kind)
+        version = await bump_data_version(user_id, signatures_dataset(kind))
+        loaded = self._loaded.get(key)
+        if index is not None and self._indexes.get(key) is index and loaded is not None and loaded[0] == version - 1:
+            self._loaded[key] = (version, loaded[1], loaded[2])
+
+    async def _load_index(self, user_id: str, kind: str) -> MinHashLSH:
+        from database import db
+
+        index = MinHashLSH()
+        cursor = db.minhash_signatures.find(
+            {"user_id": user_id, "kind": kind, "deleted": {"$ne": True}},
+            {"_id": 0, "doc_id": 1, "signature": 1}
+        )
+        async for doc in cursor:
+            index.insert(doc["doc_id"], doc["signature"])
+
+        logger.info(f"Loaded {kind} near-duplicate index for user {user_id} ({len(index)} entries)")
+        return index
+
+    async def _apply_changes(self, index: MinHashLSH, user_id: str, kind: str, since: datetime):
+        """Apply signatures written or deleted (by any worker) since `since` to the in-memory index."""
+        from database import db
+
+        cursor = db.minhash_signatures.find(
+            {"user_id": user_id, "kind": kind, "updated_at": {"$gte": since}},
+            {"_id": 0, "doc_id": 1, "signature": 1, "deleted": 1}
+        )
+        changed = 0
+        async for doc in cursor:
+            if doc.get("deleted"):
+                index.remove(doc["doc_id"])
+            else:
+                index.insert(doc["doc_id"], doc["signature"])
+            changed += 1
+        logger.debug(f"Refreshed {kind} near-duplicate index for user {user_id} ({changed} changes)")
+
+    async def find_duplicates(
+        self,
+        user_id: str,
+        kind: str,
+        text: str,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """Return (doc_id, similarity) of existing near-duplicates, most similar first."""
+        index = await self._get_index(user_id, kind)
+        return index.query(minhash_signature(text), threshold or self.threshold)
+
+    async def add(self, user_id: str, kind: str, doc_id: str, text: str):
+        """Index a newly inserted document and persist its signature."""
+        from database import db
+
+        index = await self._get_index(user_id, kind)
+        signature = minhash_signature(text)
+        index.insert(doc_id, signature)
+
+        await db.minhash_signatures.update_one(
+            {"user_id": user_id, "kind": kind, "doc_id": doc_id},
+            {
+                "$set": {"signature": list(signature), "updated_at": datetime.utcnow()},
+                "$unset": {"deleted": "", "deleted_at": ""}
+            },
+            upsert=True
+        )
+        await self._signatures_changed(user_id, kind, index)
+
+    async def remove(self, user_id: str, kind: str, doc_id: str):
+        """Drop a deleted document from the index."""
+        from database import db
+
+        index = self._indexes.get((user_id, kind))
+        if index is not None:
+            index.remove(doc_id)
+
+        # Tombstone, so other workers' incremental refreshes see the delete
+        now = datetime.utcnow()
+        await db.minhash_signatures.update_one(
+            {"user_id": user_id, "kind": kind, "doc_id": doc_id},
+            {"$set": {"deleted": True, "updated_at": now, "deleted_at": now}, "$unset": {"signature": ""}}
+        )
+        await self._signatures_changed(user_id, kind, index)
+
+    async def duplicate_report(self, user_id: str, kind: str, threshold: Optional[float] = None) -> Dict:
+        """
+        Bulk dedupe report over the existing library.
+        Returns near-duplicate clusters with the stored text of each member.
+        """
+        from database import db
+
+        index = await self._get_index(user_id, kind)
+        clusters = index.duplicate_clusters(threshold or self.threshold)
+
+        collection, field = INDEXED_KINDS[kind]
+        ids = [doc_id for cluster in clusters for doc_id in cluster["ids"]]
+        texts = {}
+        if ids:
+            cursor = db[collection].find(
+                {"user_id": user_id, "id": {"$in": ids}},
+                {"_id": 0, "id": 1, field: 1}
+            )
+            async for doc in cursor:
+                texts[doc["id"]] = doc.get(field, "")
+
+        clusters.sort(key=lambda c: len(c["ids"]), reverse=True)
+        for cluster in clusters:
+            cluster["items"] = [{"id": doc_id, "text": texts.get(doc_id, "")} for doc_id in cluster.pop("ids")]
+
+        return {
+            "kind": kind,
+            "threshold": threshold or self.threshold,
+            "indexed_count": len(index),
+            "cluster_count": len(clusters),
+            "redundant_count": sum(len(c["items"]) - 1 for c in clusters),
+            "clusters": clusters
+        }
+
+near_duplicate_index = NearDuplicateIndexService()
@@ -0,0 +1,400 @@
+import os
+import json
+import time
+import asyncio
+import inspect
+import logging
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import litellm
+
+logger = logging.getLogger(__name__)
+
+class LLMUnavailableError(Exception):
+    """No provider is configured or every provider failed / is circuit-broken."""
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+    closed -> open after `failure_threshold` consecutive failures,
+    open -> half_open after `reset_timeout` seconds (one trial request),
+    half_open -> closed on success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release(self):
+        """Abandoned (cancelled) call: neither success nor failure."""
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    """Sliding window of recent latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(p * (len(ordered) - 1)))))
+        return ordered[index]
+
+async def _close_stream(iterator):
+    """
+    Close a streaming response so its HTTP connection is released. litellm's
+    stream wrapper may not expose aclose itself; its underlying provider
+    stream (`completion_stream`) does.
+    """
+    for target in (iterator, getattr(iterator, "completion_stream", None)):
+        for name in ("aclose", "close"):
+            close = getattr(target, name, None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.debug(f"Closing LLM stream failed: {str(e)}")
+            return
+
+class LLMProvider:
+    """One model endpoint (any litellm-supported provider or OpenAI-compatible server)."""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        api_key: Optional[str] = None,
+        api_base: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self.api_base = api_base
+        self.breaker = breaker or CircuitBreaker()
+        # Total latency of complete() calls and time-to-first-token of stream() calls
+        self.latency = LatencyTracker()
+        self.ttft = LatencyTracker()
+        self.stats = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "hedges": 0,
+            "wins": 0,
+            "cancelled": 0,
+            "cost_usd": 0.0
+        }
+
+    def tracker(self, kind: str) -> LatencyTracker:
+        return self.ttft if kind == "stream" else self.latency
+
+    def litellm_kwargs(self) -> Dict:
+        # The gateway owns retries (failover/hedging), so SDK retries are off
+        kwargs = {"model": self.model, "max_retries": 0}
+        if self.api_key:
+            kwargs["api_key"] = self.api_key
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+        return kwargs
+
+class LLMGateway:
+    """
+    LLM gateway used by script generation.
+    - Hedging: if the first provider hasn't answered within its recent
+      latency percentile, the next healthy provider is raced against it
+      (or, with no other provider left, a second request to the same one)
+    - Failover: a failed call immediately moves on to the next provider
+    - Circuit breaker per provider
+    - Latency (p50/p95/p99) and cost metrics per provider
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 1.0,
+        hedge_default_delay: float = 4.0,
+        max_parallel: int = 2,
+        timeout: float = 60.0
+    ):
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.max_parallel = max(1, max_parallel)
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        """
+        Build from environment.
+        LLM_PROVIDERS: JSON list of {"name", "model", "api_key_env", "api_base"}.
+        Without it, a single OpenAI provider is built from OPENAI_API_KEY / LLM_MODEL.
+        """
+        failure_threshold = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+        reset_timeout = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+        providers = []
+        raw = os.getenv("LLM_PROVIDERS")
+        if raw:
+            for i, conf in enumerate(json.loads(raw)):
+                providers.append(LLMProvider(
+                    name=conf.get("name") or f"provider{i}",
+                    model=conf["model"],
+                    api_key=os.getenv(conf["api_key_env"]) if conf.get("api_key_env") else conf.get("api_key"),
+                    api_base=conf.get("api_base"),
+                    breaker=CircuitBreaker(failure_threshold, reset_timeout)
+                ))
+        elif os.getenv("OPENAI_API_KEY"):
+            providers.append(LLMProvider(
+                name="openai",
+                model=os.getenv("LLM_MODEL", "gpt-4o-mini"),
+                api_key=os.getenv("OPENAI_API_KEY"),
+                api_base=os.getenv("OPENAI_BASE_URL"),
+                breaker=CircuitBreaker(failure_threshold, reset_timeout)
+            ))
+
+        return cls(
+            providers,
+            hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+            hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1.0")),
+            hedge_default_delay=float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "4.0")),
+            max_parallel=int(os.getenv("LLM_MAX_PARALLEL", "2")),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+        )
+
+    @property
+    def available(self) -> bool:
+        return bool(self.providers)
+
+    def hedge_delay(self, provider: LLMProvider, kind: str = "complete") -> float:
+        tracker = provider.tracker(kind)
+        observed = tracker.percentile(self.hedge_percentile)
+        if observed is None or len(tracker) < 10:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, observed)
+
+    async def _attempt(self, provider: LLMProvider, call: Callable[[LLMProvider], Awaitable], kind: str):
+        provider.stats["requests"] += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(provider), timeout=self.timeout)
+        except asyncio.CancelledError:
+            provider.stats["cancelled"] += 1
+            provider.breaker.release()
+            raise
+        except Exception:
+            provider.stats["failures"] += 1
+            provider.breaker.record_failure()
+            raise
+
+        provider.tracker(kind).add(time.monotonic() - start)
+        provider.stats["successes"] += 1
+        provider.breaker.record_success()
+        return result
+
+    async def _race(
+        self,
+        call: Callable[[LLMProvider], Awaitable],
+        kind: str = "complete",
+        discard: Optional[Callable[[LLMProvider, object], Awaitable]] = None
+    ) -> Tuple[LLMProvider, object]:
+        """
+        Run `call` against providers in priority order with hedging and
+        failover. `kind` ("complete" or "stream") selects the latency
+        tracker the hedge delay is based on. Results of attempts that also
+        completed but lost are handed to `discard` (to cost or close them).
+        Returns (winning provider, result).
+        """
+        if not self.providers:
+            raise LLMUnavailableError("No LLM provider configured")
+
+        queue = list(self.providers)
+        running: Dict[asyncio.Task, LLMProvider] = {}
+        errors = []
+        # Providers already hedged against themselves in this race
+        self_hedged = set()
+
+        def launch(provider: LLMProvider, hedge: bool):
+            if hedge:
+                provider.stats["hedges"] += 1
+            running[asyncio.create_task(self._attempt(provider, call, kind))] = provider
+
+        def launch_next(hedge: bool) -> bool:
+            while queue:
+                provider = queue.pop(0)
+                if provider.breaker.allow():
+                    launch(provider, hedge)
+                    return True
+            if hedge and running:
+                # No other provider left: a second request to the same one
+                # usually lands on a faster replica
+                provider = next(iter(running.values()))
+                if provider.name not in self_hedged:
+                    self_hedged.add(provider.name)
+                    if provider.breaker.allow():
+                        launch(provider, hedge)
+                    return True
+            return False
+
+        launch_next(hedge=False)
+        try:
+            while running:
+                # Hedge timer is based on the oldest in-flight provider
+                oldest = next(iter(running.values()))
+                can_hedge = len(running) < self.max_parallel and (queue or oldest.name not in self_hedged)
+                timeout = self.hedge_delay(oldest, kind) if can_hedge else None
+
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    launch_next(hedge=True)
+                    continue
+
+                winner = None
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                    provider = running.pop(task)
+                    errors.append(f"{provider.name}: {task.exception()}")
+                    logger.warning(f"LLM provider {provider.name} failed: {task.exception()}")
+
+                if winner is not None:
+                    provider = running.pop(winner)
+                    provider.stats["wins"] += 1
+                    return provider, winner.result()
+
+                # Failover: replace failed attempts right away
+                if not running:
+                    launch_next(hedge=False)
+        finally:
+            for task, provider in running.items():
+                if not task.done():
+                    task.cancel()
+                elif discard and not task.cancelled() and task.exception() is None:
+                    # Finished in the same batch as the winner
+                    await discard(provider, task.result())
+
+        if errors:
+            raise LLMUnavailableError("All LLM providers failed: " + "; ".join(errors))
+        raise LLMUnavailableError("All LLM providers are circuit-broken")
+
+    def _record_cost(self, provider: LLMProvider, response):
+        try:
+            provider.stats["cost_usd"] += litellm.completion_cost(completion_response=response) or 0.0
+        except Exception:
+            # Unknown pricing (e.g. local OpenAI-compatible servers)
+            pass
+
+    async def complete(self, messages: List[Dict], **params) -> str:
+        """Chat completion; returns the message text. Every attempt that completed is costed."""
+
+        async def call(provider: LLMProvider):
+            return await litellm.acompletion(messages=messages, **provider.litellm_kwargs(), **params)
+
+        async def discard(provider: LLMProvider, response):
+            self._record_cost(provider, response)
+
+        provider, response = await self._race(call, "complete", discard)
+        self._record_cost(provider, response)
+        return response.choices[0].message.content
+
+    async def stream(self, messages: List[Dict], **params) -> AsyncIterator[str]:
+        """
+        Streaming chat completion yielding text tokens.
+        Hedging/failover applies up to the first token (time-to-first-token);
+        after that the winning stream is consumed to the end. Losing streams
+        and the winner (also when the consumer stops early) are closed.
+        """
+
+        async def call(provider: LLMProvider):
+            response = await litellm.acompletion(messages=messages, stream=True, **provider.litellm_kwargs(), **params)
+            iterator = response.__aiter__()
+            try:
+                first = await iterator.__anext__()
+            except BaseException:
+                # Failed, or cancelled as a losing hedge
+                await _close_stream(iterator)
+                raise
+            return iterator, first
+
+        async def discard(provider: LLMProvider, result):
+            await _close_stream(result[0])
+
+        provider, (iterator, first) = await self._race(call, "stream", discard)
+
+        try:
+            chunk = first
+            while True:
+                if chunk.choices:
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        yield token
+                try:
+                    chunk = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+        finally:
+            await _close_stream(iterator)
+
+    def metrics(self) -> Dict:
+        return {
+            "providers": [
+                {
+                    "name": p.name,
+                    "model": p.model,
+                    "breaker_state": p.breaker.state,
+                    "latency_p50": p.latency.percentile(0.5),
+                    "latency_p95": p.latency.percentile(0.95),
+                    "latency_p99": p.latency.percentile(0.99),
+                    "ttft_p50": p.ttft.percentile(0.5),
+                    "ttft_p95": p.ttft.percentile(0.95),
+                    "hedge_delay": self.hedge_delay(p, "complete"),
+                    "stream_hedge_delay": self.hedge_delay(p, "stream"),
+                    **p.stats
+                }
+                for p in self.providers
+            ]
+        }
+
+llm_gateway = LLMGateway.from_env()
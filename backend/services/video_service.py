@@ -21,11 +21,15 @@ class VideoGenerationService:
         self.elevenlabs_api_key = os.getenv("ELEVENLABS_API_KEY")
         self.elevenlabs_voice_id = os.getenv("ELEVENLABS_VOICE_ID")
         self.pexels_api_key = os.getenv("PEXELS_API_KEY")
+        # Base URLs are overridable so the stand-in servers (backend/standins) can replace the real APIs
+        self.pexels_api_url = os.getenv("PEXELS_API_URL", "https://api.pexels.com")
+        self.elevenlabs_base_url = os.getenv("ELEVENLABS_BASE_URL")
+        self.openai_base_url = os.getenv("OPENAI_BASE_URL")
         self.output_dir = Path(os.getenv("VIDEO_OUTPUT_DIR", "/app/videos"))
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
         # Initialize ElevenLabs client
-        self.eleven_client = ElevenLabs(api_key=self.elevenlabs_api_key)
+        self.eleven_client = ElevenLabs(api_key=self.elevenlabs_api_key, base_url=self.elevenlabs_base_url)
     
     async def generate_video(
         self,
@@ -86,7 +90,7 @@ class VideoGenerationService:
                         "video_url": str(video_path),
                         "audio_url": str(audio_path),
                         "duration": duration,
-                        "completed_at": datetime.datetime.utcnow().isoformat()
+                        "completed_at": datetime.datetime.utcnow()
                     }
                 }
             )
@@ -252,7 +256,7 @@ class VideoGenerationService:
                 logger.warning("OpenAI API key not found, falling back to simple timing")
                 return self._fallback_timestamps(audio_path, original_text)
             
-            client = OpenAI(api_key=openai_api_key)
+            client = OpenAI(api_key=openai_api_key, base_url=self.openai_base_url)
             
             # Open audio file
             with open(audio_path, "rb") as audio_file:
@@ -386,7 +390,7 @@ class VideoGenerationService:
             
             async with aiohttp.ClientSession() as session:
                 async with session.get(
-                    "https://api.pexels.com/videos/search",
+                    f"{self.pexels_api_url}/videos/search",
                     headers=headers,
                     params=params
                 ) as response:
@@ -0,0 +1,182 @@
+"""
+Per-video daily YouTube Analytics store.
+
+Instead of asking YouTube for each video's whole history on every call,
+`day`-dimension reports are pulled for a sliding window only: from the
+video's publish date on first ingestion, afterwards from `daily_through`
+minus YOUTUBE_ANALYTICS_REVISION_DAYS (recent days are still revised by
+YouTube). Rows are upserted into `youtube_video_daily`, one document per
+(user, video, day); lifetime totals and trends are aggregated locally.
+"""
+import os
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from pymongo import UpdateOne
+
+from services.youtube_service import youtube_client
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "youtube_video_daily"
+
+# YouTube Analytics reports days in Pacific time
+ANALYTICS_TIMEZONE = ZoneInfo("America/Los_Angeles")
+YOUTUBE_ANALYTICS_REVISION_DAYS = int(os.getenv("YOUTUBE_ANALYTICS_REVISION_DAYS", "3"))
+EARLIEST_DAY = date(2020, 1, 1)
+
+DAILY_METRICS = 'views,likes,comments,estimatedMinutesWatched,averageViewDuration,averageViewPercentage,subscribersGained'
+DAILY_FIELDS = ('views', 'likes', 'comments', 'minutes_watched', 'avg_view_duration', 'avg_view_percentage', 'subscribers_gained')
+
+def analytics_today() -> date:
+    return datetime.now(ANALYTICS_TIMEZONE).date()
+
+def day_datetime(day: date) -> datetime:
+    """Stored day key (UTC midnight of the report date)."""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+def _as_date(value) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).date()
+    except ValueError:
+        return None
+
+def window_start(published_at=None, daily_through=None) -> date:
+    """First day to request for a video."""
+    through = _as_date(daily_through)
+    if through:
+        return through - timedelta(days=YOUTUBE_ANALYTICS_REVISION_DAYS)
+    return max(_as_date(published_at) or EARLIEST_DAY, EARLIEST_DAY)
+
+async def fetch_daily_rows(youtube_analytics, credentials, video_id: str, start: date, end: date) -> List[Dict]:
+    response = await youtube_client.execute(
+        youtube_analytics.reports().query(
+            ids='channel==MINE',
+            startDate=start.isoformat(),
+            endDate=end.isoformat(),
+            metrics=DAILY_METRICS,
+            dimensions='day',
+            filters=f'video=={video_id}',
+            sort='day'
+        ),
+        credentials
+    )
+    return [
+        {"day": date.fromisoformat(row[0]), **{field: row[i + 1] or 0 for i, field in enumerate(DAILY_FIELDS)}}
+        for row in response.get('rows') or []
+    ]
+
+async def ingest_daily_analytics(db, user_id: str, youtube_analytics, credentials, videos: List[Dict]) -> Dict[str, date]:
+    """
+    Pull the sliding window for each video ({video_id, published_at,
+    daily_through}) and upsert its days with one unordered bulk_write.
+    Returns the new daily_through per video.
+    """
+    if not videos:
+        return {}
+
+    end = analytics_today()
+    windows = [(video['video_id'], min(window_start(video.get('published_at'), video.get('daily_through')), end)) for video in videos]
+    results = await asyncio.gather(*(
+        fetch_daily_rows(youtube_analytics, credentials, video_id, start, end)
+        for video_id, start in windows
+    ))
+
+    ops = []
+    through = {}
+    now = datetime.now(timezone.utc)
+    for (video_id, start), rows in zip(windows, results):
+        for row in rows:
+            ops.append(UpdateOne(
+                {"user_id": user_id, "video_id": video_id, "day": day_datetime(row["day"])},
+                {"$set": {**{field: row[field] for field in DAILY_FIELDS}, "updated_at": now}},
+                upsert=True
+            ))
+        # Rows only exist for days with data; the window itself was covered
+        through[video_id] = end
+
+    if ops:
+        await db[COLLECTION].bulk_write(ops, ordered=False)
+    logger.info(f"Ingested {len(ops)} daily analytics rows for {len(videos)} videos of user {user_id}")
+    return through
+
+async def lifetime_totals(db, user_id: str, video_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> List[Dict]:
+    """Per-video totals from the daily store, most viewed first."""
+    match = {"user_id": user_id}
+    if video_ids is not None:
+        match["video_id"] = {"$in": video_ids}
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$video_id",
+            "views": {"$sum": "$views"},
+            "likes": {"$sum": "$likes"},
+            "comments": {"$sum": "$comments"},
+            "minutes_watched": {"$sum": "$minutes_watched"},
+            "weighted_percentage": {"$sum": {"$multiply": ["$views", "$avg_view_percentage"]}},
+            "subscribers_gained": {"$sum": "$subscribers_gained"}
+        }},
+        {"$sort": {"views": -1, "_id": 1}}
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+
+    totals = []
+    async for row in db[COLLECTION].aggregate(pipeline):
+        views = row["views"]
+        totals.append({
+            "video_id": row["_id"],
+            "views": views,
+            "likes": row["likes"],
+            "comments": row["comments"],
+            "avg_view_duration_seconds": (row["minutes_watched"] * 60 / views) if views else 0,
+            "retention_percentage": (row["weighted_percentage"] / views) if views else 0,
+            "subscribers_gained": row["subscribers_gained"]
+        })
+    return totals
+
+async def daily_series(db, user_id: str, video_id: Optional[str] = None, days: int = 28) -> List[Dict]:
+    """Daily views/likes/retention for one video, or summed over the channel."""
+    start = day_datetime(analytics_today() - timedelta(days=days - 1))
+    match = {"user_id": user_id, "day": {"$gte": start}}
+    if video_id:
+        match["video_id"] = video_id
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$day",
+            "views": {"$sum": "$views"},
+            "likes": {"$sum": "$likes"},
+            "comments": {"$sum": "$comments"},
+            "subscribers_gained": {"$sum": "$subscribers_gained"},
+            "minutes_watched": {"$sum": "$minutes_watched"},
+            "weighted_percentage": {"$sum": {"$multiply": ["$views", "$avg_view_percentage"]}}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "day": "$_id",
+            "views": 1,
+            "likes": 1,
+            "comments": 1,
+            "subscribers_gained": 1,
+            "minutes_watched": 1,
+            "retention_percentage": {"$cond": [
+                {"$gt": ["$views", 0]},
+                {"$divide": ["$weighted_percentage", "$views"]},
+                0
+            ]}
+        }}
+    ]
+    return await db[COLLECTION].aggregate(pipeline).to_list(length=None)
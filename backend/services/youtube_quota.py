@@ -0,0 +1,127 @@
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Daily YouTube Data API units per Google Cloud project (resets at midnight Pacific)
+YOUTUBE_QUOTA_PROJECT = os.getenv("YOUTUBE_QUOTA_PROJECT", "default")
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+# Units the scheduler leaves untouched for interactive requests
+YOUTUBE_QUOTA_RESERVE = int(os.getenv("YOUTUBE_QUOTA_RESERVE", "1000"))
+
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# Unit cost by method verb; the Analytics API has its own quota and isn't counted
+METHOD_COSTS = {
+    "list": 1,
+    "insert": 50,
+    "update": 50,
+    "delete": 50,
+    "rate": 50,
+    "set": 50,
+}
+METHOD_COST_OVERRIDES = {
+    "youtube.videos.insert": int(os.getenv("YOUTUBE_UPLOAD_QUOTA_COST", "1600")),
+    "youtube.search.list": 100,
+}
+
+def method_cost(method_id: Optional[str]) -> int:
+    """Data API units for a discovery method id such as 'youtube.videos.list'."""
+    if not method_id or not method_id.startswith("youtube."):
+        return 0
+    if method_id in METHOD_COST_OVERRIDES:
+        return METHOD_COST_OVERRIDES[method_id]
+    return METHOD_COSTS.get(method_id.rsplit(".", 1)[-1], 1)
+
+def _error_reasons(error) -> set:
+    try:
+        return {detail.get("reason") for detail in (error.error_details or []) if isinstance(detail, dict)}
+    except Exception:
+        return set()
+
+def is_quota_exceeded(error) -> bool:
+    """HttpError meaning the project's daily quota is spent."""
+    status = getattr(getattr(error, "resp", None), "status", None)
+    reasons = _error_reasons(error)
+    return status == 403 and ("quotaExceeded" in reasons or b"quotaExceeded" in (getattr(error, "content", b"") or b""))
+
+def is_rate_limited(error) -> bool:
+    """HttpError worth backing off from (429, or a 403 rate/usage limit)."""
+    status = getattr(getattr(error, "resp", None), "status", None)
+    if status == 429:
+        return True
+    return status == 403 and bool(_error_reasons(error) & {"rateLimitExceeded", "userRateLimitExceeded", "quotaExceeded"})
+
+def quota_day(now: Optional[datetime] = None) -> str:
+    """The quota day (Pacific date) a moment belongs to."""
+    return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+def next_quota_reset(now: Optional[datetime] = None) -> datetime:
+    local = (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE)
+    return (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+class QuotaTracker:
+    """
+    Counts Data API units per (project, quota day).
+
+    Calls are counted in-process and flushed to `youtube_quota` with one
+    $inc, so several workers share one budget without a round trip per call.
+    """
+
+    def __init__(self, project: str = YOUTUBE_QUOTA_PROJECT, daily_quota: int = YOUTUBE_DAILY_QUOTA):
+        self.project = project
+        self.daily_quota = daily_quota
+        self._pending: Dict[str, int] = defaultdict(int)
+        # Set when Google answers quotaExceeded; nothing is scheduled until then
+        self.exhausted_until: Optional[datetime] = None
+
+    def charge(self, method_id: Optional[str]):
+        units = method_cost(method_id)
+        if units:
+            self._pending[quota_day()] += units
+
+    def mark_exhausted(self):
+        self.exhausted_until = next_quota_reset()
+        logger.warning(f"YouTube quota exhausted for project {self.project} until {self.exhausted_until.isoformat()}")
+
+    def is_exhausted(self) -> bool:
+        if self.exhausted_until and datetime.now(QUOTA_TIMEZONE) < self.exhausted_until:
+            return True
+        self.exhausted_until = None
+        return False
+
+    async def flush(self, db):
+        pending, self._pending = self._pending, defaultdict(int)
+        for day, units in pending.items():
+            await db.youtube_quota.update_one(
+                {"project": self.project, "day": day},
+                {"$inc": {"units": units}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+
+    async def used(self, db) -> int:
+        day = quota_day()
+        doc = await db.youtube_quota.find_one({"project": self.project, "day": day}, {"_id": 0, "units": 1})
+        return (doc["units"] if doc else 0) + self._pending.get(day, 0)
+
+    async def remaining(self, db) -> int:
+        if self.is_exhausted():
+            return 0
+        return max(0, self.daily_quota - await self.used(db))
+
+    async def status(self, db) -> Dict:
+        used = await self.used(db)
+        return {
+            "project": self.project,
+            "day": quota_day(),
+            "daily_quota": self.daily_quota,
+            "used": used,
+            "remaining": 0 if self.is_exhausted() else max(0, self.daily_quota - used),
+            "exhausted_until": self.exhausted_until.isoformat() if self.exhausted_until else None
+        }
+
+quota_tracker = QuotaTracker()
@@ -0,0 +1,128 @@
+"""
+Audience retention curves for Shorts.
+
+Each curve is YouTube Analytics' audienceWatchRatio by
+elapsedVideoTimeRatio, resampled onto a fixed grid of CURVE_POINTS
+positions (1%..100% of the video) and stored in youtube_videos as a
+little-endian float16 byte string (200 bytes per video). Derived metrics
+- true retention at 3 seconds (the swipe rate) and the drop-off points -
+are computed for all of a user's videos at once as one NumPy matrix.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.youtube_service import youtube_client, parse_duration_seconds
+
+logger = logging.getLogger(__name__)
+
+CURVE_POINTS = 100
+CURVE_DTYPE = np.dtype('<f2')
+CURVE_GRID = np.arange(1, CURVE_POINTS + 1, dtype=np.float64) / CURVE_POINTS
+
+SWIPE_SECONDS = 3.0
+
+def encode_curve(ratios: np.ndarray, watch_ratios: np.ndarray) -> bytes:
+    """Resample (elapsedVideoTimeRatio, audienceWatchRatio) points onto the grid."""
+    order = np.argsort(ratios)
+    resampled = np.interp(CURVE_GRID, ratios[order], watch_ratios[order])
+    return resampled.astype(CURVE_DTYPE).tobytes()
+
+def decode_curves(blobs: List[bytes]) -> np.ndarray:
+    """Stack stored curves into an (n, CURVE_POINTS) float32 matrix."""
+    if not blobs:
+        return np.empty((0, CURVE_POINTS), dtype=np.float32)
+    return np.frombuffer(b''.join(blobs), dtype=CURVE_DTYPE).reshape(len(blobs), CURVE_POINTS).astype(np.float32)
+
+def curve_metrics(curves: np.ndarray, durations: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Per-video metrics for an (n, CURVE_POINTS) matrix of watch ratios and
+    the videos' durations in seconds:
+      retention_3s       share of viewers still watching at 3s (percent, capped at 100)
+      drop_off_ratio     position of the steepest drop (0..1 of the video)
+      half_retention_ratio  first position below half the starting audience (NaN if never)
+    """
+    n = curves.shape[0]
+    rows = np.arange(n)
+    durations = np.maximum(durations.astype(np.float64), 1.0)
+
+    # Linear interpolation at 3s: grid point i sits at (i + 1) / CURVE_POINTS
+    position = np.clip(SWIPE_SECONDS / durations * CURVE_POINTS - 1, 0, CURVE_POINTS - 1)
+    lo = np.floor(position).astype(np.int64)
+    hi = np.minimum(lo + 1, CURVE_POINTS - 1)
+    weight = position - lo
+    at_3s = curves[rows, lo] * (1 - weight) + curves[rows, hi] * weight
+
+    steepest = np.argmin(np.diff(curves, axis=1), axis=1) if n else np.empty(0, dtype=np.int64)
+
+    below_half = curves <= (curves[:, :1] * 0.5)
+    has_half = below_half.any(axis=1)
+    half = np.where(has_half, (np.argmax(below_half, axis=1) + 1) / CURVE_POINTS, np.nan)
+
+    return {
+        "retention_3s": np.minimum(at_3s, 1.0) * 100,
+        "drop_off_ratio": (steepest + 1.5) / CURVE_POINTS,
+        "half_retention_ratio": half,
+    }
+
+async def fetch_retention_curve(youtube_analytics, credentials, video_id: str, start_date: str, end_date: str) -> Optional[bytes]:
+    response = await youtube_client.execute(
+        youtube_analytics.reports().query(
+            ids='channel==MINE',
+            startDate=start_date,
+            endDate=end_date,
+            metrics='audienceWatchRatio',
+            dimensions='elapsedVideoTimeRatio',
+            filters=f'video=={video_id}'
+        ),
+        credentials
+    )
+    rows = response.get('rows') or []
+    if not rows:
+        return None
+    points = np.array(rows, dtype=np.float64)
+    return encode_curve(points[:, 0], points[:, 1])
+
+async def fetch_retention_curves(youtube_analytics, credentials, video_ids: List[str], start_date: str, end_date: str) -> Dict[str, bytes]:
+    curves = await asyncio.gather(*(
+        fetch_retention_curve(youtube_analytics, credentials, video_id, start_date, end_date)
+        for video_id in video_ids
+    ))
+    return {video_id: curve for video_id, curve in zip(video_ids, curves) if curve is not None}
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+def retention_fields(video_ids: List[str], blobs: List[bytes], durations: List[float]) -> Dict[str, Dict]:
+    """Stored per-video fields (swipe_rate = true 3s retention, drop-off points) for a batch of curves."""
+    if not video_ids:
+        return {}
+    seconds = np.array(durations, dtype=np.float64)
+    metrics = curve_metrics(decode_curves(blobs), seconds)
+    return {
+        video_id: {
+            "swipe_rate": round(float(metrics["retention_3s"][i]), 2),
+            "swipe_rate_source": "curve",
+            "drop_off_ratio": _optional(metrics["drop_off_ratio"][i]),
+            "drop_off_seconds": _optional(metrics["drop_off_ratio"][i] * seconds[i]),
+            "half_retention_ratio": _optional(metrics["half_retention_ratio"][i]),
+        }
+        for i, video_id in enumerate(video_ids)
+    }
+
+async def compute_retention_metrics(db, user_id: str) -> List[Dict]:
+    """Decode every stored curve of the user and derive the metrics in one pass."""
+    docs = await db.youtube_videos.find(
+        {"user_id": user_id, "retention_curve": {"$exists": True}},
+        {"_id": 0, "video_id": 1, "title": 1, "duration": 1, "retention_curve": 1}
+    ).to_list(length=None)
+
+    fields = await asyncio.to_thread(
+        retention_fields,
+        [doc["video_id"] for doc in docs],
+        [bytes(doc["retention_curve"]) for doc in docs],
+        [parse_duration_seconds(doc.get("duration") or "") for doc in docs]
+    )
+    return [{"video_id": doc["video_id"], "title": doc.get("title"), **fields[doc["video_id"]]} for doc in docs]
@@ -0,0 +1,231 @@
+"""
+Background sync of every connected YouTube channel.
+
+Each connection carries `sync_schedule.next_sync_at`. The scheduler wakes
+every YOUTUBE_SCHEDULER_TICK_SECONDS, picks due channels (recent uploaders
+first), claims each one with a conditional update so several workers never
+sync the same channel, and runs the incremental sync while the project's
+daily Data API budget allows. The next run is pushed out by an interval
+that depends on how recently the channel uploaded, plus jitter; 403/429
+responses back off exponentially, and quotaExceeded pauses everything
+until the quota resets. Channels with changes are matched to scripts
+afterwards (jobs/match_youtube_videos).
+"""
+import os
+import math
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from googleapiclient.errors import HttpError
+
+from services.youtube_quota import quota_tracker, is_quota_exceeded, is_rate_limited, YOUTUBE_QUOTA_RESERVE
+from services.youtube_sync import sync_youtube_channel
+from jobs.match_youtube_videos import match_youtube_videos
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_SCHEDULER_ENABLED = os.getenv("YOUTUBE_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+YOUTUBE_SCHEDULER_TICK_SECONDS = float(os.getenv("YOUTUBE_SCHEDULER_TICK_SECONDS", "60"))
+YOUTUBE_SCHEDULER_CONCURRENCY = int(os.getenv("YOUTUBE_SCHEDULER_CONCURRENCY", "4"))
+# Due channels considered per tick
+YOUTUBE_SCHEDULER_BATCH = int(os.getenv("YOUTUBE_SCHEDULER_BATCH", "50"))
+
+# (uploaded within, sync every) - first match wins
+SYNC_INTERVALS = [
+    (timedelta(days=2), timedelta(hours=1)),
+    (timedelta(days=14), timedelta(hours=4)),
+    (timedelta(days=90), timedelta(hours=12)),
+]
+DORMANT_INTERVAL = timedelta(hours=24)
+JITTER_FRACTION = 0.2
+# A claimed channel is re-eligible after this if its worker died mid-sync
+CLAIM_LEASE = timedelta(minutes=30)
+MAX_BACKOFF = timedelta(hours=12)
+BASE_BACKOFF = timedelta(minutes=5)
+
+def _parse_rfc3339(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def sync_interval(connection: Dict, now: datetime) -> timedelta:
+    last_upload = _parse_rfc3339((connection.get("sync_state") or {}).get("last_published_at"))
+    if last_upload:
+        age = now - last_upload
+        for within, interval in SYNC_INTERVALS:
+            if age <= within:
+                return interval
+    return DORMANT_INTERVAL
+
+def with_jitter(interval: timedelta) -> timedelta:
+    return interval * (1 + random.uniform(0, JITTER_FRACTION))
+
+def estimated_cost(connection: Dict) -> int:
+    """Data API units an incremental sync is expected to spend."""
+    checked = (connection.get("sync_state") or {}).get("last_checked") or 50
+    pages = math.ceil(checked / 50)
+    # channels.list + playlist pages + videos.list batches
+    return 1 + 2 * pages
+
+def _as_aware(value: Optional[datetime]) -> Optional[datetime]:
+    # Mongo hands back naive UTC datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+class YouTubeSyncScheduler:
+    def __init__(self, tick_seconds: float = YOUTUBE_SCHEDULER_TICK_SECONDS, concurrency: int = YOUTUBE_SCHEDULER_CONCURRENCY):
+        self.tick_seconds = tick_seconds
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"runs": 0, "synced": 0, "failed": 0, "backed_off": 0, "skipped_for_quota": 0, "last_tick": None}
+
+    def start(self, db):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(db))
+            logger.info("YouTube sync scheduler started")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self, db):
+        # Jittered first tick so restarted workers don't all fire at once
+        await asyncio.sleep(random.uniform(0, self.tick_seconds))
+        while True:
+            try:
+                await self.tick(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"YouTube scheduler tick failed: {str(e)}")
+            await asyncio.sleep(self.tick_seconds)
+
+    async def tick(self, db) -> int:
+        """Sync the channels that are due now; returns how many were synced."""
+        now = datetime.now(timezone.utc)
+        self.stats["last_tick"] = now.isoformat()
+        if quota_tracker.is_exhausted():
+            return 0
+
+        # Channels that uploaded most recently go first; sorted in the query so the
+        # batch limit keeps the right ones (index: last_published_at, next_sync_at)
+        due = await db.youtube_connections.find(
+            {"$or": [
+                {"sync_schedule.next_sync_at": {"$lte": now}},
+                {"sync_schedule.next_sync_at": None}
+            ]},
+            {"_id": 0, "user_id": 1, "sync_state": 1, "sync_schedule": 1}
+        ).sort("sync_state.last_published_at", -1).limit(YOUTUBE_SCHEDULER_BATCH).to_list(length=YOUTUBE_SCHEDULER_BATCH)
+
+        budget = await quota_tracker.remaining(db) - YOUTUBE_QUOTA_RESERVE
+        selected = []
+        for connection in due:
+            cost = estimated_cost(connection)
+            if cost > budget:
+                self.stats["skipped_for_quota"] += 1
+                continue
+            budget -= cost
+            selected.append(connection)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(connection):
+            async with semaphore:
+                return await self.sync_one(db, connection, now)
+
+        results = await asyncio.gather(*(run(c) for c in selected))
+        await quota_tracker.flush(db)
+        return sum(1 for synced in results if synced)
+
+    async def _claim(self, db, connection: Dict, now: datetime) -> bool:
+        """Take the channel for this worker (compare-and-set on next_sync_at)."""
+        previous = (connection.get("sync_schedule") or {}).get("next_sync_at")
+        # None matches both a missing and a null next_sync_at
+        condition = {"user_id": connection["user_id"], "sync_schedule.next_sync_at": previous}
+
+        result = await db.youtube_connections.update_one(
+            condition,
+            {"$set": {"sync_schedule.next_sync_at": now + CLAIM_LEASE}}
+        )
+        return result.modified_count == 1
+
+    async def sync_one(self, db, connection: Dict, now: datetime) -> bool:
+        if not await self._claim(db, connection, now):
+            return False
+
+        user_id = connection["user_id"]
+        schedule = dict(connection.get("sync_schedule") or {})
+        self.stats["runs"] += 1
+        try:
+            result = await sync_youtube_channel(db, user_id)
+            if result and result["synced_count"]:
+                # Feed the changed stats into metrics without manual entry
+                await match_youtube_videos(db, user_id=user_id)
+        except HttpError as e:
+            if is_quota_exceeded(e):
+                quota_tracker.mark_exhausted()
+                schedule["next_sync_at"] = quota_tracker.exhausted_until.astimezone(timezone.utc)
+            elif is_rate_limited(e):
+                schedule = self._back_off(schedule, now, f"HTTP {e.resp.status}")
+                self.stats["backed_off"] += 1
+            else:
+                schedule = self._back_off(schedule, now, str(e))
+                self.stats["failed"] += 1
+            await self._save_schedule(db, user_id, schedule)
+            logger.warning(f"Scheduled YouTube sync for {user_id} failed: {str(e)}")
+            return False
+        except Exception as e:
+            schedule = self._back_off(schedule, now, str(e))
+            self.stats["failed"] += 1
+            await self._save_schedule(db, user_id, schedule)
+            logger.error(f"Scheduled YouTube sync for {user_id} failed: {str(e)}")
+            return False
+
+        # Re-read: the sync just moved the upload watermark
+        refreshed = await db.youtube_connections.find_one({"user_id": user_id}, {"_id": 0, "sync_state": 1}) or connection
+        schedule.update(
+            next_sync_at=now + with_jitter(sync_interval(refreshed, now)),
+            failures=0,
+            last_error=None,
+            last_success_at=now
+        )
+        await self._save_schedule(db, user_id, schedule)
+        self.stats["synced"] += 1
+        return True
+
+    def _back_off(self, schedule: Dict, now: datetime, error: str) -> Dict:
+        failures = (schedule.get("failures") or 0) + 1
+        delay = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** (failures - 1)))
+        schedule.update(
+            next_sync_at=now + with_jitter(delay),
+            failures=failures,
+            last_error=error[:500],
+            last_failure_at=now
+        )
+        return schedule
+
+    async def _save_schedule(self, db, user_id: str, schedule: Dict):
+        schedule["next_sync_at"] = _as_aware(schedule.get("next_sync_at"))
+        await db.youtube_connections.update_one({"user_id": user_id}, {"$set": {"sync_schedule": schedule}})
+
+    async def status(self, db) -> Dict:
+        return {
+            "enabled": YOUTUBE_SCHEDULER_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "stats": dict(self.stats),
+            "quota": await quota_tracker.status(db)
+        }
+
+youtube_scheduler = YouTubeSyncScheduler()
@@ -0,0 +1,288 @@
+import os
+import re
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from google.oauth2.credentials import Credentials
+
+from services.youtube_quota import quota_tracker, is_quota_exceeded
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# googleapiclient is blocking; all calls run on this pool, never on the event loop
+YOUTUBE_MAX_WORKERS = int(os.getenv("YOUTUBE_MAX_WORKERS", "8"))
+# Upper bound on in-flight Google API calls across all requests
+YOUTUBE_MAX_CONCURRENCY = int(os.getenv("YOUTUBE_MAX_CONCURRENCY", str(YOUTUBE_MAX_WORKERS)))
+YOUTUBE_NUM_RETRIES = int(os.getenv("YOUTUBE_NUM_RETRIES", "2"))
+YOUTUBE_HTTP_TIMEOUT = float(os.getenv("YOUTUBE_HTTP_TIMEOUT_SECONDS", "30"))
+
+# API endpoint overrides (e.g. the local stand-in servers in backend/standins)
+GOOGLE_TOKEN_URI = os.environ.get("GOOGLE_TOKEN_URI", "https://oauth2.googleapis.com/token")
+YOUTUBE_API_ENDPOINT = os.environ.get("YOUTUBE_API_ENDPOINT")
+YOUTUBE_ANALYTICS_API_ENDPOINT = os.environ.get("YOUTUBE_ANALYTICS_API_ENDPOINT")
+
+# Discovery clients are credential-free (every request is executed with its
+# own AuthorizedHttp), so one parsed client per API serves all users
+_discovery_clients: Dict[str, object] = {}
+_discovery_lock = threading.Lock()
+
+def _discovery_client(service: str, version: str, endpoint: Optional[str]):
+    key = f"{service}:{version}"
+    client = _discovery_clients.get(key)
+    if client is None:
+        with _discovery_lock:
+            client = _discovery_clients.get(key)
+            if client is None:
+                client = build(
+                    service, version,
+                    http=httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT),
+                    static_discovery=True,  # bundled discovery document, no fetch
+                    cache_discovery=False,
+                    client_options={"api_endpoint": endpoint} if endpoint else None
+                )
+                _discovery_clients[key] = client
+    return client
+
+def build_youtube(credentials=None):
+    """YouTube Data API v3 client (endpoint overridable via YOUTUBE_API_ENDPOINT)"""
+    return _discovery_client('youtube', 'v3', YOUTUBE_API_ENDPOINT)
+
+def build_youtube_analytics(credentials=None):
+    """YouTube Analytics API v2 client (endpoint overridable via YOUTUBE_ANALYTICS_API_ENDPOINT)"""
+    return _discovery_client('youtubeAnalytics', 'v2', YOUTUBE_ANALYTICS_API_ENDPOINT)
+
+# user_id -> Credentials, so refreshed access tokens are reused across requests
+_credentials_cache = TTLCache(
+    maxsize=int(os.getenv("YOUTUBE_CREDENTIALS_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("YOUTUBE_CREDENTIALS_CACHE_SECONDS", "3600"))
+)
+# Credentials -> owning user_id, to persist tokens refreshed during a call
+_credential_owners: "weakref.WeakKeyDictionary[Credentials, str]" = weakref.WeakKeyDictionary()
+
+def get_youtube_credentials(connection: dict):
+    """Credentials for a stored connection (cached per user until its refresh token changes)"""
+    creds_data = connection['credentials']
+    user_id = connection.get('user_id')
+    cached = _credentials_cache.get(user_id) if user_id else None
+    if cached is not None and cached.refresh_token == creds_data['refresh_token']:
+        return cached
+
+    credentials = Credentials(
+        token=creds_data['token'],
+        refresh_token=creds_data['refresh_token'],
+        token_uri=os.environ.get("GOOGLE_TOKEN_URI", creds_data['token_uri']),
+        client_id=creds_data['client_id'],
+        client_secret=creds_data['client_secret'],
+        scopes=creds_data['scopes'],
+        expiry=creds_data.get('expiry')  # lets google-auth refresh before expiry instead of after a 401
+    )
+    if user_id:
+        _credentials_cache.set(user_id, credentials)
+        _credential_owners[credentials] = user_id
+    return credentials
+
+def invalidate_youtube_credentials(user_id: str):
+    """Drop the cached credentials (reconnect / disconnect)"""
+    _credentials_cache.invalidate(user_id)
+
+async def persist_refreshed_token(user_id: str, credentials):
+    """Write a refreshed access token back, unless a newer one is already stored."""
+    from database import db
+
+    expiry = credentials.expiry
+    query = {"user_id": user_id, "credentials.refresh_token": credentials.refresh_token}
+    if expiry is not None:
+        query["$or"] = [{"credentials.expiry": {"$lt": expiry}}, {"credentials.expiry": None}]
+    await db.youtube_connections.update_one(
+        query,
+        {"$set": {"credentials.token": credentials.token, "credentials.expiry": expiry}}
+    )
+    logger.info(f"Persisted refreshed YouTube token for user {user_id}")
+
+def parse_video(video: dict) -> dict:
+    """videos().list item -> stored/returned video fields"""
+    # Parse duration to check if it's a Short (< 60 seconds)
+    duration = video['contentDetails']['duration']
+    is_short = parse_duration_seconds(duration) <= 60
+    
+    return {
+        "video_id": video['id'],
+        "title": video['snippet']['title'],
+        "description": video['snippet']['description'][:500] if video['snippet']['description'] else "",
+        "thumbnail": video['snippet']['thumbnails'].get('high', {}).get('url', ''),
+        "published_at": video['snippet']['publishedAt'],
+        "duration": duration,
+        "is_short": is_short,
+        "view_count": int(video['statistics'].get('viewCount', 0)),
+        "like_count": int(video['statistics'].get('likeCount', 0)),
+        "comment_count": int(video['statistics'].get('commentCount', 0)),
+    }
+
+def parse_duration_seconds(duration: str) -> int:
+    """Parse ISO 8601 duration to seconds"""
+    match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration)
+    if not match:
+        return 0
+    hours = int(match.group(1) or 0)
+    minutes = int(match.group(2) or 0)
+    seconds = int(match.group(3) or 0)
+    return hours * 3600 + minutes * 60 + seconds
+
+class YouTubeClient:
+    """
+    Runs googleapiclient requests on a dedicated thread pool.
+    httplib2 isn't thread-safe, so every call gets its own authorized Http.
+    """
+
+    def __init__(self, max_workers: int = YOUTUBE_MAX_WORKERS, max_concurrency: int = YOUTUBE_MAX_CONCURRENCY):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="youtube")
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run any blocking Google client call (e.g. flow.fetch_token) on the pool."""
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def execute(self, request, credentials) -> Dict:
+        """Execute an HttpRequest built from a discovery client (charged to the quota tracker)."""
+        def call():
+            http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT))
+            return request.execute(http=http, num_retries=YOUTUBE_NUM_RETRIES)
+
+        quota_tracker.charge(getattr(request, 'methodId', None))
+        token = credentials.token
+        try:
+            return await self.run(call)
+        except HttpError as e:
+            if is_quota_exceeded(e):
+                quota_tracker.mark_exhausted()
+            raise
+        finally:
+            owner = _credential_owners.get(credentials)
+            if owner and credentials.token != token:
+                try:
+                    await persist_refreshed_token(owner, credentials)
+                except Exception as e:
+                    logger.error(f"Failed to persist refreshed YouTube token for user {owner}: {str(e)}")
+
+    async def list_channel_videos(self, youtube, credentials, max_results: int, parse_video: Callable[[Dict], Dict]) -> List[Dict]:
+        """
+        Walk the channel's uploads playlist and fetch statistics per page.
+        Page tokens are inherently sequential, so each page's videos().list
+        call is started as soon as the page arrives and runs while the next
+        page is fetched; results keep playlist order.
+        """
+        channel_response = await self.execute(
+            youtube.channels().list(part='contentDetails', mine=True),
+            credentials
+        )
+        uploads_playlist_id = channel_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+        stats_tasks = []
+        fetched = 0
+        next_page_token = None
+
+        try:
+            while fetched < max_results:
+                playlist_response = await self.execute(
+                    youtube.playlistItems().list(
+                        part='snippet,contentDetails',
+                        playlistId=uploads_playlist_id,
+                        maxResults=min(50, max_results - fetched),
+                        pageToken=next_page_token
+                    ),
+                    credentials
+                )
+
+                video_ids = [item['contentDetails']['videoId'] for item in playlist_response['items']]
+                fetched += len(video_ids)
+
+                if video_ids:
+                    stats_tasks.append(asyncio.create_task(self.execute(
+                        youtube.videos().list(part='snippet,statistics,contentDetails', id=','.join(video_ids)),
+                        credentials
+                    )))
+
+                next_page_token = playlist_response.get('nextPageToken')
+                if not next_page_token or not video_ids:
+                    break
+
+            pages = await asyncio.gather(*stats_tasks)
+        except BaseException:
+            for task in stats_tasks:
+                task.cancel()
+            raise
+
+        return [parse_video(video) for page in pages for video in page['items']]
+
+    async def list_upload_ids(
+        self,
+        youtube,
+        credentials,
+        published_after: Optional[str] = None,
+        max_results: int = 500
+    ) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        (uploads playlist id, [(video_id, videoPublishedAt)]) newest first,
+        stopping at the first upload published at or before `published_after`
+        (RFC 3339 strings compare chronologically).
+        """
+        channel_response = await self.execute(
+            youtube.channels().list(part='contentDetails', mine=True),
+            credentials
+        )
+        uploads_playlist_id = channel_response['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+
+        uploads = []
+        next_page_token = None
+        while len(uploads) < max_results:
+            page = await self.execute(
+                youtube.playlistItems().list(
+                    part='contentDetails',
+                    playlistId=uploads_playlist_id,
+                    maxResults=min(50, max_results - len(uploads)),
+                    pageToken=next_page_token
+                ),
+                credentials
+            )
+            for item in page['items']:
+                published = item['contentDetails'].get('videoPublishedAt', '')
+                if published_after and published and published <= published_after:
+                    return uploads_playlist_id, uploads
+                uploads.append((item['contentDetails']['videoId'], published))
+
+            next_page_token = page.get('nextPageToken')
+            if not next_page_token or not page['items']:
+                break
+
+        return uploads_playlist_id, uploads
+
+    async def get_videos(self, youtube, credentials, video_ids: List[str], part: str = 'snippet,statistics,contentDetails') -> List[Dict]:
+        """videos().list for any number of ids (concurrent batches of 50)."""
+        batches = [video_ids[i:i + 50] for i in range(0, len(video_ids), 50)]
+        pages = await asyncio.gather(*(
+            self.execute(youtube.videos().list(part=part, id=','.join(batch)), credentials)
+            for batch in batches
+        ))
+        return [video for page in pages for video in page['items']]
+
+youtube_client = YouTubeClient()
@@ -0,0 +1,176 @@
+"""
+Incremental YouTube channel sync.
+
+Each connection keeps a watermark (`sync_state.last_published_at`, the
+newest upload seen). A sync walks the uploads playlist only back to
+min(watermark, now - YOUTUBE_SYNC_REFRESH_DAYS): new uploads plus a recent
+window whose statistics still move. Of those, only videos whose etag
+differs from the stored one get their daily analytics window ingested
+(services/youtube_daily) and are written, all in a single unordered
+bulk_write. Changed Shorts also get their audience retention curve
+(services/youtube_retention) for a true 3-second swipe rate.
+`full=True` ignores the watermark and re-walks the whole channel, as
+does the first sync of a connection, which has no watermark yet.
+"""
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from services.youtube_quota import quota_tracker
+from services.youtube_daily import ingest_daily_analytics, lifetime_totals, day_datetime, analytics_today
+from services.youtube_retention import fetch_retention_curves, retention_fields
+from services.youtube_service import (
+    youtube_client, build_youtube, build_youtube_analytics, get_youtube_credentials,
+    parse_video, parse_duration_seconds
+)
+
+logger = logging.getLogger(__name__)
+
+# Videos younger than this are re-checked on every sync
+YOUTUBE_SYNC_REFRESH_DAYS = int(os.getenv("YOUTUBE_SYNC_REFRESH_DAYS", "28"))
+YOUTUBE_SYNC_MAX_VIDEOS = int(os.getenv("YOUTUBE_SYNC_MAX_VIDEOS", "500"))
+def _rfc3339(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def merge_video(user_id: str, video: dict, video_analytics: dict, synced_at: datetime) -> dict:
+    merged_data = {
+        **parse_video(video),
+        "etag": video.get('etag'),
+        "retention_percentage": video_analytics.get('retention_percentage', 0),
+        "avg_view_duration_seconds": video_analytics.get('avg_view_duration_seconds', 0),
+        "subscribers_gained": video_analytics.get('subscribers_gained', 0),
+        "user_id": user_id,
+        "synced_at": synced_at
+    }
+
+    # Swipe rate (for shorts: share still watching at 3 seconds). Replaced by
+    # the retention curve's value when YouTube has one for the video.
+    if merged_data['is_short'] and parse_duration_seconds(merged_data['duration']) > 0:
+        merged_data['swipe_rate'] = merged_data['retention_percentage']
+        merged_data['swipe_rate_source'] = "estimate"
+
+    return merged_data
+
+async def sync_youtube_channel(db, user_id: str, full: bool = False, report=None) -> Optional[dict]:
+    """
+    Sync new and changed videos of the user's channel into youtube_videos.
+    Returns None if the user has no connection.
+    """
+    connection = await db.youtube_connections.find_one({"user_id": user_id})
+    if not connection:
+        return None
+
+    credentials = get_youtube_credentials(connection)
+    youtube = build_youtube(credentials)
+    youtube_analytics = build_youtube_analytics(credentials)
+    now = datetime.now(timezone.utc)
+
+    watermark = (connection.get('sync_state') or {}).get('last_published_at')
+    if not watermark:
+        # First sync: walk the whole channel (still capped at YOUTUBE_SYNC_MAX_VIDEOS)
+        full = True
+    cutoff = _rfc3339(now - timedelta(days=YOUTUBE_SYNC_REFRESH_DAYS))
+    if watermark:
+        cutoff = min(cutoff, watermark)
+
+    _, uploads = await youtube_client.list_upload_ids(
+        youtube, credentials,
+        published_after=None if full else cutoff,
+        max_results=YOUTUBE_SYNC_MAX_VIDEOS
+    )
+    candidate_ids = [video_id for video_id, _ in uploads]
+    if report:
+        await report(candidates=len(candidate_ids))
+
+    videos = await youtube_client.get_videos(youtube, credentials, candidate_ids)
+
+    stored = await db.youtube_videos.find(
+        {"user_id": user_id, "video_id": {"$in": candidate_ids}},
+        {"_id": 0, "video_id": 1, "etag": 1, "daily_through": 1}
+    ).to_list(length=None)
+    stored = {doc["video_id"]: doc for doc in stored}
+
+    changed = [
+        video for video in videos
+        if video.get('etag') is None or (stored.get(video['id']) or {}).get('etag') != video['etag']
+    ]
+
+    # Daily rows for the changed videos' windows, then lifetime totals from the local store
+    through = await ingest_daily_analytics(
+        db, user_id,
+        youtube_analytics,
+        credentials,
+        [
+            {
+                "video_id": video['id'],
+                "published_at": video['snippet']['publishedAt'],
+                "daily_through": (stored.get(video['id']) or {}).get('daily_through')
+            }
+            for video in changed
+        ]
+    )
+    analytics = {row['video_id']: row for row in await lifetime_totals(db, user_id, list(through))}
+
+    synced_videos = []
+    for video in changed:
+        merged = merge_video(user_id, video, analytics.get(video['id'], {}), now)
+        merged['daily_through'] = day_datetime(through[video['id']])
+        synced_videos.append(merged)
+
+    # Real retention curves for the changed Shorts -> true 3s swipe rate and drop-off points
+    shorts = [merged for merged in synced_videos if merged['is_short']]
+    curves = await fetch_retention_curves(
+        youtube_analytics,
+        credentials,
+        [merged['video_id'] for merged in shorts],
+        '2020-01-01',
+        analytics_today().isoformat()
+    )
+    curve_videos = [merged for merged in shorts if merged['video_id'] in curves]
+    curve_fields = retention_fields(
+        [merged['video_id'] for merged in curve_videos],
+        [curves[merged['video_id']] for merged in curve_videos],
+        [parse_duration_seconds(merged['duration']) for merged in curve_videos]
+    )
+
+    if synced_videos:
+        await db.youtube_videos.bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id, "video_id": merged["video_id"]},
+                    {"$set": {
+                        **merged,
+                        **curve_fields.get(merged["video_id"], {}),
+                        **({"retention_curve": curves[merged["video_id"]]} if merged["video_id"] in curves else {})
+                    }},
+                    upsert=True
+                )
+                for merged in synced_videos
+            ],
+            ordered=False
+        )
+        for merged in synced_videos:
+            merged.update(curve_fields.get(merged["video_id"], {}))
+
+    newest = max((published for _, published in uploads if published), default=None)
+    sync_state = dict(connection.get('sync_state') or {})
+    if newest and (not sync_state.get('last_published_at') or newest > sync_state['last_published_at']):
+        sync_state['last_published_at'] = newest
+    sync_state['last_checked'] = len(candidate_ids)
+    sync_state['last_changed'] = len(synced_videos)
+
+    await db.youtube_connections.update_one(
+        {"user_id": user_id},
+        {"$set": {"last_sync": now, "sync_state": sync_state}}
+    )
+
+    await quota_tracker.flush(db)
+
+    if report:
+        await report(candidates=len(candidate_ids), synced=len(synced_videos))
+    logger.info(f"YouTube sync for {user_id}: {len(candidate_ids)} checked, {len(synced_videos)} changed")
+
+    return {"checked_count": len(candidate_ids), "synced_count": len(synced_videos), "videos": synced_videos}
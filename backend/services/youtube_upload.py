@@ -0,0 +1,296 @@
+"""
+Resumable uploads of finished renders to YouTube.
+
+Implements the Data API resumable protocol directly on aiohttp: one POST
+opens an upload session, then the MP4 is streamed from disk in
+YOUTUBE_UPLOAD_CHUNK_BYTES pieces with Content-Range PUTs. After a
+failure the session is asked how far it got (`bytes */total`) and the
+upload continues from the last acknowledged byte; an expired session is
+reopened from scratch. Progress lives on the video document
+(`youtube_upload`), so an upload interrupted by a restart resumes from the
+stored session: a queued/uploading upload whose progress hasn't moved for
+YOUTUBE_UPLOAD_LEASE_MINUTES is taken to be orphaned and can be re-posted. Uploads run concurrently up to YOUTUBE_UPLOAD_CONCURRENCY
+and only while the day's quota covers a videos.insert.
+"""
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+import httplib2
+from google_auth_httplib2 import Request as AuthRequest
+
+from services.youtube_quota import quota_tracker, method_cost
+from services.youtube_service import youtube_client, get_youtube_credentials, persist_refreshed_token
+
+logger = logging.getLogger(__name__)
+
+# Overridable so the stand-in server (backend/standins, /youtube-upload) can replace it
+YOUTUBE_UPLOAD_ENDPOINT = os.getenv("YOUTUBE_UPLOAD_ENDPOINT", "https://www.googleapis.com")
+# Must be a multiple of 256 KiB
+YOUTUBE_UPLOAD_CHUNK_BYTES = int(os.getenv("YOUTUBE_UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+YOUTUBE_UPLOAD_CONCURRENCY = int(os.getenv("YOUTUBE_UPLOAD_CONCURRENCY", "2"))
+YOUTUBE_UPLOAD_MAX_RETRIES = int(os.getenv("YOUTUBE_UPLOAD_MAX_RETRIES", "8"))
+# Expired sessions replaced per run; each new session is charged as a videos.insert
+YOUTUBE_UPLOAD_MAX_REOPENS = int(os.getenv("YOUTUBE_UPLOAD_MAX_REOPENS", "2"))
+YOUTUBE_UPLOAD_TIMEOUT = float(os.getenv("YOUTUBE_UPLOAD_TIMEOUT_SECONDS", "300"))
+# An in-flight upload without progress for this long belongs to a dead worker
+YOUTUBE_UPLOAD_LEASE = timedelta(minutes=float(os.getenv("YOUTUBE_UPLOAD_LEASE_MINUTES", "30")))
+
+UPLOAD_METHOD = "youtube.videos.insert"
+RETRIABLE_STATUSES = {500, 502, 503, 504}
+
+class UploadError(Exception):
+    """Upload failed for a reason retrying won't fix."""
+
+class UploadSessionExpired(Exception):
+    """The resumable session is gone (404/410); a new one must be opened."""
+
+def _acknowledged(response: aiohttp.ClientResponse) -> int:
+    """Next byte to send after a 308: one past the end of the Range header."""
+    header = response.headers.get("Range")
+    if not header:
+        return 0
+    return int(header.rsplit("-", 1)[-1]) + 1
+
+async def _error_detail(response: aiohttp.ClientResponse) -> str:
+    try:
+        return (await response.json()).get("error", {}).get("message") or response.reason
+    except Exception:
+        return response.reason or str(response.status)
+
+def upload_claimable(state: Optional[Dict], now: datetime) -> bool:
+    """
+    Whether an upload may be (re)started for a video's `youtube_upload`:
+    never started, failed, or queued/uploading past its lease.
+    """
+    status = (state or {}).get("status")
+    if status in (None, "failed"):
+        return True
+    if status in ("queued", "uploading"):
+        updated_at = state.get("updated_at")
+        return updated_at is None or updated_at < now - YOUTUBE_UPLOAD_LEASE
+    return False
+
+class ResumableUpload:
+    """One video's upload session."""
+
+    def __init__(self, session: aiohttp.ClientSession, credentials, user_id: str, path: Path, metadata: Dict,
+                 session_uri: Optional[str] = None, on_progress=None):
+        self.session = session
+        self.credentials = credentials
+        self.user_id = user_id
+        self.path = path
+        self.metadata = metadata
+        self.total = path.stat().st_size
+        self.session_uri = session_uri
+        self.offset = 0
+        self.reopens = 0
+        self.on_progress = on_progress
+
+    async def _headers(self, extra: Optional[Dict] = None) -> Dict:
+        if not self.credentials.valid:
+            token = self.credentials.token
+            await youtube_client.run(self.credentials.refresh, AuthRequest(httplib2.Http()))
+            if self.credentials.token != token:
+                await persist_refreshed_token(self.user_id, self.credentials)
+        return {"Authorization": f"Bearer {self.credentials.token}", **(extra or {})}
+
+    async def open(self):
+        quota_tracker.charge(UPLOAD_METHOD)
+        async with self.session.post(
+            f"{YOUTUBE_UPLOAD_ENDPOINT}/upload/youtube/v3/videos",
+            params={"uploadType": "resumable", "part": "snippet,status"},
+            json=self.metadata,
+            headers=await self._headers({
+                "X-Upload-Content-Type": "video/mp4",
+                "X-Upload-Content-Length": str(self.total)
+            })
+        ) as response:
+            if response.status == 403 and "quota" in (await _error_detail(response)).lower():
+                quota_tracker.mark_exhausted()
+            if response.status != 200 or "Location" not in response.headers:
+                raise UploadError(f"Could not open upload session: HTTP {response.status} {await _error_detail(response)}")
+            self.session_uri = response.headers["Location"]
+            self.offset = 0
+
+    async def reopen(self):
+        """Replace a session that expired during this run, a bounded number of times."""
+        self.reopens += 1
+        if self.reopens > YOUTUBE_UPLOAD_MAX_REOPENS:
+            raise UploadError(f"Upload session expired {self.reopens} times, giving up")
+        logger.warning(f"Upload session for {self.path.name} expired, starting over")
+        await self.open()
+
+    async def query_offset(self):
+        """Ask the session how many bytes it has (after an interruption)."""
+        async with self.session.put(
+            self.session_uri,
+            headers=await self._headers({"Content-Range": f"bytes */{self.total}", "Content-Length": "0"})
+        ) as response:
+            if response.status in (404, 410):
+                raise UploadSessionExpired()
+            if response.status in (200, 201):
+                return await response.json()
+            if response.status != 308:
+                raise aiohttp.ClientResponseError(response.request_info, (), status=response.status)
+            self.offset = _acknowledged(response)
+        return None
+
+    def _read_chunk(self, offset: int) -> bytes:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(YOUTUBE_UPLOAD_CHUNK_BYTES)
+
+    async def send_chunk(self) -> Optional[Dict]:
+        """Send the chunk at the current offset; returns the video resource once complete."""
+        chunk = await asyncio.to_thread(self._read_chunk, self.offset)
+        end = self.offset + len(chunk) - 1
+        async with self.session.put(
+            self.session_uri,
+            data=chunk,
+            headers=await self._headers({"Content-Range": f"bytes {self.offset}-{end}/{self.total}"})
+        ) as response:
+            if response.status in (200, 201):
+                return await response.json()
+            if response.status == 308:
+                self.offset = _acknowledged(response)
+                return None
+            if response.status in (404, 410):
+                raise UploadSessionExpired()
+            if response.status == 401:
+                self.credentials.expiry = datetime.utcnow()  # force a refresh on the next request
+            if response.status in RETRIABLE_STATUSES or response.status in (401, 429):
+                raise aiohttp.ClientResponseError(response.request_info, (), status=response.status)
+            raise UploadError(f"HTTP {response.status}: {await _error_detail(response)}")
+
+    async def run(self) -> Dict:
+        if self.session_uri:
+            try:
+                video = await self.query_offset()
+                if video:
+                    return video
+            except UploadSessionExpired:
+                self.session_uri = None
+        if not self.session_uri:
+            await self.open()
+
+        failures = 0
+        while True:
+            try:
+                video = await self.send_chunk()
+                if video:
+                    return video
+                failures = 0
+                if self.on_progress:
+                    await self.on_progress(self.session_uri, self.offset, self.total)
+            except UploadSessionExpired:
+                await self.reopen()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                failures += 1
+                if failures > YOUTUBE_UPLOAD_MAX_RETRIES:
+                    raise UploadError(f"Giving up after {failures} failed attempts: {str(e)}")
+                await asyncio.sleep(min(60, 2 ** failures))
+                try:
+                    video = await self.query_offset()
+                    if video:
+                        return video
+                except UploadSessionExpired:
+                    await self.reopen()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass  # try the chunk again at the offset we know
+                logger.info(f"Resuming upload of {self.path.name} at byte {self.offset}/{self.total}")
+
+class YouTubeUploader:
+    def __init__(self, concurrency: int = YOUTUBE_UPLOAD_CONCURRENCY):
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def upload_video(self, db, video_id: str, user_id: str, metadata: Dict, report=None) -> Dict:
+        """Upload one rendered video; status is kept in videos.youtube_upload."""
+        video = await db.videos.find_one({"id": video_id, "user_id": user_id}, {"_id": 0})
+        connection = await db.youtube_connections.find_one({"user_id": user_id})
+        if not video or not connection:
+            raise UploadError("Video or YouTube connection not found")
+
+        path = Path(video.get("video_url") or "")
+        if not path.exists():
+            raise UploadError("Video file not found")
+
+        async def set_status(**fields):
+            # Merged in a pipeline update: dotted $set paths fail while youtube_upload is null
+            fields["updated_at"] = datetime.utcnow()
+            await db.videos.update_one(
+                {"id": video_id},
+                [{"$set": {"youtube_upload": {"$mergeObjects": [
+                    {"$ifNull": ["$youtube_upload", {}]},
+                    {k: {"$literal": v} for k, v in fields.items()}
+                ]}}}]
+            )
+
+        async def on_progress(session_uri: str, offset: int, total: int):
+            await set_status(status="uploading", session_uri=session_uri, bytes_sent=offset, total_bytes=total)
+            if report:
+                await report(bytes_sent=offset, total_bytes=total)
+
+        async with self.semaphore:
+            if await quota_tracker.remaining(db) < method_cost(UPLOAD_METHOD):
+                await set_status(status="failed", error="YouTube API quota exhausted for today")
+                raise UploadError("YouTube API quota exhausted for today")
+
+            await set_status(status="uploading", error=None, started_at=datetime.utcnow())
+            previous = video.get("youtube_upload") or {}
+            try:
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=YOUTUBE_UPLOAD_TIMEOUT)) as session:
+                    upload = ResumableUpload(
+                        session,
+                        get_youtube_credentials(connection),
+                        user_id,
+                        path,
+                        metadata,
+                        session_uri=previous.get("session_uri"),
+                        on_progress=on_progress
+                    )
+                    result = await upload.run()
+            except Exception as e:
+                await set_status(status="failed", error=str(e))
+                raise
+            finally:
+                await quota_tracker.flush(db)
+
+        await set_status(
+            status="completed",
+            youtube_video_id=result["id"],
+            bytes_sent=upload.total,
+            total_bytes=upload.total,
+            session_uri=None,
+            completed_at=datetime.utcnow()
+        )
+        logger.info(f"Uploaded video {video_id} to YouTube as {result['id']}")
+        return {"video_id": video_id, "youtube_video_id": result["id"], "bytes": upload.total}
+
+def upload_metadata(script: Dict, title: Optional[str], description: Optional[str], tags: List[str], privacy_status: str) -> Dict:
+    """videos.insert body; the description carries the lgy:<script id> tag used to match stats back."""
+    hook = (script.get("hook_text") or script.get("topic") or "").strip()
+    body = (description if description is not None else script.get("script", ""))[:4500]
+    return {
+        "snippet": {
+            "title": (title or hook or "Short")[:100],
+            "description": f"{body}\n\nlgy:{script['id']}",
+            "tags": tags or script.get("tags") or [],
+            "categoryId": "22"
+        },
+        "status": {"privacyStatus": privacy_status, "selfDeclaredMadeForKids": False}
+    }
+
+youtube_uploader = YouTubeUploader()
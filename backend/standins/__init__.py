@@ -0,0 +1,18 @@
+"""
+Local stand-in servers for every external API the backend calls
+(OpenAI chat + Whisper, ElevenLabs, Pexels, Google OAuth / YouTube Data /
+YouTube Analytics), plus a load generator.
+
+Run from backend/:
+    python -m standins --port 9100 [--latency-ms 80 --error-rate 0.01 --recordings ./recordings]
+    python -m standins.loadgen --base-url http://localhost:8001 --rps 50 --duration 60
+
+Point the backend at it with:
+    OPENAI_BASE_URL=http://localhost:9100/openai/v1
+    ELEVENLABS_BASE_URL=http://localhost:9100/elevenlabs
+    PEXELS_API_URL=http://localhost:9100/pexels
+    GOOGLE_AUTH_URI=http://localhost:9100/google-oauth/auth
+    GOOGLE_TOKEN_URI=http://localhost:9100/google-oauth/token
+    YOUTUBE_API_ENDPOINT=http://localhost:9100/youtube/
+    YOUTUBE_ANALYTICS_API_ENDPOINT=http://localhost:9100/youtube-analytics/
+"""
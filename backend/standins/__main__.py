@@ -0,0 +1,51 @@
+import argparse
+import logging
+
+from aiohttp import web
+
+from standins.server import create_app, StandinConfig, ServiceConfig
+
+def main():
+    parser = argparse.ArgumentParser(description="Run local stand-in servers for all external APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--config", help="JSON file with default/per-service latency and error settings")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Delay between streamed LLM tokens")
+    parser.add_argument("--recordings", help="Directory of recorded responses to replay")
+    parser.add_argument("--record", action="store_true", help="Proxy to the real APIs and save responses into --recordings")
+    parser.add_argument("--youtube-videos", type=int, default=120, help="Synthetic channel size")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.record and not args.recordings:
+        parser.error("--record requires --recordings")
+
+    options = {
+        "recordings_dir": args.recordings,
+        "record": args.record,
+        "youtube_video_count": args.youtube_videos,
+        "seed": args.seed
+    }
+    if args.config:
+        config = StandinConfig.from_file(args.config, **options)
+    else:
+        config = StandinConfig(
+            default=ServiceConfig(
+                latency_ms=args.latency_ms,
+                jitter_ms=args.jitter_ms,
+                error_rate=args.error_rate,
+                error_status=args.error_status,
+                token_delay_ms=args.token_delay_ms
+            ),
+            **options
+        )
+
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,189 @@
+"""
+Open-loop load generator for the backend API.
+
+Fires requests at a fixed target rate (independent of response times, so
+slow responses don't hide queueing) and reports p50/p95/p99 latency per
+endpoint. Latency is measured from each request's scheduled start time.
+
+Usage (from backend/):
+    python -m standins.loadgen --base-url http://localhost:8001 --rps 50 --duration 60 \\
+        --email load@test.local --password secret \\
+        --endpoint "4:GET /api/scripts?limit=20" \\
+        --endpoint '1:POST /api/scripts/generate {"topic": "Hoffnung"}'
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# (weight, method, path, json body)
+DEFAULT_ENDPOINTS = [
+    (4, "GET", "/api/scripts?limit=20", None),
+    (3, "GET", "/api/hooks?limit=50", None),
+    (3, "GET", "/api/analytics/overview", None),
+    (2, "GET", "/api/notion-analytics/insights", None),
+    (1, "POST", "/api/scripts/generate", {"topic": "Hoffnung in schweren Zeiten"}),
+]
+
+def parse_endpoint(spec: str) -> Tuple[int, str, str, Optional[dict]]:
+    """Parse "[WEIGHT:]METHOD PATH [JSON_BODY]"."""
+    weight = 1
+    head, _, rest = spec.partition(":")
+    if head.isdigit():
+        weight, spec = int(head), rest
+    parts = spec.strip().split(" ", 2)
+    if len(parts) < 2:
+        raise ValueError(f"Invalid endpoint spec: {spec!r}")
+    body = json.loads(parts[2]) if len(parts) == 3 else None
+    return weight, parts[0].upper(), parts[1], body
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+async def get_token(session: aiohttp.ClientSession, base_url: str, email: str, password: str) -> str:
+    """Log in, registering the load-test user first if needed."""
+    async with session.post(f"{base_url}/api/auth/login", json={"email": email, "password": password}) as response:
+        if response.status == 200:
+            return (await response.json())["token"]
+
+    async with session.post(
+        f"{base_url}/api/auth/register",
+        json={"email": email, "password": password, "name": "Load Test"}
+    ) as response:
+        response.raise_for_status()
+        return (await response.json())["token"]
+
+async def run_load(
+    base_url: str,
+    endpoints: List[Tuple[int, str, str, Optional[dict]]],
+    rps: float,
+    duration: float,
+    token: Optional[str] = None,
+    max_in_flight: int = 1000,
+    timeout: float = 30.0
+) -> Dict:
+    """Drive the API at `rps` for `duration` seconds and return per-endpoint stats."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    dropped = 0
+    in_flight = 0
+
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    weights = [e[0] for e in endpoints]
+    rng = random.Random(0)
+
+    connector = aiohttp.TCPConnector(limit=max_in_flight)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as session:
+
+        async def fire(endpoint, scheduled_at: float):
+            nonlocal in_flight
+            _, method, path, body = endpoint
+            label = f"{method} {path.split('?')[0]}"
+            try:
+                async with session.request(method, f"{base_url}{path}", json=body) as response:
+                    await response.read()
+                    status = response.status
+            except Exception:
+                status = 0
+            finally:
+                in_flight -= 1
+
+            latencies[label].append(time.monotonic() - scheduled_at)
+            statuses[label][status] += 1
+            if status == 0 or status >= 400:
+                errors[label] += 1
+
+        tasks = []
+        interval = 1.0 / rps
+        total = int(rps * duration)
+        start = time.monotonic()
+
+        for i in range(total):
+            scheduled_at = start + i * interval
+            delay = scheduled_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if in_flight >= max_in_flight:
+                dropped += 1
+                continue
+
+            in_flight += 1
+            endpoint = rng.choices(endpoints, weights=weights)[0]
+            tasks.append(asyncio.create_task(fire(endpoint, scheduled_at)))
+
+        await asyncio.gather(*tasks)
+        elapsed = time.monotonic() - start
+
+    report = {"target_rps": rps, "achieved_rps": round(len(tasks) / elapsed, 2), "dropped": dropped, "endpoints": {}}
+    for label, values in sorted(latencies.items()):
+        values.sort()
+        report["endpoints"][label] = {
+            "requests": len(values),
+            "errors": errors[label],
+            "statuses": dict(statuses[label]),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+            "max_ms": round(values[-1] * 1000, 1)
+        }
+    return report
+
+def print_report(report: Dict):
+    print(f"\nTarget {report['target_rps']} rps, achieved {report['achieved_rps']} rps, dropped {report['dropped']}\n")
+    print(f"{'endpoint':<45}{'reqs':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, stats in report["endpoints"].items():
+        print(
+            f"{label:<45}{stats['requests']:>8}{stats['errors']:>8}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}"
+        )
+
+async def main():
+    parser = argparse.ArgumentParser(description="Open-loop load generator for the backend API")
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--rps", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--endpoint", action="append", help='"[WEIGHT:]METHOD PATH [JSON_BODY]" (repeatable)')
+    parser.add_argument("--token", help="Bearer token (otherwise --email/--password are used)")
+    parser.add_argument("--email", default="loadtest@standin.local")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    endpoints = [parse_endpoint(spec) for spec in args.endpoint] if args.endpoint else DEFAULT_ENDPOINTS
+    base_url = args.base_url.rstrip("/")
+
+    token = args.token
+    if not token:
+        async with aiohttp.ClientSession() as session:
+            token = await get_token(session, base_url, args.email, args.password)
+
+    report = await run_load(base_url, endpoints, args.rps, args.duration, token, args.max_in_flight)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Tests for the compiled hook classifier.
+Verifies the single-scan automaton gives exactly the same results as the
+original chain of substring checks.
+"""
+import pytest
+import os
+import random
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.hook_classifier import HookClassifier, KeywordAutomaton, HOOK_TYPE_RULES, MODE_RULES, TAG_RULES
+from utils.script_helpers import detect_hook_type_and_tags
+
+
+def reference_classify(hook_text, topic):
+    """Original substring-scan implementation"""
+    hook_lower = hook_text.lower()
+    topic_lower = topic.lower() if topic else ""
+
+    hook_type = "emotional_trigger"
+    for label, words in HOOK_TYPE_RULES:
+        if any(word in hook_lower for word in words):
+            hook_type = label
+            break
+
+    mode = "FAITH_EXPLICIT"
+    for label, words in MODE_RULES:
+        if any(word in hook_lower for word in words):
+            mode = label
+            break
+
+    tags = []
+    combined_text = f"{hook_lower} {topic_lower}"
+    for keyword, tag in TAG_RULES:
+        if keyword in combined_text and tag not in tags:
+            tags.append(tag)
+
+    return (hook_type, mode, tags or ["Glaube", "Hoffnung"])
+
+
+class TestHookClassifier:
+    """Test compiled classifier"""
+
+    def test_examples(self):
+        assert detect_hook_type_and_tags("Hast du das Gefühl, dass Gott schweigt", "")[0] == "identity_filter"
+        assert detect_hook_type_and_tags("Das ist nicht für alle bestimmt", "")[0] == "not_for_everyone"
+        assert detect_hook_type_and_tags("Du bist nicht allein", "")[:2] == ("reverse_psychology", "STATE_BASED")
+        assert detect_hook_type_and_tags("Eine Geschichte", "Glaube und innere Kraft")[2] == ["Glaube", "Kraft"]
+
+    def test_prefix_keywords_are_not_shadowed(self):
+        """'nicht' must still match when the longer 'nicht jeder' matches at the same position"""
+        automaton = KeywordAutomaton(["nicht jeder", "nicht", "jeder"])
+        assert automaton.matches("wirklich nicht jeder") == {0, 1, 2}
+
+    def test_matches_reference_on_random_text(self):
+        rng = random.Random(7)
+        fragments = [word for _, words in HOOK_TYPE_RULES + MODE_RULES for word in words]
+        fragments += [keyword for keyword, _ in TAG_RULES]
+        fragments += ["du", "und", "für", " ", "ich", "Glaub", "HERZ", "nichts", "Momente"]
+        classifier = HookClassifier()
+
+        for _ in range(3000):
+            hook = "".join(rng.choice(fragments) + rng.choice(["", " "]) for _ in range(rng.randint(0, 8)))
+            topic = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 3)))
+            assert classifier.classify(hook, topic) == reference_classify(hook, topic)
+
+    def test_batch(self):
+        classifier = HookClassifier()
+        items = [("Jetzt ist der Moment", "Hoffnung"), ("Merkst du es?", None)]
+        assert classifier.classify_batch(items) == [classifier.classify(h, t or "") for h, t in items]
@@ -0,0 +1,167 @@
+"""
+Tests for the LLM gateway against local OpenAI-compatible stub servers.
+Covers hedging (slow primary), failover (failing primary) and circuit breaking.
+"""
+import pytest
+import asyncio
+import json
+import os
+import sys
+
+from aiohttp import web
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.llm_gateway import LLMGateway, LLMProvider, CircuitBreaker, LLMUnavailableError
+
+
+async def start_stub(text="Hallo Welt", delay=0.0, status=200, delays=None):
+    """Minimal OpenAI-compatible /v1/chat/completions server (`delays`: per-request delays, then `delay`)"""
+    delays = list(delays or [])
+
+    async def chat(request):
+        body = await request.json()
+        await asyncio.sleep(delays.pop(0) if delays else delay)
+
+        if status != 200:
+            return web.json_response({"error": {"message": "stub failure", "type": "invalid_request_error"}}, status=status)
+
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for word in text.split(" "):
+                chunk = {
+                    "id": "stub", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            return response
+
+        return web.json_response({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3}
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v1"
+
+
+def provider(name, api_base, failure_threshold=3):
+    return LLMProvider(
+        name=name,
+        model="openai/stub-model",
+        api_key="test",
+        api_base=api_base,
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60)
+    )
+
+
+MESSAGES = [{"role": "user", "content": "Hallo"}]
+
+
+class TestLLMGateway:
+    """Test gateway routing against stub servers"""
+
+    def test_hedged_request_wins_over_slow_primary(self):
+        async def scenario():
+            slow, slow_url = await start_stub("langsam", delay=2.0)
+            fast, fast_url = await start_stub("schnell")
+            try:
+                gateway = LLMGateway(
+                    [provider("slow", slow_url), provider("fast", fast_url)],
+                    hedge_default_delay=0.2
+                )
+                text = await gateway.complete(MESSAGES)
+                return text, gateway.metrics()
+            finally:
+                await slow.cleanup()
+                await fast.cleanup()
+
+        text, metrics = asyncio.run(scenario())
+        assert text == "schnell"
+        fast_stats = metrics["providers"][1]
+        assert fast_stats["hedges"] == 1
+        assert fast_stats["wins"] == 1
+
+    def test_single_provider_hedges_against_itself(self):
+        async def scenario():
+            stub, url = await start_stub("zweiter", delays=[2.0])
+            try:
+                gateway = LLMGateway([provider("only", url)], hedge_default_delay=0.2)
+                text = await gateway.complete(MESSAGES)
+                return text, gateway
+            finally:
+                await stub.cleanup()
+
+        text, gateway = asyncio.run(scenario())
+        assert text == "zweiter"
+        stats = gateway.metrics()["providers"][0]
+        assert stats["requests"] == 2
+        assert stats["hedges"] == 1
+        # complete() latency and stream() time-to-first-token are tracked apart
+        only = gateway.providers[0]
+        assert len(only.latency) == 1
+        assert len(only.ttft) == 0
+
+    def test_failover_and_circuit_breaker(self):
+        async def scenario():
+            broken, broken_url = await start_stub(status=400)
+            healthy, healthy_url = await start_stub("ok")
+            try:
+                gateway = LLMGateway(
+                    [provider("broken", broken_url, failure_threshold=2), provider("healthy", healthy_url)],
+                    hedge_default_delay=5.0
+                )
+                results = [await gateway.complete(MESSAGES) for _ in range(3)]
+                return results, gateway.metrics()
+            finally:
+                await broken.cleanup()
+                await healthy.cleanup()
+
+        results, metrics = asyncio.run(scenario())
+        assert results == ["ok", "ok", "ok"]
+        broken_stats = metrics["providers"][0]
+        assert broken_stats["breaker_state"] == "open"
+        # Third request skipped the open breaker entirely
+        assert broken_stats["requests"] == 2
+
+    def test_all_providers_failing(self):
+        async def scenario():
+            broken, broken_url = await start_stub(status=400)
+            try:
+                gateway = LLMGateway([provider("broken", broken_url)])
+                with pytest.raises(LLMUnavailableError):
+                    await gateway.complete(MESSAGES)
+            finally:
+                await broken.cleanup()
+
+        asyncio.run(scenario())
+
+    def test_stream(self):
+        async def scenario():
+            stub, url = await start_stub("Gott sieht dich")
+            try:
+                gateway = LLMGateway([provider("stub", url)])
+                return "".join([token async for token in gateway.stream(MESSAGES)])
+            finally:
+                await stub.cleanup()
+
+        assert asyncio.run(scenario()).strip() == "Gott sieht dich"
+
+    def test_circuit_breaker_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.allow() is True  # half-open trial
+        assert breaker.allow() is False  # only one trial at a time
+        breaker.record_success()
+        assert breaker.state == "closed"
@@ -0,0 +1,80 @@
+"""
+Tests for the MinHash + LSH near-duplicate index.
+"""
+import pytest
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.minhash import MinHashLSH, minhash_signature, estimate_similarity, shingles
+
+
+class TestMinHash:
+    """Test signature computation and LSH lookups"""
+
+    def test_signature_is_deterministic(self):
+        """Same text must always produce the same signature (persisted index)"""
+        assert list(minhash_signature("Hast du das Gefühl")) == list(minhash_signature("Hast du das Gefühl"))
+
+    def test_normalization_ignores_case_and_punctuation(self):
+        assert shingles("Weißt du, was Gott sieht?") == shingles("weißt du was gott sieht")
+
+    def test_near_duplicate_is_found(self):
+        index = MinHashLSH()
+        index.insert("a", minhash_signature("Hast du manchmal das Gefühl, dass Gott dich vergessen hat"))
+        index.insert("b", minhash_signature("Die meisten Menschen verstehen nicht, warum Stille heilt"))
+
+        matches = index.query(
+            minhash_signature("Hast du manchmal das Gefühl dass Gott dich vergessen hat?"),
+            threshold=0.7
+        )
+
+        assert [key for key, _ in matches] == ["a"]
+        assert matches[0][1] >= 0.9
+
+    def test_unrelated_text_is_not_matched(self):
+        index = MinHashLSH()
+        index.insert("a", minhash_signature("Hast du manchmal das Gefühl, dass Gott dich vergessen hat"))
+
+        assert index.query(minhash_signature("Jetzt sofort aufstehen und weitermachen"), threshold=0.7) == []
+
+    def test_remove(self):
+        index = MinHashLSH()
+        signature = minhash_signature("Merkst du, wie dein Herz ruhiger wird")
+        index.insert("a", signature)
+        index.remove("a")
+
+        assert len(index) == 0
+        assert index.query(signature, threshold=0.5) == []
+
+    def test_duplicate_clusters(self):
+        index = MinHashLSH()
+        index.insert("a", minhash_signature("Gott hat dich nicht vergessen, auch wenn es sich so anfühlt"))
+        index.insert("b", minhash_signature("Gott hat dich nicht vergessen, auch wenn es sich so anfühlt."))
+        index.insert("c", minhash_signature("Die Stille vor dem Sturm ist der Moment der Entscheidung"))
+
+        clusters = index.duplicate_clusters(threshold=0.8)
+
+        assert len(clusters) == 1
+        assert sorted(clusters[0]["ids"]) == ["a", "b"]
+
+    def test_similarity_estimate(self):
+        sig = minhash_signature("Vertrauen wächst in der Stille")
+        assert estimate_similarity(sig, sig) == 1.0
+
+    def test_lookup_is_fast(self):
+        """Lookups probe buckets only, independent of index size"""
+        index = MinHashLSH()
+        for i in range(2000):
+            index.insert(i, minhash_signature(f"Hook Nummer {i} über Hoffnung und Glauben {i * 7919}"))
+
+        signature = minhash_signature("Ein völlig anderer Hook über Kraft")
+        start = time.perf_counter()
+        for _ in range(100):
+            index.query(signature, threshold=0.7)
+        per_lookup = (time.perf_counter() - start) / 100
+
+        assert per_lookup < 0.001
@@ -0,0 +1,113 @@
+"""
+Tests for the stand-in server (standins.server) used by local runs and load tests.
+Covers the YouTube Data/Analytics stand-ins, id handling for videos the
+stand-in doesn't serve, and per-service fault injection.
+"""
+import asyncio
+import os
+import sys
+
+import aiohttp
+from aiohttp import web
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from standins.server import create_app, StandinConfig, ServiceConfig, _standin_index, _upstream_url
+
+
+async def start_standins(config=None):
+    runner = web.AppRunner(create_app(config))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def run(scenario, config=None):
+    """Run `scenario(session, base_url)` against a fresh stand-in server"""
+    async def main():
+        runner, base = await start_standins(config)
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await scenario(session, base)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+class TestStandinServer:
+    """Exercise standins.server over HTTP"""
+
+    def test_standin_index(self):
+        assert _standin_index("standin0042") == 42
+        assert _standin_index("standin") is None
+        assert _standin_index("dQw4w9WgXcQ") is None
+        assert _standin_index("upl1a2b3c4d") is None
+
+    def test_upstream_urls(self):
+        from aiohttp.test_utils import make_mocked_request
+
+        consent = make_mocked_request("GET", "/google-oauth/auth?client_id=x&state=s")
+        token = make_mocked_request("POST", "/google-oauth/token")
+        videos = make_mocked_request("GET", "/youtube/youtube/v3/videos?id=a")
+        assert _upstream_url(consent, "google-oauth") == "https://accounts.google.com/o/oauth2/auth?client_id=x&state=s"
+        assert _upstream_url(token, "google-oauth") == "https://oauth2.googleapis.com/token"
+        assert _upstream_url(videos, "youtube") == "https://youtube.googleapis.com/youtube/v3/videos?id=a"
+
+    def test_playlist_paging_covers_channel(self):
+        async def scenario(session, base):
+            async with session.get(f"{base}/youtube/youtube/v3/channels", params={"mine": "true"}) as response:
+                channel = (await response.json())["items"][0]
+            ids, token = [], None
+            while True:
+                params = {"playlistId": "UUstandin", "maxResults": "5", **({"pageToken": token} if token else {})}
+                async with session.get(f"{base}/youtube/youtube/v3/playlistItems", params=params) as response:
+                    page = await response.json()
+                ids += [item["contentDetails"]["videoId"] for item in page["items"]]
+                token = page.get("nextPageToken")
+                if not token:
+                    return channel, ids
+
+        channel, ids = run(scenario, StandinConfig(youtube_video_count=12))
+        assert channel["statistics"]["videoCount"] == "12"
+        assert ids == [f"standin{i:04d}" for i in range(12)]
+
+    def test_videos_skip_foreign_ids(self):
+        async def scenario(session, base):
+            params = {"part": "snippet,statistics", "id": "standin0003,dQw4w9WgXcQ,upl1a2b3c4d"}
+            async with session.get(f"{base}/youtube/youtube/v3/videos", params=params) as response:
+                return response.status, await response.json()
+
+        status, data = run(scenario)
+        assert status == 200
+        assert [item["id"] for item in data["items"]] == ["standin0003"]
+        assert data["items"][0]["snippet"]["title"] == "Stand-in Short 3"
+
+    def test_daily_reports_skip_foreign_ids(self):
+        async def scenario(session, base):
+            params = {
+                "ids": "channel==MINE", "metrics": "views,likes", "dimensions": "day,video",
+                "filters": "video==standin0001,upl1a2b3c4d", "startDate": "2024-01-01", "endDate": "2024-01-31"
+            }
+            async with session.get(f"{base}/youtube-analytics/v2/reports", params=params) as response:
+                return response.status, await response.json()
+
+        status, data = run(scenario)
+        assert status == 200
+        assert data["rows"]
+        assert {row[1] for row in data["rows"]} == {"standin0001"}
+
+    def test_injected_errors_only_hit_configured_service(self):
+        config = StandinConfig(services={"youtube": ServiceConfig(error_rate=1.0, error_status=429)}, seed=1)
+
+        async def scenario(session, base):
+            async with session.get(f"{base}/youtube/youtube/v3/channels") as response:
+                youtube_status = response.status
+            async with session.get(f"{base}/health") as response:
+                health_status = response.status
+            return youtube_status, health_status
+
+        assert run(scenario, config) == (429, 200)
@@ -0,0 +1,240 @@
+"""
+Tests for the resumable YouTube upload against the stand-in server.
+Covers opening a session, resuming at the acknowledged offset after a failed
+chunk, reopening an expired (404/410) session, and picking an interrupted
+upload back up from its stored session.
+"""
+import pytest
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import aiohttp
+from aiohttp import web
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from standins.server import create_app
+from services import youtube_upload
+from services.youtube_upload import ResumableUpload, UploadError, upload_claimable, YOUTUBE_UPLOAD_LEASE
+
+CHUNK = 1024
+METADATA = {"snippet": {"title": "Test Short", "description": "lgy:test"}, "status": {"privacyStatus": "private"}}
+
+
+class FakeCredentials:
+    valid = True
+    token = "test-token"
+
+
+async def start_standins(*middlewares):
+    """Stand-in server with extra middlewares in front of the fault injection"""
+    app = create_app()
+    for middleware in reversed(middlewares):
+        app.middlewares.insert(0, middleware)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return app, runner, f"http://127.0.0.1:{port}/youtube-upload"
+
+
+def request_log(log):
+    @web.middleware
+    async def record(request, handler):
+        log.append((request.method, request.headers.get("Content-Range")))
+        return await handler(request)
+    return record
+
+
+@pytest.fixture
+def video_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_CHUNK_BYTES", CHUNK)
+    path = tmp_path / "render.mp4"
+    path.write_bytes(os.urandom(CHUNK * 3 + 100))
+    return path
+
+
+class TestResumableUpload:
+    """Drive ResumableUpload against standins.server"""
+
+    def test_opens_session_and_uploads_in_chunks(self, video_file, monkeypatch):
+        async def scenario():
+            log = []
+            app, runner, endpoint = await start_standins(request_log(log))
+            monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_ENDPOINT", endpoint)
+            progress = []
+
+            async def on_progress(session_uri, offset, total):
+                progress.append(offset)
+
+            try:
+                async with aiohttp.ClientSession() as session:
+                    upload = ResumableUpload(session, FakeCredentials(), "user", video_file, METADATA, on_progress=on_progress)
+                    video = await upload.run()
+                return video, upload, log, progress, app["uploads"]
+            finally:
+                await runner.cleanup()
+
+        video, upload, log, progress, uploads = asyncio.run(scenario())
+        total = video_file.stat().st_size
+        assert video["id"].startswith("upl")
+        assert video["status"]["privacyStatus"] == "private"
+        assert upload.session_uri and "upload_id=" in upload.session_uri
+        assert log[0] == ("POST", None)
+        assert [r for _, r in log[1:]] == [
+            f"bytes 0-{CHUNK - 1}/{total}",
+            f"bytes {CHUNK}-{2 * CHUNK - 1}/{total}",
+            f"bytes {2 * CHUNK}-{3 * CHUNK - 1}/{total}",
+            f"bytes {3 * CHUNK}-{total - 1}/{total}",
+        ]
+        assert progress == [CHUNK, 2 * CHUNK, 3 * CHUNK]
+        assert list(uploads.values())[0]["received"] == total
+
+    def test_resumes_at_acknowledged_offset_after_failure(self, video_file, monkeypatch):
+        async def scenario():
+            log = []
+            failed = []
+
+            @web.middleware
+            async def fail_second_chunk_once(request, handler):
+                if request.method == "PUT" and request.headers.get("Content-Range", "").startswith(f"bytes {CHUNK}-") and not failed:
+                    failed.append(True)
+                    await request.read()
+                    return web.json_response({"error": {"message": "Injected failure", "code": 503}}, status=503)
+                return await handler(request)
+
+            app, runner, endpoint = await start_standins(request_log(log), fail_second_chunk_once)
+            monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_ENDPOINT", endpoint)
+            try:
+                async with aiohttp.ClientSession() as session:
+                    upload = ResumableUpload(session, FakeCredentials(), "user", video_file, METADATA)
+                    video = await upload.run()
+                return video, log, app["uploads"]
+            finally:
+                await runner.cleanup()
+
+        video, log, uploads = asyncio.run(scenario())
+        total = video_file.stat().st_size
+        ranges = [r for method, r in log if method == "PUT"]
+        # Failed chunk -> offset query (answered with 308 Range: bytes=0-CHUNK-1) -> same chunk again
+        failed_at = ranges.index(f"bytes {CHUNK}-{2 * CHUNK - 1}/{total}")
+        assert ranges[failed_at + 1] == f"bytes */{total}"
+        assert ranges[failed_at + 2] == f"bytes {CHUNK}-{2 * CHUNK - 1}/{total}"
+        assert video["id"].startswith("upl")
+        assert len(uploads) == 1
+        assert list(uploads.values())[0]["received"] == total
+
+    def test_reopens_expired_session(self, video_file, monkeypatch):
+        async def scenario():
+            log = []
+            expired = []
+
+            @web.middleware
+            async def expire_after_first_chunk(request, handler):
+                # Session disappears after its first chunk; the next PUT gets 410 Gone
+                if request.method == "PUT" and not expired and request.headers.get("Content-Range", "").startswith(f"bytes {CHUNK}-"):
+                    expired.append(request.query["upload_id"])
+                    request.app["uploads"].pop(request.query["upload_id"])
+                    await request.read()
+                    return web.json_response({"error": {"message": "Session expired", "code": 410}}, status=410)
+                return await handler(request)
+
+            app, runner, endpoint = await start_standins(request_log(log), expire_after_first_chunk)
+            monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_ENDPOINT", endpoint)
+            try:
+                async with aiohttp.ClientSession() as session:
+                    # A stale stored session (404) is replaced before the first chunk
+                    stale = f"{endpoint}/upload/youtube/v3/videos?uploadType=resumable&upload_id=gone"
+                    upload = ResumableUpload(session, FakeCredentials(), "user", video_file, METADATA, session_uri=stale)
+                    video = await upload.run()
+                return video, upload, log, expired, app["uploads"]
+            finally:
+                await runner.cleanup()
+
+        video, upload, log, expired, uploads = asyncio.run(scenario())
+        total = video_file.stat().st_size
+        assert log[0] == ("PUT", f"bytes */{total}")
+        # Opened once for the stale session and once more after the 410
+        assert [method for method, _ in log].count("POST") == 2
+        assert expired and expired[0] not in upload.session_uri
+        # The new session starts over from byte 0
+        ranges = [r for method, r in log if method == "PUT"]
+        assert ranges[ranges.index(f"bytes {CHUNK}-{2 * CHUNK - 1}/{total}") + 1] == f"bytes 0-{CHUNK - 1}/{total}"
+        assert video["id"].startswith("upl")
+        assert len(uploads) == 1
+
+    def test_gives_up_on_session_that_keeps_expiring(self, video_file, monkeypatch):
+        async def scenario():
+            log = []
+
+            @web.middleware
+            async def always_gone(request, handler):
+                if request.method == "PUT":
+                    await request.read()
+                    return web.json_response({"error": {"message": "Session expired", "code": 404}}, status=404)
+                return await handler(request)
+
+            app, runner, endpoint = await start_standins(request_log(log), always_gone)
+            monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_ENDPOINT", endpoint)
+            monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_MAX_REOPENS", 2)
+            try:
+                async with aiohttp.ClientSession() as session:
+                    upload = ResumableUpload(session, FakeCredentials(), "user", video_file, METADATA)
+                    with pytest.raises(UploadError):
+                        await upload.run()
+                return log
+            finally:
+                await runner.cleanup()
+
+        log = asyncio.run(scenario())
+        # The first session plus two replacements, then no more quota is spent
+        assert [method for method, _ in log].count("POST") == 3
+
+    def test_interrupted_upload_is_reclaimable_and_resumes(self, video_file, monkeypatch):
+        class WorkerDied(Exception):
+            pass
+
+        async def scenario():
+            log = []
+            app, runner, endpoint = await start_standins(request_log(log))
+            monkeypatch.setattr(youtube_upload, "YOUTUBE_UPLOAD_ENDPOINT", endpoint)
+
+            async def die_after_first_chunk(session_uri, offset, total):
+                raise WorkerDied()
+
+            try:
+                async with aiohttp.ClientSession() as session:
+                    first = ResumableUpload(session, FakeCredentials(), "user", video_file, METADATA, on_progress=die_after_first_chunk)
+                    with pytest.raises(WorkerDied):
+                        await first.run()
+                    # Re-posted later with the session_uri stored on the video
+                    second = ResumableUpload(session, FakeCredentials(), "user", video_file, METADATA, session_uri=first.session_uri)
+                    video = await second.run()
+                return video, log, app["uploads"]
+            finally:
+                await runner.cleanup()
+
+        video, log, uploads = asyncio.run(scenario())
+        total = video_file.stat().st_size
+        assert [method for method, _ in log].count("POST") == 1
+        ranges = [r for method, r in log if method == "PUT"]
+        assert ranges[:3] == [f"bytes 0-{CHUNK - 1}/{total}", f"bytes */{total}", f"bytes {CHUNK}-{2 * CHUNK - 1}/{total}"]
+        assert video["id"].startswith("upl")
+        assert list(uploads.values())[0]["received"] == total
+
+    def test_upload_claimable(self):
+        now = datetime.utcnow()
+        stale = now - YOUTUBE_UPLOAD_LEASE - timedelta(minutes=1)
+        assert upload_claimable(None, now)
+        assert upload_claimable({"status": "failed", "session_uri": "x"}, now)
+        # In flight and making progress: another request must not take it over
+        assert not upload_claimable({"status": "uploading", "updated_at": now}, now)
+        assert not upload_claimable({"status": "queued", "updated_at": now}, now)
+        # Worker died mid-upload: the lease has run out
+        assert upload_claimable({"status": "uploading", "updated_at": stale}, now)
+        assert upload_claimable({"status": "queued", "updated_at": stale}, now)
+        assert not upload_claimable({"status": "completed", "updated_at": stale}, now)
@@ -0,0 +1,80 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Metric fields summed into every rollup bucket
+SUM_FIELDS = {
+    "views": "views",
+    "likes": "likes",
+    "comments": "comments",
+    "subs": "subs",
+    "retention_percent": "retention_sum",
+    "swipe_rate": "swipe_rate_sum"
+}
+
+ROLLUP_KINDS = ("total", "day", "week")
+
+def _as_datetime(value: Union[datetime, str, None]) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if value:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return datetime.utcnow()
+
+def bucket_keys(created_at: Union[datetime, str, None]) -> List[Tuple[str, Optional[str]]]:
+    """(kind, bucket) pairs a metric contributes to; weeks are keyed by their Monday."""
+    day = _as_datetime(created_at).date()
+    monday = day - timedelta(days=day.weekday())
+    return [("total", None), ("day", day.isoformat()), ("week", monday.isoformat())]
+
+def metric_values(metric: Dict, sign: int = 1) -> Dict[str, float]:
+    """Rollup increments for one metric document (sign=-1 to remove it)."""
+    values = {target: sign * (metric.get(source) or 0) for source, target in SUM_FIELDS.items()}
+    values["count"] = sign
+    return values
+
+async def apply_rollup_delta(user_id: str, created_at, delta: Dict[str, float]):
+    """Increment the total, day and week rollups of one user in a single bulk write."""
+    if not any(delta.values()):
+        return
+
+    from database import db
+
+    now = datetime.utcnow()
+    ops = [
+        UpdateOne(
+            {"user_id": user_id, "kind": kind, "bucket": bucket},
+            {"$inc": delta, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for kind, bucket in bucket_keys(created_at)
+    ]
+    await db.analytics_rollups.bulk_write(ops, ordered=False)
+
+async def record_metric_rollup(user_id: str, metric: Dict, sign: int = 1):
+    await apply_rollup_delta(user_id, metric.get("created_at"), metric_values(metric, sign))
+
+async def record_metric_rollup_change(user_id: str, old_metric: Dict, new_values: Dict):
+    """Shift the rollups of an edited metric (bucketed by its original created_at)."""
+    old = metric_values(old_metric)
+    new = metric_values(new_values)
+    delta = {key: new[key] - old[key] for key in old}
+    await apply_rollup_delta(user_id, old_metric.get("created_at"), delta)
+
+def summarize_rollup(doc: Optional[Dict]) -> Dict:
+    """Totals and averages for one rollup document."""
+    doc = doc or {}
+    count = doc.get("count", 0)
+    return {
+        "total_views": doc.get("views", 0),
+        "total_likes": doc.get("likes", 0),
+        "total_comments": doc.get("comments", 0),
+        "total_subs": doc.get("subs", 0),
+        "avg_retention": doc.get("retention_sum", 0.0) / count if count else 0.0,
+        "avg_swipe_rate": doc.get("swipe_rate_sum", 0.0) / count if count else 0.0,
+        "total_metrics": count
+    }
@@ -0,0 +1,247 @@
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import TTLCache
+from utils.data_version import get_data_version, ANALYTICS_DATASET, METRICS_DATASET
+
+logger = logging.getLogger(__name__)
+
+# 95% confidence intervals
+Z_SCORE = 1.96
+
+# Bounds for the empirical-Bayes prior strength (pseudo-views)
+MIN_PRIOR_VIEWS = 10.0
+MAX_PRIOR_VIEWS = 1e6
+DEFAULT_PRIOR_VIEWS = float(os.getenv("ANALYTICS_PRIOR_VIEWS", "500"))
+
+TEXT_FIELDS = ("hook_title", "retention_hook", "dominance_line", "open_loop", "close", "resolve_script")
+NUMERIC_FIELDS = ("views", "retention_percent", "swipe_rate", "likes", "comments")
+
+def shrink_rates(rates_pct: np.ndarray, views: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    View-weighted Bayesian shrinkage of percentage rates.
+
+    Each rate is treated as a Beta-binomial observation over its views.
+    The prior is the user's view-weighted mean; its strength (in
+    pseudo-views) is the method-of-moments estimate from the spread across
+    items, but at least the median view count. Low-view items are pulled
+    towards the mean; proven items keep their rate.
+
+    Returns (posterior mean, CI low, CI high), all in percent.
+    """
+    p = np.clip(np.nan_to_num(rates_pct, nan=0.0) / 100.0, 0.0, 1.0)
+    v = np.maximum(np.nan_to_num(views, nan=0.0), 0.0)
+    valid = ~np.isnan(rates_pct)
+
+    if not valid.any():
+        empty = np.zeros_like(p)
+        return empty, empty, empty
+
+    weights = np.where(valid, v + 1.0, 0.0)  # +1 so zero-view rows still count once
+    prior = float(np.average(p, weights=weights))
+    variance = float(np.average((p - prior) ** 2, weights=weights))
+
+    if variance > 0 and 0 < prior < 1:
+        strength = prior * (1 - prior) / variance - 1
+    else:
+        strength = DEFAULT_PRIOR_VIEWS
+    # Views aren't independent trials, so the moment estimate alone barely
+    # shrinks anything; a typical (median) item's views is the floor.
+    strength = max(strength, float(np.median(v[valid])))
+    strength = float(np.clip(strength, MIN_PRIOR_VIEWS, MAX_PRIOR_VIEWS))
+
+    alpha = strength * prior + v * p
+    beta = strength * (1 - prior) + v * (1 - p)
+    total = alpha + beta
+    mean = alpha / total
+    half_width = Z_SCORE * np.sqrt(alpha * beta / (total * total * (total + 1)))
+
+    mean = np.where(valid, mean, prior)
+    low = np.clip(mean - half_width, 0.0, 1.0)
+    high = np.clip(mean + half_width, 0.0, 1.0)
+    return mean * 100, low * 100, high * 100
+
+def top_indices(scores: np.ndarray, n: int, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Indices of the n highest scores (optionally within mask), best first."""
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+    if n <= 0 or not len(candidates):
+        return candidates[:0]
+    if len(candidates) > n:
+        part = np.argpartition(-scores[candidates], n - 1)[:n]
+        candidates = candidates[part]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def _rounded(value: float) -> float:
+    return round(float(value), 2)
+
+class AnalyticsSnapshot:
+    """
+    Columnar per-user view of analytics_data (one row per video) and of
+    metrics aggregated per hook, with shrunk scores precomputed.
+    """
+
+    def __init__(self, rows: List[Dict], hook_rows: List[Dict]):
+        self.size = len(rows)
+        self.text = {
+            field: np.array([row.get(field) for row in rows], dtype=object)
+            for field in TEXT_FIELDS
+        }
+        # Non-empty text masks (dominance/open loop/close leaderboards)
+        self.present = {field: np.array([bool(x) for x in col], dtype=bool) for field, col in self.text.items()}
+        self.columns = {
+            field: np.array(
+                [row.get(field) if row.get(field) is not None else np.nan for row in rows],
+                dtype=np.float64
+            )
+            for field in NUMERIC_FIELDS
+        }
+        views = np.nan_to_num(self.columns["views"], nan=0.0)
+        self.scores = {
+            "retention_percent": shrink_rates(self.columns["retention_percent"], views),
+            "swipe_rate": shrink_rates(self.columns["swipe_rate"], views),
+        }
+
+        # Hooks (from metrics): id, total views, view-weighted retention
+        self.hook_ids = np.array([row["_id"] for row in hook_rows], dtype=object)
+        self.hook_views = np.array([row.get("views") or 0 for row in hook_rows], dtype=np.float64)
+        self.hook_counts = np.array([row.get("count") or 0 for row in hook_rows], dtype=np.int64)
+        self.hook_retention = np.array([
+            (row["weighted_retention"] / row["views"]) if row.get("views") else (row.get("avg_retention") or 0.0)
+            for row in hook_rows
+        ], dtype=np.float64)
+        self.hook_scores = shrink_rates(self.hook_retention, self.hook_views)
+
+    def leaderboard(self, metric: str, fields: List[str], n: int, require: Optional[str] = None) -> List[Dict]:
+        """Top n rows by shrunk `metric`, returning `fields` plus score and CI."""
+        score, low, high = self.scores[metric]
+        mask = self.present[require] if require else None
+        result = []
+        for i in top_indices(score, n, mask):
+            item = {}
+            for field in fields:
+                if field in self.text:
+                    item[field] = self.text[field][i]
+                else:
+                    value = self.columns[field][i]
+                    item[field] = None if np.isnan(value) else (int(value) if field == "views" else float(value))
+            item.update(score=_rounded(score[i]), ci_low=_rounded(low[i]), ci_high=_rounded(high[i]))
+            result.append(item)
+        return result
+
+    def hook_type_performance(self) -> List[Dict]:
+        if not self.size:
+            return []
+        types = np.array([t if t is not None else "" for t in self.text["retention_hook"]], dtype=object)
+        labels, inverse = np.unique(types.astype(str), return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(labels))
+
+        def group_mean(values: np.ndarray) -> np.ndarray:
+            valid = ~np.isnan(values)
+            sums = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=len(labels))
+            n = np.bincount(inverse, weights=valid.astype(np.float64), minlength=len(labels))
+            return np.divide(sums, n, out=np.full(len(labels), np.nan), where=n > 0)
+
+        swipe = group_mean(self.columns["swipe_rate"])
+        retention = group_mean(self.columns["retention_percent"])
+        views = np.bincount(inverse, weights=np.nan_to_num(self.columns["views"], nan=0.0), minlength=len(labels))
+
+        order = np.argsort(-np.nan_to_num(swipe, nan=-np.inf), kind="stable")
+        return [
+            {
+                "_id": labels[i] or None,
+                "avg_swipe_rate": None if np.isnan(swipe[i]) else float(swipe[i]),
+                "avg_retention": None if np.isnan(retention[i]) else float(retention[i]),
+                "total_views": int(views[i]),
+                "count": int(counts[i])
+            }
+            for i in order
+        ]
+
+    def average_stats(self) -> Optional[Dict]:
+        if not self.size:
+            return None
+
+        def mean(field: str) -> Optional[float]:
+            values = self.columns[field]
+            return float(np.nanmean(values)) if (~np.isnan(values)).any() else None
+
+        return {
+            "_id": None,
+            "avg_swipe_rate": mean("swipe_rate"),
+            "avg_retention": mean("retention_percent"),
+            "avg_likes": mean("likes"),
+            "avg_comments": mean("comments"),
+            "total_views": int(np.nansum(self.columns["views"])),
+            "total_videos": self.size
+        }
+
+    def top_hooks(self, n: int) -> List[Dict]:
+        """Top hooks by shrunk view-weighted retention across their metrics."""
+        score, low, high = self.hook_scores
+        return [
+            {
+                "hook_id": self.hook_ids[i],
+                "score": _rounded(score[i]),
+                "ci_low": _rounded(low[i]),
+                "ci_high": _rounded(high[i]),
+                "total_views": int(self.hook_views[i]),
+                "metric_count": int(self.hook_counts[i])
+            }
+            for i in top_indices(score, n)
+        ]
+
+# user_id -> ((analytics version, metrics version), snapshot)
+_snapshots = TTLCache(
+    maxsize=int(os.getenv("ANALYTICS_SNAPSHOT_MAX_USERS", "200")),
+    ttl=float(os.getenv("ANALYTICS_SNAPSHOT_TTL_SECONDS", "3600"))
+)
+_load_locks: Dict[str, asyncio.Lock] = {}
+
+async def _load_snapshot(user_id: str) -> AnalyticsSnapshot:
+    from database import db
+
+    rows = await db.analytics_data.find(
+        {"user_id": user_id},
+        {"_id": 0, **{field: 1 for field in TEXT_FIELDS + NUMERIC_FIELDS}}
+    ).to_list(length=None)
+
+    hook_rows = await db.metrics.aggregate([
+        {"$match": {"user_id": user_id, "hook_id": {"$ne": None}}},
+        {
+            "$group": {
+                "_id": "$hook_id",
+                "views": {"$sum": "$views"},
+                "weighted_retention": {"$sum": {"$multiply": ["$views", "$retention_percent"]}},
+                "avg_retention": {"$avg": "$retention_percent"},
+                "count": {"$sum": 1}
+            }
+        }
+    ]).to_list(length=None)
+
+    return await asyncio.to_thread(AnalyticsSnapshot, rows, hook_rows)
+
+async def get_analytics_snapshot(user_id: str) -> AnalyticsSnapshot:
+    """Lazily load (or reuse) the user's snapshot for the current data versions."""
+    versions = (
+        await get_data_version(user_id, ANALYTICS_DATASET),
+        await get_data_version(user_id, METRICS_DATASET)
+    )
+    cached = _snapshots.get(user_id)
+    if cached and cached[0] == versions:
+        return cached[1]
+
+    lock = _load_locks.setdefault(user_id, asyncio.Lock())
+    async with lock:
+        cached = _snapshots.get(user_id)
+        if cached and cached[0] == versions:
+            return cached[1]
+
+        snapshot = await _load_snapshot(user_id)
+        _snapshots.set(user_id, (versions, snapshot))
+        logger.info(f"Loaded analytics snapshot for user {user_id}: {snapshot.size} rows, {len(snapshot.hook_ids)} hooks")
+
+    return snapshot
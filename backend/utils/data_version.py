@@ -0,0 +1,44 @@
+import os
+import logging
+
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Datasets with a version counter
+ANALYTICS_DATASET = "analytics_data"  # Notion CSV rows
+METRICS_DATASET = "metrics"  # per-script performance metrics
+
+# Per-user counters that bump whenever a dataset changes; cached results
+# and ETags are keyed by them. The counter lives in Mongo (shared across
+# workers) and is mirrored in-process for a few seconds so that
+# revalidation requests don't need a database round trip.
+_versions = TTLCache(maxsize=10000, ttl=float(os.getenv("DATA_VERSION_CACHE_SECONDS", "2")))
+
+async def get_data_version(user_id: str, dataset: str) -> int:
+    key = (user_id, dataset)
+    version = _versions.get(key)
+    if version is not None:
+        return version
+
+    from database import db
+
+    doc = await db.data_versions.find_one({"user_id": user_id, "dataset": dataset}, {"_id": 0, "version": 1})
+    version = doc["version"] if doc else 0
+    _versions.set(key, version)
+    return version
+
+async def bump_data_version(user_id: str, dataset: str) -> int:
+    """Mark the user's dataset as changed; returns the new version."""
+    from database import db
+    from pymongo import ReturnDocument
+
+    doc = await db.data_versions.find_one_and_update(
+        {"user_id": user_id, "dataset": dataset},
+        {"$inc": {"version": 1}},
+        projection={"_id": 0, "version": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _versions.set((user_id, dataset), doc["version"])
+    return doc["version"]
@@ -1,5 +1,7 @@
 import logging
 
+from utils.metric_points import ensure_metric_points_collection
+
 logger = logging.getLogger(__name__)
 
 async def init_database(db):
@@ -12,28 +14,103 @@ async def init_database(db):
     logger.info("Users indexes created")
     
     # Scripts collection
-    await db.scripts.create_index([("user_id", 1), ("created_at", -1)])
+    await db.scripts.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
     await db.scripts.create_index("id")
+    await db.scripts.create_index(
+        [("user_id", 1), ("script", "text"), ("hook_text", "text"), ("topic", "text")],
+        name="scripts_text_de", default_language="german", language_override="text_language",
+        weights={"hook_text": 3, "topic": 2, "script": 1}
+    )
     logger.info("Scripts indexes created")
     
     # Hooks collection
-    await db.hooks.create_index([("user_id", 1), ("created_at", -1)])
+    await db.hooks.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+    await db.hooks.create_index([("user_id", 1), ("avg_retention", -1), ("id", -1)])
+    await db.hooks.create_index([("user_id", 1), ("usage_count", -1), ("id", -1)])
     await db.hooks.create_index("id")
     await db.hooks.create_index("hook_type")
+    await db.hooks.create_index([("user_id", 1), ("hook_text", 1)])
+    await db.hooks.create_index(
+        [("user_id", 1), ("hook_text", "text"), ("topic", "text")],
+        name="hooks_text_de", default_language="german", language_override="text_language",
+        weights={"hook_text": 3, "topic": 1}
+    )
     logger.info("Hooks indexes created")
     
     # Metrics collection
-    await db.metrics.create_index([("user_id", 1), ("created_at", -1)])
+    await db.metrics.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
     await db.metrics.create_index("script_id")
+    await db.metrics.create_index([("user_id", 1), ("hook_id", 1)])
+    # One metric per synced YouTube video (match_youtube_videos upserts on it);
+    # replaces the earlier non-unique index of the same keys
+    youtube_key = [("user_id", 1), ("youtube_video_id", 1)]
+    existing = (await db.metrics.index_information()).get("user_id_1_youtube_video_id_1")
+    if existing and not existing.get("unique"):
+        await db.metrics.drop_index("user_id_1_youtube_video_id_1")
+    await db.metrics.create_index(
+        youtube_key, unique=True, partialFilterExpression={"youtube_video_id": {"$type": "string"}}
+    )
     logger.info("Metrics indexes created")
     
+    # Metric snapshots (time-series collection, daily buckets)
+    await ensure_metric_points_collection(db)
+    await db.metric_points.create_index([("meta.user_id", 1), ("ts", -1)])
+    logger.info("Metric points time-series collection ready")
+    
     # Videos collection
-    await db.videos.create_index([("user_id", 1), ("created_at", -1)])
+    await db.videos.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
     await db.videos.create_index("script_id")
     logger.info("Videos indexes created")
     
     # Analytics Data collection (Notion CSV imports)
-    await db.analytics_data.create_index([("user_id", 1), ("retention_percent", -1)])
+    await db.analytics_data.create_index([("user_id", 1), ("retention_percent", -1), ("id", -1)])
     await db.analytics_data.create_index("id")
     await db.analytics_data.create_index("social_file")
-    logger.info("Analytics Data indexes created")
\ No newline at end of file
+    # Import upsert key (jobs/import_notion_csv); replaces the earlier non-unique index
+    existing = (await db.analytics_data.index_information()).get("user_id_1_social_file_1")
+    if existing and not existing.get("unique"):
+        await db.analytics_data.drop_index("user_id_1_social_file_1")
+    await db.analytics_data.create_index(
+        [("user_id", 1), ("social_file", 1)], unique=True, partialFilterExpression={"social_file": {"$type": "string"}}
+    )
+    await db.analytics_data.create_index(
+        [("user_id", 1), ("hook_title", "text"), ("dominance_line", "text"), ("open_loop", "text"), ("close", "text")],
+        name="analytics_text_de", default_language="german", language_override="text_language",
+        weights={"hook_title": 3, "dominance_line": 2, "open_loop": 2, "close": 1}
+    )
+    logger.info("Analytics Data indexes created")
+    
+    # Materialized analytics rollups (total / day / week buckets per user)
+    await db.analytics_rollups.create_index([("user_id", 1), ("kind", 1), ("bucket", -1)], unique=True)
+    logger.info("Analytics rollup indexes created")
+    
+    # Per-user dataset versions (cache keys / ETags)
+    await db.data_versions.create_index([("user_id", 1), ("dataset", 1)], unique=True)
+    logger.info("Data version indexes created")
+    
+    # Saved voices
+    await db.saved_voices.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+    logger.info("Saved voices indexes created")
+    
+    # MinHash signatures (near-duplicate index)
+    await db.minhash_signatures.create_index([("user_id", 1), ("kind", 1), ("doc_id", 1)], unique=True)
+    await db.minhash_signatures.create_index([("user_id", 1), ("kind", 1), ("updated_at", 1)])
+    # Delete tombstones only need to outlive DEDUPE_INDEX_MAX_AGE_SECONDS
+    await db.minhash_signatures.create_index("deleted_at", expireAfterSeconds=86400)
+    logger.info("MinHash signature indexes created")
+    
+    # YouTube: synced videos (incremental sync upserts / etag lookups), daily analytics, sync schedule, daily quota
+    await db.youtube_videos.create_index([("user_id", 1), ("video_id", 1)])
+    await db.youtube_videos.create_index([("user_id", 1), ("view_count", -1)])
+    await db.youtube_connections.create_index("user_id")
+    await db.youtube_connections.create_index("sync_schedule.next_sync_at")
+    await db.youtube_connections.create_index([("sync_state.last_published_at", -1), ("sync_schedule.next_sync_at", 1)])
+    await db.youtube_video_daily.create_index([("user_id", 1), ("video_id", 1), ("day", 1)], unique=True)
+    await db.youtube_video_daily.create_index([("user_id", 1), ("day", -1)])
+    await db.youtube_quota.create_index([("project", 1), ("day", 1)], unique=True)
+    logger.info("YouTube video indexes created")
+    
+    # Background jobs
+    await db.jobs.create_index("id")
+    await db.jobs.create_index([("user_id", 1), ("created_at", -1)])
+    logger.info("Jobs indexes created")
\ No newline at end of file
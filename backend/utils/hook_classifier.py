@@ -0,0 +1,143 @@
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+# ===== CLASSIFICATION RULES =====
+# Hook type rules in priority order: the first type with a matching keyword wins.
+HOOK_TYPE_RULES = [
+    ("identity_filter", ["hast du", "merkst du", "siehst du", "weißt du", "fühlst du"]),
+    ("urgency", ["jetzt", "sofort", "schnell", "moment"]),
+    ("not_for_everyone", ["nicht für alle", "nicht für dich", "nicht jeder"]),
+    ("reverse_psychology", ["nicht", "kein", "gegenteil"]),
+    ("emotional_trigger", ["fühlt", "spürst", "herz", "seele", "tief"]),
+]
+DEFAULT_HOOK_TYPE = "emotional_trigger"  # Default for Faith niche
+
+MODE_RULES = [
+    ("STATE_BASED", ["bist", "wirklich", "zustand"]),
+]
+DEFAULT_MODE = "FAITH_EXPLICIT"
+
+# Keyword -> tag, in output order (matched against hook + topic)
+TAG_RULES = [
+    ("hoffnung", "Hoffnung"),
+    ("glaube", "Glaube"),
+    ("gott", "Gott"),
+    ("kraft", "Kraft"),
+    ("stärke", "Stärke"),
+    ("liebe", "Liebe"),
+    ("vertrauen", "Vertrauen"),
+    ("sinn", "Sinn"),
+    ("seele", "Seele"),
+    ("herz", "Herz"),
+    ("innerfrieden", "Innerer Friede"),
+    ("innere ruhe", "Innere Ruhe"),
+    ("faith", "Glaube"),
+    ("hope", "Hoffnung"),
+    ("strength", "Kraft"),
+    ("purpose", "Zweck"),
+    ("meaning", "Sinn"),
+    ("spirit", "Geist"),
+    ("dominance", "Dominanz"),
+    ("open loop", "Offene Schleife"),
+]
+DEFAULT_TAGS = ["Glaube", "Hoffnung"]
+
+class KeywordAutomaton:
+    """
+    All keywords compiled into one regex that reports every (overlapping)
+    substring occurrence in a single left-to-right scan.
+
+    The zero-width lookahead tries the alternatives longest-first at each
+    position, so a shorter keyword that is a prefix of a longer match would
+    be shadowed - those are resolved at compile time via `_implied`.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = list(keywords)
+        ordered = sorted(set(self.keywords), key=len, reverse=True)
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in ordered) + "))"
+        )
+        # keyword -> ids of every keyword it implies (itself + its prefixes)
+        self._implied: Dict[str, Set[int]] = {
+            keyword: {i for i, other in enumerate(self.keywords) if keyword.startswith(other)}
+            for keyword in ordered
+        }
+
+    def matches(self, text: str) -> Set[int]:
+        """Ids (indices into `keywords`) of all keywords occurring in text."""
+        found: Set[int] = set()
+        seen: Set[str] = set()
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1)
+            if keyword not in seen:
+                seen.add(keyword)
+                found |= self._implied[keyword]
+        return found
+
+def _flatten(rules: List[Tuple[str, List[str]]]) -> Tuple[List[str], List[str]]:
+    keywords, labels = [], []
+    for label, words in rules:
+        for word in words:
+            keywords.append(word)
+            labels.append(label)
+    return keywords, labels
+
+class HookClassifier:
+    """
+    Compiled hook classifier.
+    Detects (hook_type, mode, tags) with one regex scan per rule group
+    instead of a chain of substring checks.
+    """
+
+    def __init__(
+        self,
+        hook_type_rules=HOOK_TYPE_RULES,
+        mode_rules=MODE_RULES,
+        tag_rules=TAG_RULES
+    ):
+        type_keywords, self._type_labels = _flatten(hook_type_rules)
+        self._type_priority = {label: i for i, (label, _) in enumerate(hook_type_rules)}
+        self._types = KeywordAutomaton(type_keywords)
+
+        mode_keywords, self._mode_labels = _flatten(mode_rules)
+        self._mode_priority = {label: i for i, (label, _) in enumerate(mode_rules)}
+        self._modes = KeywordAutomaton(mode_keywords)
+
+        self._tag_labels = [tag for _, tag in tag_rules]
+        self._tags = KeywordAutomaton([keyword for keyword, _ in tag_rules])
+
+    def _first_by_priority(self, ids: Set[int], labels: List[str], priority: Dict[str, int], default: str) -> str:
+        if not ids:
+            return default
+        return min((labels[i] for i in ids), key=priority.__getitem__)
+
+    def classify(self, hook_text: str, topic: str = "") -> Tuple[str, str, List[str]]:
+        """
+        Returns: (hook_type, mode, tags_list)
+        """
+        hook_lower = hook_text.lower()
+        topic_lower = topic.lower() if topic else ""
+
+        hook_type = self._first_by_priority(
+            self._types.matches(hook_lower), self._type_labels, self._type_priority, DEFAULT_HOOK_TYPE
+        )
+        mode = self._first_by_priority(
+            self._modes.matches(hook_lower), self._mode_labels, self._mode_priority, DEFAULT_MODE
+        )
+
+        # Tags keep rule order, deduplicated
+        tags: List[str] = []
+        for i in sorted(self._tags.matches(f"{hook_lower} {topic_lower}")):
+            tag = self._tag_labels[i]
+            if tag not in tags:
+                tags.append(tag)
+
+        return (hook_type, mode, tags or list(DEFAULT_TAGS))
+
+    def classify_batch(self, items: Iterable[Tuple[str, str]]) -> List[Tuple[str, str, List[str]]]:
+        """Classify many (hook_text, topic) pairs."""
+        classify = self.classify
+        return [classify(hook_text or "", topic or "") for hook_text, topic in items]
+
+hook_classifier = HookClassifier()
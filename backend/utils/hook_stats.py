@@ -0,0 +1,121 @@
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+def hook_stats_update(d_count: int, d_sum: float, d_sq_sum: float) -> list:
+    """
+    Aggregation-pipeline update that increments the hook's retention
+    aggregates (count, sum, sum of squares) and re-derives mean/variance
+    from them - atomically, in a single round trip.
+
+    Hooks written before the aggregates existed are seeded from their
+    stored avg_retention * usage_count.
+    """
+    old_count = {"$ifNull": ["$usage_count", 0]}
+    old_avg = {"$ifNull": ["$avg_retention", 0.0]}
+
+    return [
+        {"$set": {
+            "usage_count": {"$add": [old_count, d_count]},
+            "retention_sum": {"$add": [
+                {"$ifNull": ["$retention_sum", {"$multiply": [old_avg, old_count]}]},
+                d_sum
+            ]},
+            "retention_sq_sum": {"$add": [
+                {"$ifNull": ["$retention_sq_sum", {"$multiply": [old_avg, old_avg, old_count]}]},
+                d_sq_sum
+            ]}
+        }},
+        {"$set": {
+            "avg_retention": {"$cond": [
+                {"$gt": ["$usage_count", 0]},
+                {"$divide": ["$retention_sum", "$usage_count"]},
+                0.0
+            ]}
+        }},
+        {"$set": {
+            "retention_variance": {"$cond": [
+                {"$gt": ["$usage_count", 0]},
+                {"$max": [0.0, {"$subtract": [
+                    {"$divide": ["$retention_sq_sum", "$usage_count"]},
+                    {"$multiply": ["$avg_retention", "$avg_retention"]}
+                ]}]},
+                0.0
+            ]}
+        }}
+    ]
+
+async def resolve_hook_id(
+    user_id: str,
+    script_id: str,
+    hook_text: str,
+    hook_id: Optional[str] = None
+) -> Optional[str]:
+    """
+    Resolve the hook a metric refers to: the explicit hook_id, else the
+    script's hook (when its text matches), else the user's hook with that text.
+    Returns None for hooks that aren't in the library.
+    """
+    from database import db
+
+    if hook_id:
+        hook = await db.hooks.find_one({"id": hook_id, "user_id": user_id}, {"_id": 0, "id": 1})
+        return hook["id"] if hook else None
+
+    script = await db.scripts.find_one(
+        {"id": script_id, "user_id": user_id},
+        {"_id": 0, "hook_id": 1, "hook_text": 1}
+    )
+    if script and script.get("hook_id") and script.get("hook_text") == hook_text:
+        return script["hook_id"]
+
+    hook = await db.hooks.find_one({"user_id": user_id, "hook_text": hook_text}, {"_id": 0, "id": 1})
+    return hook["id"] if hook else None
+
+async def apply_hook_stats_delta(
+    user_id: str,
+    hook_id: Optional[str],
+    d_count: int = 0,
+    d_sum: float = 0.0,
+    d_sq_sum: float = 0.0
+):
+    """
+    Apply a metric delta to the hook's aggregates. No-op if nothing changed
+    or the metric has no resolved hook (reconcile_hook_stats picks those up
+    once backfill_metric_hook_ids has set their hook_id).
+    """
+    if not hook_id or (not d_count and not d_sum and not d_sq_sum):
+        return
+
+    from database import db
+
+    await db.hooks.update_one(
+        {"id": hook_id, "user_id": user_id},
+        hook_stats_update(d_count, d_sum, d_sq_sum)
+    )
+
+async def record_metric_added(user_id: str, hook_id: Optional[str], retention: float):
+    await apply_hook_stats_delta(user_id, hook_id, 1, retention, retention * retention)
+
+async def record_metric_removed(user_id: str, hook_id: Optional[str], retention: float):
+    await apply_hook_stats_delta(user_id, hook_id, -1, -retention, -retention * retention)
+
+async def record_metric_changed(
+    user_id: str,
+    old_hook_id: Optional[str],
+    old_retention: float,
+    new_hook_id: Optional[str],
+    new_retention: float
+):
+    """Move a metric's contribution from its old values to its new ones."""
+    if old_hook_id == new_hook_id:
+        await apply_hook_stats_delta(
+            user_id, new_hook_id,
+            0,
+            new_retention - old_retention,
+            new_retention * new_retention - old_retention * old_retention
+        )
+    else:
+        await record_metric_removed(user_id, old_hook_id, old_retention)
+        await record_metric_added(user_id, new_hook_id, new_retention)
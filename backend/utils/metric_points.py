@@ -0,0 +1,100 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Time-series collection of metric snapshots (one point per create/update)
+COLLECTION = "metric_points"
+POINT_FIELDS = ("views", "likes", "comments", "subs", "retention_percent", "swipe_rate")
+
+BUCKET_UNITS = ("hour", "day", "week", "month", "quarter", "year")
+
+async def ensure_metric_points_collection(db):
+    """Create the time-series collection (daily buckets) if it doesn't exist yet."""
+    if COLLECTION in await db.list_collection_names():
+        return
+
+    from pymongo.errors import OperationFailure
+
+    try:
+        # Day-sized buckets (MongoDB 6.3+)
+        await db.create_collection(COLLECTION, timeseries={
+            "timeField": "ts",
+            "metaField": "meta",
+            "bucketMaxSpanSeconds": 86400,
+            "bucketRoundingSeconds": 86400
+        })
+    except OperationFailure:
+        await db.create_collection(COLLECTION, timeseries={
+            "timeField": "ts",
+            "metaField": "meta",
+            "granularity": "hours"
+        })
+
+def metric_point(metric: Dict, ts: Optional[datetime] = None) -> Dict:
+    return {
+        "ts": ts or datetime.utcnow(),
+        "meta": {
+            "user_id": metric["user_id"],
+            "metric_id": metric["id"],
+            "script_id": metric.get("script_id"),
+            "hook_id": metric.get("hook_id")
+        },
+        **{field: metric.get(field) or 0 for field in POINT_FIELDS}
+    }
+
+async def record_metric_point(metric: Dict, ts: Optional[datetime] = None):
+    from database import db
+
+    await db[COLLECTION].insert_one(metric_point(metric, ts))
+
+async def delete_metric_points(user_id: str, metric_id: str):
+    from database import db
+
+    await db[COLLECTION].delete_many({"meta.user_id": user_id, "meta.metric_id": metric_id})
+
+def series_pipeline(
+    user_id: str,
+    start: datetime,
+    end: datetime,
+    unit: str = "day",
+    bin_size: int = 1,
+    timezone: str = "UTC"
+) -> List[Dict]:
+    """
+    Bucket the user's metric snapshots into [start, end) with $dateTrunc.
+    Each metric contributes its latest snapshot within a bucket; buckets
+    then sum counts and average rates across metrics.
+    """
+    bucket = {"$dateTrunc": {"date": "$ts", "unit": unit, "binSize": bin_size, "timezone": timezone}}
+
+    return [
+        {"$match": {"meta.user_id": user_id, "ts": {"$gte": start, "$lt": end}}},
+        {"$sort": {"ts": 1}},
+        {
+            "$group": {
+                "_id": {"bucket": bucket, "metric_id": "$meta.metric_id"},
+                **{field: {"$last": f"${field}"} for field in POINT_FIELDS}
+            }
+        },
+        {
+            "$group": {
+                "_id": "$_id.bucket",
+                "views": {"$sum": "$views"},
+                "likes": {"$sum": "$likes"},
+                "comments": {"$sum": "$comments"},
+                "subs": {"$sum": "$subs"},
+                "retention_percent": {"$avg": "$retention_percent"},
+                "swipe_rate": {"$avg": "$swipe_rate"},
+                "metrics": {"$sum": 1}
+            }
+        },
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "bucket": "$_id",
+            "views": 1, "likes": 1, "comments": 1, "subs": 1,
+            "retention_percent": 1, "swipe_rate": 1, "metrics": 1
+        }}
+    ]
@@ -0,0 +1,159 @@
+import re
+import random
+import zlib
+from array import array
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+# MinHash parameters: 64 permutations split into 16 bands of 4 rows.
+# Candidate threshold ~ (1/16)^(1/4) ≈ 0.5, candidates are then verified
+# against the estimated Jaccard similarity.
+NUM_PERM = 64
+NUM_BANDS = 16
+SHINGLE_SIZE = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures are stable across processes and can be persisted
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    text = _NON_WORD.sub(' ', text.lower())
+    return _WHITESPACE.sub(' ', text).strip()
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """Character shingles of normalized text."""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def minhash_signature(text: str) -> array:
+    """
+    Compute the MinHash signature of a text.
+    Returns an unsigned 64-bit array of NUM_PERM values.
+    """
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles(text)]
+    if not hashes:
+        return array('Q', [_MAX_HASH] * NUM_PERM)
+
+    return array('Q', [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    ])
+
+def estimate_similarity(sig_a: Iterable[int], sig_b: Iterable[int]) -> float:
+    """Estimated Jaccard similarity from two signatures."""
+    sig_a = list(sig_a)
+    sig_b = list(sig_b)
+    matches = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+    return matches / len(sig_a) if sig_a else 0.0
+
+class MinHashLSH:
+    """
+    In-memory LSH index over MinHash signatures (banding technique).
+    Lookups only touch the buckets the query falls into, so cost is
+    independent of index size.
+    """
+
+    def __init__(self, num_bands: int = NUM_BANDS, num_perm: int = NUM_PERM):
+        if num_perm % num_bands != 0:
+            raise ValueError("num_perm must be divisible by num_bands")
+        self.num_bands = num_bands
+        self.rows = num_perm // num_bands
+        self._buckets: List[Dict[int, List[Hashable]]] = [{} for _ in range(num_bands)]
+        self._signatures: Dict[Hashable, array] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def _band_keys(self, signature) -> List[int]:
+        r = self.rows
+        return [hash(tuple(signature[i * r:(i + 1) * r])) for i in range(self.num_bands)]
+
+    def insert(self, key: Hashable, signature) -> None:
+        if key in self._signatures:
+            self.remove(key)
+        signature = array('Q', signature)
+        self._signatures[key] = signature
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, []).append(key)
+
+    def remove(self, key: Hashable) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket = band.get(band_key)
+            if bucket and key in bucket:
+                bucket.remove(key)
+                if not bucket:
+                    del band[band_key]
+
+    def candidates(self, signature) -> Set[Hashable]:
+        found = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket = band.get(band_key)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def query(self, signature, threshold: float) -> List[Tuple[Hashable, float]]:
+        """
+        Return (key, similarity) for indexed entries whose estimated
+        similarity is >= threshold, most similar first.
+        """
+        results = []
+        for key in self.candidates(signature):
+            similarity = estimate_similarity(signature, self._signatures[key])
+            if similarity >= threshold:
+                results.append((key, similarity))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results
+
+    def duplicate_clusters(self, threshold: float) -> List[Dict]:
+        """
+        Group all indexed entries into near-duplicate clusters (union-find
+        over verified candidate pairs). Singletons are omitted.
+        """
+        parent = {key: key for key in self._signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        best_similarity: Dict[Hashable, float] = {}
+        for key, signature in self._signatures.items():
+            for other, similarity in self.query(signature, threshold):
+                if other == key:
+                    continue
+                root_a, root_b = find(key), find(other)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+                best_similarity[key] = max(best_similarity.get(key, 0.0), similarity)
+
+        clusters: Dict[Hashable, List[Hashable]] = {}
+        for key in self._signatures:
+            clusters.setdefault(find(key), []).append(key)
+
+        return [
+            {
+                "ids": members,
+                "max_similarity": round(max(best_similarity.get(m, 0.0) for m in members), 3)
+            }
+            for members in clusters.values()
+            if len(members) > 1
+        ]
@@ -1,51 +1,36 @@
 import logging
 from typing import List, Dict, Optional
-from database import db
+
+from utils.analytics_snapshot import get_analytics_snapshot
 
 logger = logging.getLogger(__name__)
 
 async def get_top_performing_patterns(user_id: str, top_n: int = 3) -> Dict:
     """
     Get top performing patterns from analytics data.
-    Returns top hooks, dominance lines, open loops, and close patterns.
+    Returns top hooks, dominance lines, open loops, and close patterns,
+    ranked by view-weighted shrunk retention (see utils.analytics_snapshot).
     """
     try:
-        # Top hooks by retention
-        top_hooks = await db.analytics_data.find(
-            {"user_id": user_id},
-            {"_id": 0, "hook_title": 1, "retention_hook": 1, "retention_percent": 1}
-        ).sort("retention_percent", -1).limit(top_n).to_list(length=top_n)
-        
-        # Top dominance lines
-        top_dominance = await db.analytics_data.find(
-            {"user_id": user_id, "dominance_line": {"$ne": None, "$ne": ""}},
-            {"_id": 0, "dominance_line": 1, "retention_percent": 1}
-        ).sort("retention_percent", -1).limit(top_n).to_list(length=top_n)
-        
-        # Top open loops
-        top_open_loops = await db.analytics_data.find(
-            {"user_id": user_id, "open_loop": {"$ne": None, "$ne": ""}},
-            {"_id": 0, "open_loop": 1, "retention_percent": 1}
-        ).sort("retention_percent", -1).limit(top_n).to_list(length=top_n)
-        
-        # Top close patterns
-        top_closes = await db.analytics_data.find(
-            {"user_id": user_id, "close": {"$ne": None, "$ne": ""}},
-            {"_id": 0, "close": 1, "retention_percent": 1}
-        ).sort("retention_percent", -1).limit(top_n).to_list(length=top_n)
-        
-        # Top performing full scripts as examples
-        top_scripts = await db.analytics_data.find(
-            {"user_id": user_id},
-            {"_id": 0, "resolve_script": 1, "retention_percent": 1, "likes": 1}
-        ).sort("retention_percent", -1).limit(top_n).to_list(length=top_n)
+        snapshot = await get_analytics_snapshot(user_id)
         
         return {
-            "top_hooks": top_hooks,
-            "top_dominance_lines": top_dominance,
-            "top_open_loops": top_open_loops,
-            "top_close_patterns": top_closes,
-            "top_scripts": top_scripts
+            "top_hooks": snapshot.leaderboard(
+                "retention_percent", ["hook_title", "retention_hook", "retention_percent"], top_n
+            ),
+            "top_dominance_lines": snapshot.leaderboard(
+                "retention_percent", ["dominance_line", "retention_percent"], top_n, require="dominance_line"
+            ),
+            "top_open_loops": snapshot.leaderboard(
+                "retention_percent", ["open_loop", "retention_percent"], top_n, require="open_loop"
+            ),
+            "top_close_patterns": snapshot.leaderboard(
+                "retention_percent", ["close", "retention_percent"], top_n, require="close"
+            ),
+            # Top performing full scripts as examples
+            "top_scripts": snapshot.leaderboard(
+                "retention_percent", ["resolve_script", "retention_percent", "likes"], top_n
+            )
         }
     
     except Exception as e:
@@ -0,0 +1,103 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$d": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$d" in value:
+        return datetime.fromisoformat(value["$d"])
+    return value
+
+def encode_cursor(sort_field: str, doc: Dict) -> str:
+    """Opaque cursor pointing just past `doc` in (sort_field, id) order."""
+    payload = {"f": sort_field, "v": _encode_value(doc.get(sort_field)), "id": doc.get("id")}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort_field: str) -> Tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["f"] != sort_field or not payload.get("id"):
+            raise ValueError("cursor belongs to a different sort order")
+        return _decode_value(payload["v"]), payload["id"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# BSON sort order of the types a sort field may hold (null also matches a
+# missing field). $lt/$gt only compare values of the same type, so the rows
+# of other types that sort after the cursor need their own branches.
+_TYPE_ORDER = (
+    ("null", lambda v: v is None),
+    ("number", lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)),
+    ("string", lambda v: isinstance(v, str)),
+    ("date", lambda v: isinstance(v, datetime)),
+)
+
+def _type_match(sort_field: str, type_name: str) -> Dict:
+    if type_name == "null":
+        return {sort_field: None}
+    return {sort_field: {"$type": type_name}}
+
+def keyset_filter(sort_field: str, direction: int, value: Any, last_id: str) -> Dict:
+    """
+    Documents strictly after (value, last_id) in (sort_field, id) order.
+    Rows whose sort field is null/missing or of another type (e.g. a legacy
+    string created_at) are placed where MongoDB sorts them, so they are not
+    skipped after the first page.
+    """
+    op = "$lt" if direction < 0 else "$gt"
+    branches = [{sort_field: value, "id": {op: last_id}}]
+    if value is not None:
+        branches.append({sort_field: {op: value}})
+
+    rank = next((i for i, (_, matches) in enumerate(_TYPE_ORDER) if matches(value)), None)
+    if rank is not None:
+        others = _TYPE_ORDER[:rank] if direction < 0 else _TYPE_ORDER[rank + 1:]
+        branches += [_type_match(sort_field, type_name) for type_name, _ in others]
+    return {"$or": branches}
+
+async def paginate(
+    collection,
+    query: Dict,
+    limit: int,
+    cursor: Optional[str] = None,
+    sort_field: str = "created_at",
+    direction: int = -1,
+    projection: Optional[Dict] = None,
+    response: Optional[Response] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Keyset pagination on (sort_field, id), backed by a compound index
+    (user_id, sort_field, id). Returns (page, next_cursor) and, when a
+    response is given, sets the X-Next-Cursor header.
+    """
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_field)
+        query = {"$and": [query, keyset_filter(sort_field, direction, value, last_id)]}
+
+    docs = await collection.find(
+        query,
+        projection or {"_id": 0}
+    ).sort([(sort_field, direction), ("id", direction)]).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(sort_field, docs[-1])
+
+    if response is not None and next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return docs, next_cursor
@@ -0,0 +1,191 @@
+import os
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from models_analytics import ScriptAnalysis
+from utils.script_helpers import extract_hook_from_script
+
+logger = logging.getLogger(__name__)
+
+# Hard budget for the spoken audio (YouTube Shorts limit)
+MAX_TTS_DURATION = float(os.getenv("TTS_MAX_DURATION_SECONDS", "60"))
+
+# Hook must land within the first 3 seconds
+HOOK_WINDOW_SECONDS = 3.0
+
+# Default speaking rate (ElevenLabs German, speed 1.0) until enough history exists
+DEFAULT_SECONDS_PER_CHAR = 0.068
+DEFAULT_INTERCEPT = 0.6
+MIN_FIT_SAMPLES = 5
+MODEL_CACHE_TTL_SECONDS = 600
+
+# Structure markers (see /notion-analytics/algorithm-guide)
+DOMINANCE_MARKERS = re.compile(
+    r"\b(menschen, die|es gibt einen grund|die meisten|niemand sagt|wer wirklich|starke menschen)",
+    re.IGNORECASE
+)
+OPEN_LOOP_MARKERS = re.compile(
+    r"\b(aber was|und genau hier|doch es gibt|das geheimnis|was wäre, wenn|bis du verstehst|am ende)",
+    re.IGNORECASE
+)
+TENSION_MARKERS = re.compile(r"[!?]|\b(aber|doch|jedoch|trotzdem|plötzlich)\b", re.IGNORECASE)
+
+class SpeakingRateModel:
+    """
+    Linear speaking-rate model: duration = intercept + seconds_per_char * chars.
+    Fitted on historical rendered videos (videos.duration vs script length).
+    """
+
+    def __init__(
+        self,
+        seconds_per_char: float = DEFAULT_SECONDS_PER_CHAR,
+        intercept: float = DEFAULT_INTERCEPT,
+        samples: int = 0
+    ):
+        self.seconds_per_char = seconds_per_char
+        self.intercept = intercept
+        self.samples = samples
+
+    @property
+    def fitted(self) -> bool:
+        return self.samples >= MIN_FIT_SAMPLES
+
+    def predict(self, character_count: int) -> float:
+        return max(0.0, self.intercept + self.seconds_per_char * character_count)
+
+    def max_characters(self, duration: float) -> int:
+        """Longest script (in characters) that fits in `duration` seconds."""
+        return max(0, int((duration - self.intercept) / self.seconds_per_char))
+
+    @classmethod
+    def fit(cls, points: List[Tuple[int, float]]) -> "SpeakingRateModel":
+        """
+        Ordinary least squares over (character_count, duration) points.
+        Falls back to the default model with too few or degenerate samples.
+        """
+        points = [(c, d) for c, d in points if c and d and c > 0 and d > 0]
+        n = len(points)
+        if n < MIN_FIT_SAMPLES:
+            return cls(samples=n)
+
+        mean_c = sum(c for c, _ in points) / n
+        mean_d = sum(d for _, d in points) / n
+        var_c = sum((c - mean_c) ** 2 for c, _ in points)
+
+        if var_c == 0:
+            # All scripts same length: pure rate through the default intercept
+            slope = max(mean_d - DEFAULT_INTERCEPT, 0.0) / mean_c
+            return cls(seconds_per_char=slope or DEFAULT_SECONDS_PER_CHAR, samples=n)
+
+        slope = sum((c - mean_c) * (d - mean_d) for c, d in points) / var_c
+        if slope <= 0:
+            return cls(samples=n)
+
+        return cls(seconds_per_char=slope, intercept=mean_d - slope * mean_c, samples=n)
+
+    def to_dict(self) -> Dict:
+        return {
+            "seconds_per_char": round(self.seconds_per_char, 5),
+            "intercept": round(self.intercept, 3),
+            "samples": self.samples,
+            "fitted": self.fitted
+        }
+
+def analyze_script(
+    script_text: str,
+    model: Optional[SpeakingRateModel] = None,
+    max_duration: float = MAX_TTS_DURATION
+) -> ScriptAnalysis:
+    """
+    Analyze script structure and estimate spoken duration before any TTS spend.
+    """
+    model = model or SpeakingRateModel()
+    text = script_text.strip()
+
+    hook_text = extract_hook_from_script(text) if text else ""
+    hook_length = len(hook_text)
+    hook_end = text.find(hook_text) + hook_length if hook_text else 0
+
+    dominance = DOMINANCE_MARKERS.search(text, hook_end)
+    open_loop = OPEN_LOOP_MARKERS.search(text, hook_end)
+    if not open_loop:
+        # Fall back to the first question after the hook
+        question = text.find("?", hook_end)
+        open_loop_position = question if question >= 0 else None
+    else:
+        open_loop_position = open_loop.start()
+
+    tension_peaks = [m.start() for m in TENSION_MARKERS.finditer(text)]
+    estimated_duration = round(model.predict(len(text)), 2)
+    within_budget = estimated_duration <= max_duration
+
+    recommendations = []
+    if not within_budget:
+        excess = len(text) - model.max_characters(max_duration)
+        recommendations.append(
+            f"Estimated {estimated_duration:.1f}s exceeds the {max_duration:.0f}s budget - "
+            f"cut about {excess} characters before generating audio"
+        )
+    hook_seconds = model.seconds_per_char * hook_length
+    if hook_seconds > HOOK_WINDOW_SECONDS:
+        recommendations.append(
+            f"Hook takes ~{hook_seconds:.1f}s to speak - keep it under {HOOK_WINDOW_SECONDS:.0f}s "
+            f"(~{int(HOOK_WINDOW_SECONDS / model.seconds_per_char)} characters)"
+        )
+    if dominance is None:
+        recommendations.append("No dominance line detected after the hook")
+    if open_loop_position is None:
+        recommendations.append("No open loop detected - add a question or unresolved tension")
+
+    return ScriptAnalysis(
+        script_text=text,
+        hook_length=hook_length,
+        dominance_position=dominance.start() if dominance else None,
+        open_loop_position=open_loop_position,
+        tension_peaks=tension_peaks,
+        estimated_duration=estimated_duration,
+        max_duration=max_duration,
+        within_budget=within_budget,
+        recommendations=recommendations
+    )
+
+# Per-user fitted models: user_id -> (fitted_at, model)
+_model_cache: Dict[str, Tuple[float, SpeakingRateModel]] = {}
+
+async def get_speaking_rate_model(user_id: str) -> SpeakingRateModel:
+    """
+    Fit (and cache) the speaking-rate model from the user's completed videos.
+    """
+    cached = _model_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < MODEL_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    from database import db
+
+    pipeline = [
+        {"$match": {"user_id": user_id, "status": "completed", "duration": {"$gt": 0}}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": 500},
+        {
+            "$lookup": {
+                "from": "scripts",
+                "localField": "script_id",
+                "foreignField": "id",
+                "as": "script"
+            }
+        },
+        {"$unwind": "$script"},
+        {"$project": {"_id": 0, "duration": 1, "character_count": "$script.character_count"}}
+    ]
+
+    points = [
+        (doc.get("character_count"), doc.get("duration"))
+        async for doc in db.videos.aggregate(pipeline)
+    ]
+    model = SpeakingRateModel.fit(points)
+    _model_cache[user_id] = (time.monotonic(), model)
+
+    logger.info(f"Speaking-rate model for user {user_id}: {model.to_dict()}")
+    return model
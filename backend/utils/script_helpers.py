@@ -1,6 +1,8 @@
 import re
 from typing import Tuple, List
 
+from utils.hook_classifier import hook_classifier
+
 def extract_hook_from_script(script_text: str) -> str:
     """
     Extract first sentence as hook from script.
@@ -20,69 +22,11 @@ def extract_hook_from_script(script_text: str) -> str:
 def detect_hook_type_and_tags(hook_text: str, topic: str) -> Tuple[str, str, List[str]]:
     """
     Auto-detect hook type, mode, and tags based on content.
+    Rules live in utils.hook_classifier (compiled once at import).
     
     Returns: (hook_type, mode, tags_list)
     """
-    hook_lower = hook_text.lower()
-    topic_lower = topic.lower() if topic else ""
-    
-    # Detect hook type
-    hook_type = "emotional_trigger"  # Default for Faith niche
-    
-    if any(word in hook_lower for word in ["hast du", "merkst du", "siehst du", "weißt du", "fühlst du"]):
-        hook_type = "identity_filter"
-    elif any(word in hook_lower for word in ["jetzt", "sofort", "schnell", "moment"]):
-        hook_type = "urgency"
-    elif any(word in hook_lower for word in ["nicht für alle", "nicht für dich", "nicht jeder"]):
-        hook_type = "not_for_everyone"
-    elif any(word in hook_lower for word in ["nicht", "kein", "gegenteil"]):
-        hook_type = "reverse_psychology"
-    elif any(word in hook_lower for word in ["fühlt", "spürst", "herz", "seele", "tief"]):
-        hook_type = "emotional_trigger"
-    
-    # Detect mode
-    mode = "FAITH_EXPLICIT"  # Default
-    if any(word in hook_lower for word in ["bist", "wirklich", "zustand"]):
-        mode = "STATE_BASED"
-    
-    # Tags dictionary
-    tags_dict = {
-        "hoffnung": "Hoffnung",
-        "glaube": "Glaube",
-        "gott": "Gott",
-        "kraft": "Kraft",
-        "stärke": "Stärke",
-        "liebe": "Liebe",
-        "vertrauen": "Vertrauen",
-        "sinn": "Sinn",
-        "seele": "Seele",
-        "herz": "Herz",
-        "innerfrieden": "Innerer Friede",
-        "innere ruhe": "Innere Ruhe",
-        "faith": "Glaube",
-        "hope": "Hoffnung",
-        "strength": "Kraft",
-        "purpose": "Zweck",
-        "meaning": "Sinn",
-        "spirit": "Geist",
-        "dominance": "Dominanz",
-        "open loop": "Offene Schleife"
-    }
-    
-    # Detect tags from hook and topic
-    detected_tags = []
-    combined_text = f"{hook_lower} {topic_lower}"
-    
-    for keyword, tag in tags_dict.items():
-        if keyword in combined_text:
-            if tag not in detected_tags:
-                detected_tags.append(tag)
-    
-    # Default tags if none detected
-    if not detected_tags:
-        detected_tags = ["Glaube", "Hoffnung"]
-    
-    return (hook_type, mode, detected_tags)
+    return hook_classifier.classify(hook_text, topic)
 
 def count_characters(text: str) -> int:
     """Count characters in text."""
@@ -23,6 +23,10 @@ import {
   Info
 } from 'lucide-react';
 
+// Background imports are polled once a second for at most 10 minutes
+const JOB_POLL_INTERVAL_MS = 1000;
+const JOB_MAX_WAIT_MS = 10 * 60 * 1000;
+
 export default function NotionAnalytics() {
   const { api } = useAuth();
   const [uploading, setUploading] = useState(false);
@@ -51,6 +55,24 @@ export default function NotionAnalytics() {
     }
   };
 
+  const waitForJob = async (jobId) => {
+    // Poll the background import until it finishes or the deadline passes
+    const deadline = Date.now() + JOB_MAX_WAIT_MS;
+    while (Date.now() < deadline) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      const { data: job } = await api.get(`/jobs/${jobId}`);
+      if (job.status === 'completed') return job.result;
+      if (job.status === 'failed') {
+        const error = new Error(job.error || 'Import sikertelen');
+        error.response = { data: { detail: error.message } };
+        throw error;
+      }
+    }
+    const error = new Error('Az importálás túl sokáig tart – frissítsd az oldalt később');
+    error.response = { data: { detail: error.message } };
+    throw error;
+  };
+
   const handleFileUpload = async (e) => {
     const file = e.target.files[0];
     if (!file) return;
@@ -69,10 +91,16 @@ export default function NotionAnalytics() {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
 
-      toast.success(`${response.data.imported_count} sor sikeresen importálva!`);
+      let result = response.data;
+      if (result.background) {
+        toast.info('Nagy fájl – az importálás a háttérben fut...');
+        result = await waitForJob(result.job_id);
+      }
+
+      toast.success(`${result.imported_count} sor sikeresen importálva!`);
       
-      if (response.data.errors && response.data.errors.length > 0) {
-        toast.warning(`${response.data.errors.length} hiba történt az importálás során`);
+      if (result.error_count > 0) {
+        toast.warning(`${result.error_count} hiba történt az importálás során`);
       }
 
       fetchData();